@@ -1,24 +1,129 @@
 from __future__ import annotations
 
+import asyncio
+from contextlib import AbstractAsyncContextManager, asynccontextmanager, nullcontext
 from html import escape
+import math
 import os
-from typing import Any
+from pathlib import Path
+import tempfile
+import time
+from typing import Any, AsyncIterator, Callable, Sequence
 
-from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi import FastAPI, File, Form, HTTPException, Query, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse, Response, StreamingResponse
 
-from app.services.analyzer import analyze_text, merge_issues, normalize_glm_issues
-from app.services.glm_client import GLMClient
-from app.services.parser import parse_file_bytes
+from app.services.admission import (
+    DEFAULT_ADMISSION_WAIT_SECONDS,
+    DEFAULT_LLM_MAX_CONCURRENCY,
+    DEFAULT_QUEUE_SIZE,
+    DEFAULT_RATE_LIMIT_BURST,
+    DEFAULT_RATE_LIMIT_PER_MINUTE,
+    AdmissionPool,
+    AdmissionRejected,
+    RateLimiter,
+    RateLimitMiddleware,
+    api_key_client,
+)
+from app.services.analyzer import (
+    DocumentAnalysis,
+    analyze_document,
+    heuristic_rule_version,
+    iter_sentences,
+    merge_issues,
+    normalize_glm_issues,
+)
+from app.services.cache import (
+    DEFAULT_CACHE_DISK_MAX_BYTES,
+    DEFAULT_CACHE_MAX_BYTES,
+    DEFAULT_CACHE_TTL_SECONDS,
+    TieredCache,
+    content_hash,
+)
+from app.services.corpus import TermIndex
+from app.services.fingerprints import CandidatePair
+from app.services.glm_client import (
+    DEFAULT_GLM_MAX_CONNECTIONS,
+    DEFAULT_GLM_MAX_IN_FLIGHT,
+    PAIR_REVIEW_PROMPT,
+    REVIEW_PROMPT,
+    AsyncGLMClient,
+    GLMConnectionPool,
+)
+from app.services.jobs import (
+    DEFAULT_JOB_MAX_RETAINED,
+    DEFAULT_JOB_QUEUE_SIZE,
+    DEFAULT_JOB_WORKERS,
+    Job,
+    JobManager,
+    JobStore,
+    QueueFullError,
+)
+from app.services import jsonio
+from app.services.latex import LatexIndex
+from app.services.metrics import (
+    BYTES_INGESTED,
+    REGISTRY,
+    RESULT_CACHE,
+    record_stage,
+    timed_iter,
+)
+from app.services.parser import (
+    DEFAULT_UPLOAD_MAX_BYTES,
+    DEFAULT_UPLOAD_SPOOL_MEMORY_BYTES,
+    DEFAULT_WARM_EXTRACTION_WORKERS,
+    SpooledUpload,
+    adopt_spool,
+    extraction_workers,
+    iter_upload_text,
+    iter_zip_submissions,
+    preload_extractors,
+    shutdown_extraction_pool,
+    spool_upload,
+    warm_extraction_pool,
+)
+from app.services.resilience import (
+    DEFAULT_BREAKER_FAILURES,
+    DEFAULT_BREAKER_RESET_SECONDS,
+    DEFAULT_REVIEW_DEADLINE_SECONDS,
+    CircuitBreaker,
+    CircuitBreakerRegistry,
+    RetryPolicy,
+)
+from app.services.review import (
+    DEFAULT_REVIEW_CONCURRENCY,
+    DEFAULT_WINDOW_OVERLAP,
+    DEFAULT_WINDOW_RETRIES,
+    SENTENCE_OVERHEAD_TOKENS,
+    ReviewWindow,
+    WindowOutcome,
+    build_pair_windows,
+    build_review_windows,
+    iter_window_reviews,
+    pack_documents,
+    pair_review_sentences,
+    review_windows,
+    split_document_outcome,
+    split_document_sentence_id,
+    window_token_budget,
+)
+from app.services.revisions import DEFAULT_MAX_REVISIONS, AnalysisStore, diff_revisions
+from app.services.router import ModelRouter, Route
+from app.services.rules import default_rule_engine
+from app.services.tables import IssueTable, sentence_index
+from app.services.tokens import DEFAULT_RESPONSE_TOKENS, get_token_counter
+from app.services.warmup import DEFAULT_WARMUP_MODE, WARMUP_MODES, Warmup, WarmupStep
 
 
 DEFAULT_GLM_BASE_URL = "https://open.bigmodel.cn/api/paas/v4"
 DEFAULT_GLM_MODEL = "glm-4.6v"
 DEFAULT_GLM_TIMEOUT_SECONDS = 60
 DEFAULT_GLM_MAX_SENTENCES = 100
-DEFAULT_GLM_MAX_TOTAL_CHARS = 20000
-DEFAULT_GLM_MAX_SENTENCE_CHARS = 500
+DEFAULT_GLM_REVIEW_MODE = "windowed"
+DEFAULT_BATCH_MAX_DOCUMENTS = 200
+GLM_REVIEW_MODES = {"windowed", "head", "pairs"}
+RATE_LIMITED_PATHS = ("/api/analyze", "/api/analyze/stream", "/api/analyze/batch", "/api/jobs")
 DEFAULT_FRONTEND_URL = "https://keji060822.github.io/paper-consistency-platform/"
 
 
@@ -37,29 +142,888 @@ def _to_int_env(name: str, default_value: int) -> int:
     return value if value > 0 else default_value
 
 
-def _build_glm_input_sentences(sentences: list[dict[str, str]]) -> list[dict[str, str]]:
+def _glm_token_budget(
+    model: str, prompt: str = REVIEW_PROMPT, routes: Sequence[Route] = ()
+) -> int:
+    return window_token_budget(
+        model,
+        window_tokens=_to_non_negative_int_env("GLM_WINDOW_TOKENS", 0),
+        count_tokens=get_token_counter(),
+        response_tokens=_to_int_env("GLM_RESPONSE_TOKENS", DEFAULT_RESPONSE_TOKENS),
+        prompt=prompt,
+        route_models=[route.model for route in routes],
+    )
+
+
+def _build_glm_input_sentences(
+    sentences: Sequence[dict[str, Any]], max_tokens: int
+) -> list[dict[str, str]]:
     max_sentences = _to_int_env("GLM_MAX_SENTENCES", DEFAULT_GLM_MAX_SENTENCES)
-    max_total_chars = _to_int_env("GLM_MAX_TOTAL_CHARS", DEFAULT_GLM_MAX_TOTAL_CHARS)
-    max_sentence_chars = _to_int_env("GLM_MAX_SENTENCE_CHARS", DEFAULT_GLM_MAX_SENTENCE_CHARS)
+    count_tokens = get_token_counter()
 
     selected: list[dict[str, str]] = []
-    total_chars = 0
+    total_tokens = 0
     for idx, item in enumerate(sentences):
         sid = str(item.get("id", f"s-{idx + 1}")).strip() or f"s-{idx + 1}"
         text = str(item.get("text", "")).strip()
         if not text:
             continue
-        clipped = text[:max_sentence_chars]
-        projected_chars = total_chars + len(clipped)
-        if selected and projected_chars > max_total_chars:
+        projected_tokens = total_tokens + count_tokens(text) + SENTENCE_OVERHEAD_TOKENS
+        if selected and projected_tokens > max_tokens:
             break
-        selected.append({"id": sid, "text": clipped})
-        total_chars = projected_chars
+        selected.append({"id": sid, "text": text})
+        total_tokens = projected_tokens
         if len(selected) >= max_sentences:
             break
     return selected
 
 
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, "").strip().lower() in {"1", "true", "yes"}
+
+
+def _to_non_negative_int_env(name: str, default_value: int) -> int:
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default_value
+    try:
+        value = int(raw)
+    except ValueError:
+        return default_value
+    return value if value >= 0 else default_value
+
+
+def _warmup_mode() -> str:
+    mode = os.getenv("WARMUP_MODE", "").strip().lower()
+    return mode if mode in WARMUP_MODES else DEFAULT_WARMUP_MODE
+
+
+def _resolve_review_mode(requested: str) -> str:
+    mode = requested.strip().lower() or os.getenv("GLM_REVIEW_MODE", "").strip().lower()
+    return mode if mode in GLM_REVIEW_MODES else DEFAULT_GLM_REVIEW_MODE
+
+
+def _build_glm_windows(
+    sentences: Sequence[dict[str, Any]], max_tokens: int
+) -> list[ReviewWindow]:
+    return build_review_windows(
+        sentences,
+        max_tokens=max_tokens,
+        overlap=_to_non_negative_int_env("GLM_WINDOW_OVERLAP", DEFAULT_WINDOW_OVERLAP),
+        count_tokens=get_token_counter(),
+    )
+
+
+def _build_glm_pair_windows(
+    sentences: Sequence[dict[str, Any]], pairs: list[CandidatePair], max_tokens: int
+) -> list[ReviewWindow]:
+    return build_pair_windows(
+        pair_review_sentences(sentences, pairs),
+        max_tokens=max_tokens,
+        count_tokens=get_token_counter(),
+    )
+
+
+def _review_prompt(review_mode: str, scope: str, routes: str = "") -> tuple[str, str]:
+    """System prompt for ``review_mode`` and the review memo scope that goes with it.
+
+    ``routes`` is the router fingerprint: answers may come from other models then.
+    """
+    if routes:
+        scope = f"{scope}|routes:{routes}"
+    if review_mode == "pairs":
+        # Pair windows are judged under another prompt; keep their memo entries apart.
+        return PAIR_REVIEW_PROMPT, f"{scope}|pairs"
+    return REVIEW_PROMPT, scope
+
+
+def _glm_client_factory(
+    request: Request,
+    *,
+    api_key: str,
+    base_url: str,
+    model: str,
+    timeout: int,
+    prompt: str,
+) -> Callable[[], AsyncGLMClient]:
+    """Client factory for review windows; routed and hedged when ``GLM_ROUTES`` is set."""
+    pool = _get_glm_pool(request)
+    router = _get_glm_router(request)
+
+    def make_client() -> AsyncGLMClient:
+        if router:
+            return router.client(
+                api_key=api_key,
+                base_url=base_url,
+                model=model,
+                timeout=timeout,
+                pool=pool,
+                prompt=prompt,
+            )
+        return AsyncGLMClient(
+            api_key=api_key,
+            base_url=base_url,
+            model=model,
+            timeout=timeout,
+            pool=pool,
+            prompt=prompt,
+        )
+
+    return make_client
+
+
+def _glm_retry_policy() -> RetryPolicy:
+    return RetryPolicy(
+        retries=_to_non_negative_int_env("GLM_WINDOW_RETRIES", DEFAULT_WINDOW_RETRIES),
+        deadline_seconds=_to_int_env(
+            "GLM_REVIEW_DEADLINE_SECONDS", DEFAULT_REVIEW_DEADLINE_SECONDS
+        ),
+    )
+
+
+async def _review_head(
+    make_client: Callable[[], AsyncGLMClient],
+    sentences: Sequence[dict[str, Any]],
+    max_tokens: int,
+    breaker: CircuitBreaker | None = None,
+) -> WindowOutcome | None:
+    review_sentences = _build_glm_input_sentences(sentences, max_tokens)
+    if not review_sentences:
+        return None
+    # A failing head request is retried and bisected like any review window
+    # instead of being cut down to its first 20 sentences.
+    outcomes = await review_windows(
+        make_client,
+        [ReviewWindow(index=0, start=0, sentences=review_sentences)],
+        concurrency=_to_int_env("GLM_REVIEW_CONCURRENCY", DEFAULT_REVIEW_CONCURRENCY),
+        policy=_glm_retry_policy(),
+        breaker=breaker,
+    )
+    return outcomes[0]
+
+
+def _engine_settings(
+    filename: str,
+    base_url: str,
+    model: str,
+    glm_enabled: bool,
+    review_mode: str,
+    corpus_version: int = 0,
+    routes: str = "",
+) -> dict[str, Any]:
+    return {
+        "suffix": Path(filename).suffix.lower(),
+        "base_url": base_url.rstrip("/"),
+        "model": model.strip(),
+        "glm_enabled": glm_enabled,
+        "review_mode": review_mode,
+        "limits": {
+            "GLM_MAX_SENTENCES": _to_int_env("GLM_MAX_SENTENCES", DEFAULT_GLM_MAX_SENTENCES),
+            "glm_token_budget": _glm_token_budget(model),
+            "GLM_TOKENIZER": os.getenv("GLM_TOKENIZER", "").strip() or "estimate",
+            "GLM_WINDOW_OVERLAP": _to_non_negative_int_env(
+                "GLM_WINDOW_OVERLAP", DEFAULT_WINDOW_OVERLAP
+            ),
+        },
+        "rule_version": heuristic_rule_version(),
+        "corpus_version": corpus_version,
+        "routes": routes,
+    }
+
+
+def _summarize_window_errors(outcomes: list[WindowOutcome]) -> str:
+    # Bisected windows can keep some issues and still report an error; they count
+    # too so a partial review is never cached as complete.
+    failed = [outcome for outcome in outcomes if outcome.error]
+    if not failed:
+        return ""
+    return f"{len(failed)}/{len(outcomes)} GLM windows failed: {failed[0].error}"[:200]
+
+
+def _format_sse(event: str, payload: dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {jsonio.dumps(payload)}\n\n"
+
+
+class _JSONResponse(Response):
+    """JSON response rendered by :mod:`jsonio` (orjson when installed)."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return jsonio.dumps_bytes(content)
+
+
+class _IssueMerger:
+    """Adds normalized GLM issues window by window, as merge_issues would in one go."""
+
+    def __init__(self, base_issues: IssueTable) -> None:
+        self.issues = IssueTable()
+        self.issues.extend(base_issues)
+        self.glm_used = False
+        self._seen = set(base_issues.keys())
+        self._raw_count = 0
+
+    def add(self, raw_issues: list[dict[str, Any]]) -> list[dict[str, str]]:
+        normalized = normalize_glm_issues(raw_issues, start=self._raw_count)
+        self._raw_count += len(raw_issues)
+        self.glm_used = self.glm_used or bool(normalized)
+        added = [
+            issue
+            for issue in merge_issues([], normalized)
+            if (issue["type"], sentence_index(issue["sentence_id"])) not in self._seen
+        ]
+        self._seen.update((issue["type"], sentence_index(issue["sentence_id"])) for issue in added)
+        for issue in added:
+            self.issues.append_dict(issue)
+        return added
+
+
+class _AnalysisRun:
+    """One upload moving through parse, heuristics and GLM review.
+
+    ``events`` yields ``(name, payload)`` pairs as each stage finishes and leaves
+    the complete ``/api/analyze`` response in ``result``. Per-stage wall times
+    accumulate in ``timings`` (milliseconds) and end up in ``engine.timings_ms``.
+    """
+
+    def __init__(
+        self,
+        request: Request,
+        *,
+        filename: str,
+        upload: SpooledUpload,
+        base_url: str,
+        model: str,
+        api_key: str,
+        review_mode: str,
+        timings: dict[str, float] | None = None,
+        doc_id: str = "",
+    ) -> None:
+        self.started = time.perf_counter()
+        self.timings: dict[str, float] = dict(timings or {})
+        self.request = request
+        self.filename = filename
+        self.upload = upload
+        self.base_url = base_url
+        self.model = model
+        self.api_key = api_key
+        self.review_mode = review_mode
+        self.doc_id = doc_id
+        # Interactive requests are shed after this many seconds in an admission
+        # queue; ``None`` (jobs, batch members) waits for a slot instead.
+        self.admission_wait: float | None = _to_int_env(
+            "ADMISSION_MAX_WAIT_SECONDS", DEFAULT_ADMISSION_WAIT_SECONDS
+        )
+        self.corpus = _get_corpus_index(request)
+        self.cache_key = content_hash(
+            upload.sha256,
+            _engine_settings(
+                filename,
+                base_url,
+                model,
+                bool(api_key),
+                review_mode,
+                self.corpus.version,
+                _get_glm_router(request).fingerprint,
+            ),
+        )
+        # Filled by ``lookup_cache``, which keeps the disk tier off the event loop.
+        self.cached: dict[str, Any] | None = None
+        self.analysis: DocumentAnalysis | None = None
+        self.candidate_pairs: list[CandidatePair] = []
+        self.result: dict[str, Any] = {}
+
+    def _analyze_upload(self) -> DocumentAnalysis:
+        # Parser chunks stream straight into the sentence splitter; the document
+        # is never held as one string.
+        structure = LatexIndex()
+        chunks = timed_iter(
+            iter_upload_text(self.filename, self.upload.file, structure), self.timings, "parse"
+        )
+        return analyze_document(
+            chunks, timings=self.timings, corpus=self.corpus, structure=structure
+        )
+
+    async def lookup_cache(self) -> None:
+        self.cached = await _get_result_cache(self.request).aget(self.cache_key)
+        RESULT_CACHE.inc(result="miss" if self.cached is None else "hit")
+
+    async def parse(self) -> None:
+        try:
+            async with _get_parse_admission(self.request).slot(self.admission_wait) as waited:
+                record_stage(self.timings, "parse_queue", waited)
+                # Parsing and heuristics are CPU-bound; keep them off the event loop.
+                analysis = await asyncio.to_thread(self._analyze_upload)
+        except AdmissionRejected as exc:
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy. Please retry shortly.",
+                headers={"Retry-After": str(exc.retry_after)},
+            ) from exc
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        finally:
+            self.upload.close()
+
+        if not len(analysis.sentences):
+            raise HTTPException(status_code=400, detail="No readable text found in uploaded file.")
+        self.candidate_pairs = analysis.candidate_pairs
+        self.analysis = analysis
+
+    async def _glm_outcomes(
+        self, sentences: Sequence[dict[str, Any]], engine: dict[str, Any], ordered: bool
+    ) -> AsyncIterator[WindowOutcome]:
+        scope = f"{self.base_url.rstrip('/')}|{self.model.strip()}"
+        breaker = _get_glm_breakers(self.request).get(f"{scope}|{api_key_client(self.api_key)}")
+        router = _get_glm_router(self.request)
+        prompt, memo_scope = _review_prompt(self.review_mode, scope, router.fingerprint)
+        max_tokens = _glm_token_budget(self.model, prompt, router.routes)
+        if router:
+            engine["glm_routes"] = len(router.routes)
+        make_client = _glm_client_factory(
+            self.request,
+            api_key=self.api_key,
+            base_url=self.base_url,
+            model=self.model,
+            timeout=engine["glm_timeout_seconds"],
+            prompt=prompt,
+        )
+
+        if self.review_mode == "head":
+            outcome = await _review_head(make_client, sentences, max_tokens, breaker)
+            engine["glm_circuit"] = breaker.state
+            if outcome is not None:
+                engine["glm_input_sentences"] = len(outcome.window.sentences)
+                engine["glm_error"] = outcome.error
+                yield outcome
+            return
+
+        if self.review_mode == "pairs":
+            engine["glm_candidate_pairs"] = len(self.candidate_pairs)
+            windows = _build_glm_pair_windows(sentences, self.candidate_pairs, max_tokens)
+        else:
+            windows = _build_glm_windows(sentences, max_tokens)
+        engine["glm_windows"] = len(windows)
+        engine["glm_input_sentences"] = len({sid for window in windows for sid in window.sentence_ids})
+        outcomes: list[WindowOutcome] = []
+        async for outcome in iter_window_reviews(
+            make_client,
+            windows,
+            concurrency=_to_int_env("GLM_REVIEW_CONCURRENCY", DEFAULT_REVIEW_CONCURRENCY),
+            memo=_get_review_memo(self.request),
+            memo_scope=memo_scope,
+            policy=_glm_retry_policy(),
+            breaker=breaker,
+        ):
+            outcomes.append(outcome)
+            engine["glm_failed_windows"] += int(outcome.failed)
+            engine["glm_cached_windows"] += int(outcome.cached)
+            if not ordered:
+                yield outcome
+        engine["glm_error"] = _summarize_window_errors(outcomes)
+        engine["glm_circuit"] = breaker.state
+        if ordered:
+            for outcome in sorted(outcomes, key=lambda item: item.window.index):
+                yield outcome
+
+    def _llm_slot(self) -> AbstractAsyncContextManager[Any]:
+        return _get_llm_admission(self.request).slot(self.admission_wait)
+
+    def _finish_timings(self) -> dict[str, float]:
+        record_stage(self.timings, "total", time.perf_counter() - self.started)
+        return dict(self.timings)
+
+    async def _save_revision(self) -> dict[str, Any]:
+        # Stored after the cache write so cached results never carry a revision.
+        store = _get_analysis_store(self.request)
+        revision = await asyncio.to_thread(
+            store.save,
+            self.doc_id,
+            self.upload.sha256.hex(),
+            [sentence["text"] for sentence in self.result["sentences"]],
+            self.result["issues"],
+            self.filename,
+        )
+        self.result["document"] = {"id": self.doc_id, "revision": revision}
+        return {"document": self.result["document"]}
+
+    async def events(self, ordered: bool = True) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+        if self.cached is not None:
+            self.upload.close()
+            self.result = self.cached
+            self.result["engine"]["cache"] = "hit"
+            self.result["engine"]["timings_ms"] = self._finish_timings()
+            yield "sentences", {"sentences": self.result["sentences"]}
+            yield "issues", {"issues": self.result["issues"]}
+            if self.doc_id:
+                yield "document", await self._save_revision()
+            yield "engine", {"source": self.result["source"], "engine": self.result["engine"]}
+            return
+
+        if self.analysis is None:
+            await self.parse()
+        analysis = self.analysis
+        # The response is materialized from the columnar tables here, once.
+        result: dict[str, Any] = {"sentences": analysis.sentences.to_dicts()}
+        yield "sentences", {"sentences": result["sentences"]}
+        yield "issues", {"issues": analysis.issues.to_dicts()}
+
+        merger = _IssueMerger(analysis.issues)
+        engine: dict[str, Any] = {
+            "glm_enabled": bool(self.api_key),
+            "glm_attempted": False,
+            "glm_used": False,
+            "glm_timeout_seconds": _to_int_env("GLM_TIMEOUT_SECONDS", DEFAULT_GLM_TIMEOUT_SECONDS),
+            "glm_input_sentences": 0,
+            "glm_review_mode": self.review_mode,
+            "glm_windows": 0,
+            "glm_failed_windows": 0,
+            "glm_cached_windows": 0,
+            "glm_circuit": "closed",
+            "glm_error": "",
+            "base_url": self.base_url,
+            "model": self.model,
+            "cache": "miss",
+        }
+        if self.api_key:
+            engine["glm_attempted"] = True
+            llm_started = time.perf_counter()
+            llm_parse_seconds = 0.0
+            try:
+                # A shed review leaves the heuristic result, like an open circuit.
+                async with self._llm_slot():
+                    async for outcome in self._glm_outcomes(analysis.sentences, engine, ordered):
+                        llm_parse_seconds += outcome.parse_seconds
+                        added = merger.add(outcome.issues)
+                        yield "glm_issues", {
+                            "window": outcome.window.index,
+                            "cached": outcome.cached,
+                            "error": outcome.error if outcome.failed else "",
+                            "issues": added,
+                        }
+            except Exception as exc:
+                engine["glm_error"] = str(exc).strip()[:200]
+            # The histogram already observes every GLM call; the response reports
+            # the stage's wall time, which reflects window concurrency.
+            self.timings["llm_request"] = round((time.perf_counter() - llm_started) * 1000, 3)
+            self.timings["llm_parse"] = round(llm_parse_seconds * 1000, 3)
+
+        engine["glm_used"] = merger.glm_used
+        result["issues"] = merger.issues.to_dicts()
+        result["source"] = "hybrid" if merger.glm_used else "heuristic"
+        result["engine"] = engine
+        self.result = result
+        if not engine["glm_error"]:
+            # Failed LLM calls are not cached so the next upload gets another chance.
+            await _get_result_cache(self.request).aset(self.cache_key, result)
+        if self.doc_id:
+            yield "document", await self._save_revision()
+        engine["timings_ms"] = self._finish_timings()
+        yield "engine", {"source": result["source"], "engine": engine}
+
+
+async def _spool_request_file(file: UploadFile, timings: dict[str, float]) -> SpooledUpload:
+    started = time.perf_counter()
+    max_bytes = _to_int_env("UPLOAD_MAX_BYTES", DEFAULT_UPLOAD_MAX_BYTES)
+    try:
+        if isinstance(file.file, tempfile.SpooledTemporaryFile):
+            # The multipart parser has spooled the part already; take it over
+            # rather than copy it. The form closes its parts when the handler
+            # returns, before streamed and queued analyses read them, so it
+            # is left an empty placeholder to close instead.
+            upload = await asyncio.to_thread(adopt_spool, file.file, max_bytes)
+            file.file = tempfile.SpooledTemporaryFile()
+        else:
+            upload = await spool_upload(
+                file.read,
+                max_bytes=max_bytes,
+                memory_bytes=_to_int_env(
+                    "UPLOAD_SPOOL_MEMORY_BYTES", DEFAULT_UPLOAD_SPOOL_MEMORY_BYTES
+                ),
+            )
+    except ValueError as exc:
+        raise HTTPException(status_code=413, detail=str(exc)) from exc
+    if not upload.size:
+        upload.close()
+        raise HTTPException(status_code=400, detail="Uploaded file is empty.")
+    BYTES_INGESTED.inc(upload.size)
+    record_stage(timings, "upload", time.perf_counter() - started)
+    return upload
+
+
+def _check_api_key_rate(request: Request, api_key: str) -> None:
+    # Per-IP limits are charged by RateLimitMiddleware before the body is read;
+    # a caller-supplied key is also limited across all of its IPs.
+    if not api_key.strip():
+        return
+    retry_after = _get_rate_limiter(request).acquire(api_key_client(api_key.strip()))
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests. Please retry later.",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+
+async def _read_analysis_run(
+    request: Request,
+    file: UploadFile,
+    base_url: str,
+    model: str,
+    api_key: str,
+    review_mode: str,
+    doc_id: str = "",
+) -> _AnalysisRun:
+    _check_api_key_rate(request, api_key)
+    timings: dict[str, float] = {}
+    upload = await _spool_request_file(file, timings)
+    run = _AnalysisRun(
+        request,
+        filename=file.filename or "uploaded.txt",
+        upload=upload,
+        base_url=base_url,
+        model=model,
+        api_key=api_key.strip() or os.getenv("GLM_API_KEY", "").strip(),
+        review_mode=_resolve_review_mode(review_mode),
+        timings=timings,
+        doc_id=doc_id.strip(),
+    )
+    await run.lookup_cache()
+    return run
+
+
+async def _start_analysis(
+    request: Request,
+    file: UploadFile,
+    base_url: str,
+    model: str,
+    api_key: str,
+    review_mode: str,
+    doc_id: str = "",
+) -> _AnalysisRun:
+    run = await _read_analysis_run(
+        request, file, base_url, model, api_key, review_mode, doc_id
+    )
+    if run.cached is None:
+        # Parse before any response bytes are sent so upload errors stay plain HTTP 400s.
+        await run.parse()
+    return run
+
+
+async def _run_analysis_job(run: _AnalysisRun, job: Job) -> None:
+    job.result = {"sentences": [], "issues": [], "source": "running", "engine": {}}
+    async for name, payload in run.events(ordered=False):
+        if name == "sentences":
+            job.result["sentences"] = payload["sentences"]
+        elif name in {"issues", "glm_issues"}:
+            job.result["issues"].extend(payload["issues"])
+        elif name in {"document", "engine"}:
+            job.result.update(payload)
+        job.touch()
+    job.result = run.result
+
+
+class _BatchDocument(_AnalysisRun):
+    """A batch member whose GLM windows are reviewed together with its siblings.
+
+    ``_BatchAnalysis`` fills ``outcomes`` and ``glm_stats`` before ``events`` runs,
+    so the document's result has the same shape as a single ``/api/analyze``.
+    """
+
+    def __init__(self, request: Request, *, index: int, **kwargs: Any) -> None:
+        super().__init__(request, **kwargs)
+        self.admission_wait = None
+        self.index = index
+        self.outcomes: list[WindowOutcome] = []
+        self.pending_windows = 0
+        self.glm_stats: dict[str, Any] = {}
+
+    async def _glm_outcomes(
+        self, sentences: Sequence[dict[str, Any]], engine: dict[str, Any], ordered: bool
+    ) -> AsyncIterator[WindowOutcome]:
+        engine.update(self.glm_stats)
+        engine["glm_failed_windows"] = sum(int(outcome.failed) for outcome in self.outcomes)
+        engine["glm_cached_windows"] = sum(int(outcome.cached) for outcome in self.outcomes)
+        engine["glm_error"] = _summarize_window_errors(self.outcomes)
+        for outcome in sorted(self.outcomes, key=lambda item: item.window.index):
+            yield outcome
+
+    def _llm_slot(self) -> AbstractAsyncContextManager[Any]:
+        # The batch's shared windows were reviewed under one slot in ``_review``.
+        return nullcontext()
+
+
+class _BatchAnalysis:
+    """Several uploads parsed in parallel and reviewed through shared GLM windows.
+
+    ``entries`` yields one dict per document as soon as its result is final, in
+    completion order; ``index`` refers to the document's position in the batch.
+    """
+
+    def __init__(
+        self,
+        request: Request,
+        documents: list[_BatchDocument],
+        rejected: list[dict[str, Any]],
+        *,
+        base_url: str,
+        model: str,
+        api_key: str,
+        review_mode: str,
+    ) -> None:
+        self.request = request
+        self.documents = documents
+        self.rejected = rejected
+        self.base_url = base_url
+        self.model = model
+        self.api_key = api_key
+        self.review_mode = review_mode
+        self.started = time.perf_counter()
+        self.glm_requests = 0
+
+    async def _finish(self, doc: _BatchDocument) -> dict[str, Any]:
+        async for _event in doc.events(ordered=True):
+            pass
+        return {"index": doc.index, "filename": doc.filename, "status": "ok", "result": doc.result}
+
+    @staticmethod
+    def _failure(doc: _BatchDocument, exc: HTTPException) -> dict[str, Any]:
+        return {"index": doc.index, "filename": doc.filename, "status": "error", "detail": exc.detail}
+
+    async def _parse_all(
+        self, docs: list[_BatchDocument]
+    ) -> AsyncIterator[tuple[_BatchDocument, HTTPException | None]]:
+        slots = asyncio.Semaphore(
+            _to_int_env("BATCH_PARSE_CONCURRENCY", max(2, extraction_workers()))
+        )
+
+        async def parse(doc: _BatchDocument) -> tuple[_BatchDocument, HTTPException | None]:
+            async with slots:
+                try:
+                    await doc.parse()
+                except HTTPException as exc:
+                    return doc, exc
+            return doc, None
+
+        for task in asyncio.as_completed([parse(doc) for doc in docs]):
+            yield await task
+
+    def _review_sentences(
+        self, doc: _BatchDocument, max_tokens: int
+    ) -> Sequence[dict[str, Any]]:
+        sentences = doc.analysis.sentences if doc.analysis else []
+        if self.review_mode == "head":
+            return _build_glm_input_sentences(sentences, max_tokens)
+        if self.review_mode == "pairs":
+            return pair_review_sentences(sentences, doc.candidate_pairs)
+        return sentences
+
+    async def entries(self) -> AsyncIterator[dict[str, Any]]:
+        try:
+            for entry in self.rejected:
+                yield entry
+            to_parse: list[_BatchDocument] = []
+            for doc in self.documents:
+                if doc.cached is not None:
+                    yield await self._finish(doc)
+                else:
+                    to_parse.append(doc)
+
+            reviewed: list[_BatchDocument] = []
+            async for doc, error in self._parse_all(to_parse):
+                if error is not None:
+                    yield self._failure(doc, error)
+                elif self.api_key:
+                    reviewed.append(doc)
+                else:
+                    yield await self._finish(doc)
+
+            async for entry in self._review(sorted(reviewed, key=lambda doc: doc.index)):
+                yield entry
+        finally:
+            for doc in self.documents:
+                doc.upload.close()
+
+    async def _review(self, docs: list[_BatchDocument]) -> AsyncIterator[dict[str, Any]]:
+        if not docs:
+            return
+        scope = f"{self.base_url.rstrip('/')}|{self.model.strip()}"
+        router = _get_glm_router(self.request)
+        prompt, memo_scope = _review_prompt(self.review_mode, scope, router.fingerprint)
+        max_tokens = _glm_token_budget(self.model, prompt, router.routes)
+        windows = pack_documents(
+            [self._review_sentences(doc, max_tokens) for doc in docs],
+            max_tokens=max_tokens,
+            overlap=_to_non_negative_int_env("GLM_WINDOW_OVERLAP", DEFAULT_WINDOW_OVERLAP),
+            count_tokens=get_token_counter(),
+        )
+        self.glm_requests = len(windows)
+        window_docs: dict[int, set[int]] = {}
+        for window in windows:
+            owners = {split_document_sentence_id(item["id"])[0] for item in window.sentences}
+            window_docs[window.index] = owners
+            for position in owners:
+                docs[position].pending_windows += 1
+        for position, doc in enumerate(docs):
+            input_ids = {
+                item["id"]
+                for window in windows
+                for item in window.sentences
+                if split_document_sentence_id(item["id"])[0] == position
+            }
+            doc.glm_stats = {
+                "glm_windows": doc.pending_windows,
+                "glm_input_sentences": len(input_ids),
+                "glm_shared_windows": sum(
+                    1 for owners in window_docs.values() if position in owners and len(owners) > 1
+                ),
+            }
+            if not doc.pending_windows:
+                yield await self._finish(doc)
+
+        breaker = _get_glm_breakers(self.request).get(f"{scope}|{api_key_client(self.api_key)}")
+        make_client = _glm_client_factory(
+            self.request,
+            api_key=self.api_key,
+            base_url=self.base_url,
+            model=self.model,
+            timeout=_to_int_env("GLM_TIMEOUT_SECONDS", DEFAULT_GLM_TIMEOUT_SECONDS),
+            prompt=prompt,
+        )
+
+        async with _get_llm_admission(self.request).slot():
+            async for outcome in iter_window_reviews(
+                make_client,
+                windows,
+                concurrency=_to_int_env("GLM_REVIEW_CONCURRENCY", DEFAULT_REVIEW_CONCURRENCY),
+                memo=_get_review_memo(self.request),
+                memo_scope=memo_scope,
+                policy=_glm_retry_policy(),
+                breaker=breaker,
+            ):
+                for position, part in split_document_outcome(outcome).items():
+                    doc = docs[position]
+                    doc.outcomes.append(part)
+                    doc.pending_windows -= 1
+                    if doc.pending_windows == 0:
+                        doc.glm_stats["glm_circuit"] = breaker.state
+                        yield await self._finish(doc)
+
+    def summary(self, entries: list[dict[str, Any]]) -> dict[str, Any]:
+        succeeded = sum(1 for entry in entries if entry["status"] == "ok")
+        return {
+            "documents": len(entries),
+            "succeeded": succeeded,
+            "failed": len(entries) - succeeded,
+            "glm_requests": self.glm_requests,
+            "elapsed_ms": round((time.perf_counter() - self.started) * 1000, 3),
+        }
+
+
+async def _read_batch(
+    request: Request,
+    files: list[UploadFile],
+    base_url: str,
+    model: str,
+    api_key: str,
+    review_mode: str,
+) -> _BatchAnalysis:
+    _check_api_key_rate(request, api_key)
+    api_key = api_key.strip() or os.getenv("GLM_API_KEY", "").strip()
+    review_mode = _resolve_review_mode(review_mode)
+    max_documents = _to_int_env("BATCH_MAX_DOCUMENTS", DEFAULT_BATCH_MAX_DOCUMENTS)
+    uploads: list[tuple[str, SpooledUpload | None, str]] = []
+    # Spooled ZIP members not yet handed to ``add``.
+    members: list[tuple[str, SpooledUpload]] = []
+
+    def add(name: str, upload: SpooledUpload | None, error: str = "") -> None:
+        if len(uploads) >= max_documents:
+            if upload is not None:
+                upload.close()
+            raise HTTPException(
+                status_code=413, detail=f"Batch has more than {max_documents} documents."
+            )
+        uploads.append((name, upload, error))
+
+    def spool_members(upload: SpooledUpload) -> list[tuple[str, SpooledUpload]]:
+        spooled: list[tuple[str, SpooledUpload]] = []
+        try:
+            for entry in iter_zip_submissions(
+                upload.file,
+                memory_bytes=_to_int_env(
+                    "UPLOAD_SPOOL_MEMORY_BYTES", DEFAULT_UPLOAD_SPOOL_MEMORY_BYTES
+                ),
+            ):
+                spooled.append(entry)
+        except BaseException:
+            for _member_name, member in spooled:
+                member.close()
+            raise
+        return spooled
+
+    try:
+        for file in files:
+            name = file.filename or f"uploaded-{len(uploads) + 1}.txt"
+            try:
+                upload = await _spool_request_file(file, {})
+            except HTTPException as exc:
+                add(name, None, str(exc.detail))
+                continue
+            if Path(name).suffix.lower() != ".zip":
+                add(name, upload)
+                continue
+            # A ZIP in a batch is an archive of submissions: each member is a document.
+            try:
+                members = await asyncio.to_thread(spool_members, upload)
+            except ValueError as exc:
+                add(name, None, str(exc))
+                continue
+            finally:
+                upload.close()
+            if not members:
+                add(name, None, "No submissions found in uploaded ZIP.")
+            while members:
+                member_name, member = members.pop(0)
+                add(f"{name}/{member_name}", member)
+    except BaseException:
+        # A 413 (or a client gone mid-upload) releases every part spooled so far.
+        for _name, pending, _error in uploads:
+            if pending is not None:
+                pending.close()
+        for _member_name, member in members:
+            member.close()
+        raise
+
+    documents: list[_BatchDocument] = []
+    rejected: list[dict[str, Any]] = []
+    for index, (name, upload, error) in enumerate(uploads):
+        if upload is None:
+            rejected.append({"index": index, "filename": name, "status": "error", "detail": error})
+            continue
+        documents.append(
+            _BatchDocument(
+                request,
+                index=index,
+                filename=name,
+                upload=upload,
+                base_url=base_url,
+                model=model,
+                api_key=api_key,
+                review_mode=review_mode,
+            )
+        )
+        await documents[-1].lookup_cache()
+    return _BatchAnalysis(
+        request,
+        documents,
+        rejected,
+        base_url=base_url,
+        model=model,
+        api_key=api_key,
+        review_mode=review_mode,
+    )
+
+
 DEFAULT_CORS_ORIGINS = [
     "http://127.0.0.1:8090",
     "http://localhost:8090",
@@ -72,7 +1036,248 @@ DEFAULT_CORS_ORIGINS = [
 runtime_origins = _split_origins(os.getenv("CORS_ALLOW_ORIGINS", ""))
 cors_origins = sorted(set(DEFAULT_CORS_ORIGINS + runtime_origins))
 
-app = FastAPI(title="Paper Consistency Platform API", version="0.1.0")
+
+def _create_glm_pool() -> GLMConnectionPool:
+    return GLMConnectionPool(
+        max_connections=_to_int_env("GLM_MAX_CONNECTIONS", DEFAULT_GLM_MAX_CONNECTIONS),
+        max_in_flight=_to_int_env("GLM_MAX_IN_FLIGHT", DEFAULT_GLM_MAX_IN_FLIGHT),
+    )
+
+
+def _create_glm_router() -> ModelRouter:
+    return ModelRouter.from_env()
+
+
+def _create_tiered_cache(namespace: str, max_bytes_env: str) -> TieredCache:
+    return TieredCache(
+        namespace,
+        max_bytes=_to_non_negative_int_env(max_bytes_env, DEFAULT_CACHE_MAX_BYTES),
+        sqlite_path=os.getenv("RESULT_CACHE_PATH", "").strip() or None,
+        disk_max_bytes=_to_non_negative_int_env(
+            "RESULT_CACHE_DISK_MAX_BYTES", DEFAULT_CACHE_DISK_MAX_BYTES
+        ),
+        ttl_seconds=_to_non_negative_int_env(
+            "RESULT_CACHE_TTL_SECONDS", DEFAULT_CACHE_TTL_SECONDS
+        ),
+    )
+
+
+def _create_result_cache() -> TieredCache:
+    return _create_tiered_cache("analyze", "RESULT_CACHE_MAX_BYTES")
+
+
+def _create_review_memo() -> TieredCache:
+    return _create_tiered_cache("review-window", "REVIEW_MEMO_MAX_BYTES")
+
+
+def _create_glm_breakers() -> CircuitBreakerRegistry:
+    return CircuitBreakerRegistry(
+        failure_threshold=_to_int_env("GLM_BREAKER_FAILURES", DEFAULT_BREAKER_FAILURES),
+        reset_seconds=_to_int_env("GLM_BREAKER_RESET_SECONDS", DEFAULT_BREAKER_RESET_SECONDS),
+    )
+
+
+def _create_corpus_index() -> TermIndex:
+    return TermIndex(sqlite_path=os.getenv("CORPUS_INDEX_PATH", "").strip() or None)
+
+
+def _create_analysis_store() -> AnalysisStore:
+    return AnalysisStore(
+        sqlite_path=os.getenv("ANALYSIS_STORE_PATH", "").strip() or None,
+        max_revisions=_to_int_env("ANALYSIS_MAX_REVISIONS", DEFAULT_MAX_REVISIONS),
+    )
+
+
+def _create_job_manager() -> JobManager:
+    return JobManager(
+        JobStore(
+            sqlite_path=os.getenv("JOB_STORE_PATH", "").strip() or None,
+            max_retained=_to_int_env("JOB_MAX_RETAINED", DEFAULT_JOB_MAX_RETAINED),
+        ),
+        workers=_to_int_env("JOB_WORKERS", DEFAULT_JOB_WORKERS),
+        queue_size=_to_int_env("JOB_QUEUE_SIZE", DEFAULT_JOB_QUEUE_SIZE),
+    )
+
+
+# Touches the sentence splitter, rule matchers, claim and fingerprint code paths.
+WARMUP_TEXT = (
+    "Section 2 defines the threshold-voltage window [1]. The threshold voltage window is 1.2 V. "
+    "Higher temperature improves robustness (Fig. 3). Higher temperature reduces robustness."
+)
+
+
+def _preload_steps() -> list[WarmupStep]:
+    """Process-wide work that is safe to do before workers fork."""
+    return [
+        ("imports", preload_extractors),
+        ("rules", default_rule_engine),
+        ("tokenizer", get_token_counter),
+        ("analyzer", lambda: analyze_document(WARMUP_TEXT)),
+    ]
+
+
+def _warmup_steps(app: FastAPI) -> list[WarmupStep]:
+    async def open_glm_pool() -> None:
+        # The property creates the keep-alive client on the event loop.
+        app.state.glm_pool.client
+
+    def start_extraction_workers() -> int:
+        limit = _to_non_negative_int_env(
+            "WARMUP_EXTRACTION_WORKERS", DEFAULT_WARM_EXTRACTION_WORKERS
+        )
+        return warm_extraction_pool(limit)
+
+    return _preload_steps() + [
+        ("glm_pool", open_glm_pool),
+        ("extraction_pool", start_extraction_workers),
+    ]
+
+
+def _create_parse_admission() -> AdmissionPool:
+    return AdmissionPool(
+        "parse",
+        limit=_to_int_env("PARSE_MAX_CONCURRENCY", extraction_workers()),
+        queue_size=_to_non_negative_int_env("PARSE_QUEUE_SIZE", DEFAULT_QUEUE_SIZE),
+    )
+
+
+def _create_llm_admission() -> AdmissionPool:
+    return AdmissionPool(
+        "llm",
+        limit=_to_int_env("GLM_MAX_CONCURRENT_REVIEWS", DEFAULT_LLM_MAX_CONCURRENCY),
+        queue_size=_to_non_negative_int_env("GLM_REVIEW_QUEUE_SIZE", DEFAULT_QUEUE_SIZE),
+    )
+
+
+def _create_rate_limiter() -> RateLimiter:
+    return RateLimiter(
+        rate_per_minute=_to_non_negative_int_env(
+            "RATE_LIMIT_PER_MINUTE", DEFAULT_RATE_LIMIT_PER_MINUTE
+        ),
+        burst=_to_int_env("RATE_LIMIT_BURST", DEFAULT_RATE_LIMIT_BURST),
+    )
+
+
+def _create_warmup() -> Warmup:
+    return Warmup()
+
+
+APP_RESOURCE_FACTORIES: dict[str, Callable[[], Any]] = {
+    "glm_pool": _create_glm_pool,
+    "glm_breakers": _create_glm_breakers,
+    "glm_router": _create_glm_router,
+    "result_cache": _create_result_cache,
+    "review_memo": _create_review_memo,
+    "corpus_index": _create_corpus_index,
+    "analysis_store": _create_analysis_store,
+    "job_manager": _create_job_manager,
+    "warmup": _create_warmup,
+    "parse_admission": _create_parse_admission,
+    "llm_admission": _create_llm_admission,
+    "rate_limiter": _create_rate_limiter,
+}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    for name, factory in APP_RESOURCE_FACTORIES.items():
+        setattr(app.state, name, factory())
+    await app.state.job_manager.start()
+    mode = _warmup_mode()
+    if mode == "blocking":
+        await app.state.warmup.run(_warmup_steps(app))
+    elif mode == "background":
+        app.state.warmup.start(_warmup_steps(app))
+    else:
+        app.state.warmup.skip()
+    try:
+        yield
+    finally:
+        await app.state.warmup.stop()
+        await app.state.job_manager.stop()
+        app.state.job_manager.store.close()
+        await app.state.glm_pool.aclose()
+        app.state.result_cache.close()
+        app.state.review_memo.close()
+        app.state.corpus_index.close()
+        app.state.analysis_store.close()
+        shutdown_extraction_pool()
+        for name in APP_RESOURCE_FACTORIES:
+            setattr(app.state, name, None)
+
+
+def _app_resource(request: Request, name: str) -> Any:
+    resource = getattr(request.app.state, name, None)
+    if resource is None:
+        # Lifespan hooks did not run (e.g. a bare TestClient); create the resource on demand.
+        resource = APP_RESOURCE_FACTORIES[name]()
+        setattr(request.app.state, name, resource)
+    return resource
+
+
+def _get_glm_pool(request: Request) -> GLMConnectionPool:
+    return _app_resource(request, "glm_pool")
+
+
+def _get_glm_breakers(request: Request) -> CircuitBreakerRegistry:
+    return _app_resource(request, "glm_breakers")
+
+
+def _get_glm_router(request: Request) -> ModelRouter:
+    return _app_resource(request, "glm_router")
+
+
+def _get_result_cache(request: Request) -> TieredCache:
+    return _app_resource(request, "result_cache")
+
+
+def _get_review_memo(request: Request) -> TieredCache:
+    return _app_resource(request, "review_memo")
+
+
+def _get_corpus_index(request: Request) -> TermIndex:
+    return _app_resource(request, "corpus_index")
+
+
+def _get_analysis_store(request: Request) -> AnalysisStore:
+    return _app_resource(request, "analysis_store")
+
+
+def _get_job_manager(request: Request) -> JobManager:
+    return _app_resource(request, "job_manager")
+
+
+def _get_warmup(request: Request) -> Warmup:
+    return _app_resource(request, "warmup")
+
+
+def _get_parse_admission(request: Request) -> AdmissionPool:
+    return _app_resource(request, "parse_admission")
+
+
+def _get_llm_admission(request: Request) -> AdmissionPool:
+    return _app_resource(request, "llm_admission")
+
+
+def _get_rate_limiter(request: Request) -> RateLimiter:
+    return _app_resource(request, "rate_limiter")
+
+
+app = FastAPI(title="Paper Consistency Platform API", version="0.1.0", lifespan=lifespan)
+
+# Added before CORS so CORS stays outermost and 429s carry its headers.
+app.add_middleware(
+    RateLimitMiddleware,
+    limiter_for=lambda scope: _get_rate_limiter(Request(scope)),
+    paths=RATE_LIMITED_PATHS,
+    trusted_proxies=_to_non_negative_int_env("TRUST_FORWARDED_FOR", 0),
+)
+
+if _env_flag("WARMUP_PRELOAD"):
+    # With ``gunicorn --preload`` this runs once in the master and forked
+    # workers share the imported modules and compiled matchers.
+    for _name, _step in _preload_steps():
+        _step()
 
 app.add_middleware(
     CORSMiddleware,
@@ -173,7 +1378,13 @@ def root() -> str:
         </div>
         <ul>
           <li>分析接口: <code>POST /api/analyze</code></li>
+          <li>流式分析接口: <code>POST /api/analyze/stream</code></li>
+          <li>批量分析接口: <code>POST /api/analyze/batch</code></li>
+          <li>后台任务接口: <code>POST /api/jobs</code></li>
+          <li>术语语料库接口: <code>/api/corpus</code></li>
+          <li>修订对比接口: <code>GET /api/documents/{{id}}/diff</code></li>
           <li>状态接口: <code>GET /health</code></li>
+          <li>指标接口: <code>GET /metrics</code></li>
         </ul>
       </section>
     </main>
@@ -181,81 +1392,234 @@ def root() -> str:
 </html>"""
 
 
-@app.get("/health")
-def health() -> dict[str, str]:
-    return {"status": "ok"}
+@app.get("/health", response_model=None)
+def health(request: Request, ready: bool = False) -> dict[str, Any] | Response:
+    if not ready:
+        return {"status": "ok"}
+    # Readiness: 503 until this worker's warmup has finished.
+    warmup = _get_warmup(request)
+    if not warmup.ready:
+        return _JSONResponse({"status": "starting", "warmup": warmup.to_dict()}, status_code=503)
+    return {"status": "ok", "warmup": warmup.to_dict()}
+
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    return PlainTextResponse(
+        REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
-@app.post("/api/analyze")
+
+@app.post("/api/analyze", response_model=None)
 async def analyze(
+    request: Request,
     file: UploadFile = File(...),
     base_url: str = Form(DEFAULT_GLM_BASE_URL),
     model: str = Form(DEFAULT_GLM_MODEL),
     api_key: str = Form(""),
+    review_mode: str = Form(""),
+    doc_id: str = Form(""),
+) -> Response:
+    run = await _start_analysis(request, file, base_url, model, api_key, review_mode, doc_id)
+    async for _event in run.events(ordered=True):
+        pass
+    # The result is plain JSON data already; skip FastAPI's response validation.
+    return _JSONResponse(run.result)
+
+
+@app.post("/api/analyze/stream")
+async def analyze_stream(
+    request: Request,
+    file: UploadFile = File(...),
+    base_url: str = Form(DEFAULT_GLM_BASE_URL),
+    model: str = Form(DEFAULT_GLM_MODEL),
+    api_key: str = Form(""),
+    review_mode: str = Form(""),
+    doc_id: str = Form(""),
+) -> StreamingResponse:
+    run = await _start_analysis(request, file, base_url, model, api_key, review_mode, doc_id)
+
+    async def event_stream() -> AsyncIterator[str]:
+        async for name, payload in run.events(ordered=False):
+            yield _format_sse(name, payload)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/api/analyze/batch", response_model=None)
+async def analyze_batch(
+    request: Request,
+    files: list[UploadFile] = File(...),
+    base_url: str = Form(DEFAULT_GLM_BASE_URL),
+    model: str = Form(DEFAULT_GLM_MODEL),
+    api_key: str = Form(""),
+    review_mode: str = Form(""),
+    output: str = Form("json"),
+) -> dict[str, Any] | StreamingResponse:
+    batch = await _read_batch(request, files, base_url, model, api_key, review_mode)
+    ndjson = output.strip().lower() == "ndjson" or "application/x-ndjson" in request.headers.get(
+        "accept", ""
+    )
+
+    if ndjson:
+
+        async def lines() -> AsyncIterator[str]:
+            entries: list[dict[str, Any]] = []
+            async for entry in batch.entries():
+                entries.append(entry)
+                yield jsonio.dumps(entry) + "\n"
+            yield jsonio.dumps({"summary": batch.summary(entries)}) + "\n"
+
+        return StreamingResponse(
+            lines(),
+            media_type="application/x-ndjson",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    entries = [entry async for entry in batch.entries()]
+    return {
+        "documents": sorted(entries, key=lambda entry: entry["index"]),
+        "summary": batch.summary(entries),
+    }
+
+
+@app.get("/api/corpus")
+async def corpus_overview(request: Request) -> dict[str, Any]:
+    index = _get_corpus_index(request)
+    # Both wait on the index lock, which a document being indexed holds.
+    stats = await asyncio.to_thread(index.stats)
+    documents = await asyncio.to_thread(index.documents)
+    return {"stats": stats, "documents": documents}
+
+
+@app.post("/api/corpus/documents", status_code=201)
+async def add_corpus_document(
+    request: Request,
+    file: UploadFile = File(...),
+    doc_id: str = Form(""),
 ) -> dict[str, Any]:
-    content = await file.read()
-    if not content:
-        raise HTTPException(status_code=400, detail="Uploaded file is empty.")
+    upload = await _spool_request_file(file, {})
+    filename = file.filename or "uploaded.txt"
+    doc_id = doc_id.strip() or filename
+    index = _get_corpus_index(request)
+
+    def index_upload() -> tuple[int, int]:
+        chunks = iter_upload_text(filename, upload.file)
+        sentences = [record.text for record in iter_sentences(chunks)]
+        if not sentences:
+            raise ValueError("No readable text found in uploaded file.")
+        return len(sentences), index.add_document(doc_id, sentences, title=filename)
 
     try:
-        text = parse_file_bytes(file.filename or "uploaded.txt", content)
+        sentence_count, term_count = await asyncio.to_thread(index_upload)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+    finally:
+        upload.close()
+    return {
+        "doc_id": doc_id,
+        "sentences": sentence_count,
+        "terms": term_count,
+        "version": index.version,
+    }
 
-    if not text.strip():
-        raise HTTPException(status_code=400, detail="No readable text found in uploaded file.")
 
-    result = analyze_text(text)
+@app.delete("/api/corpus/documents/{doc_id:path}")
+async def remove_corpus_document(request: Request, doc_id: str) -> dict[str, Any]:
+    index = _get_corpus_index(request)
+    if not await asyncio.to_thread(index.remove_document, doc_id):
+        raise HTTPException(status_code=404, detail="Corpus document not found.")
+    return {"doc_id": doc_id, "removed": True, "version": index.version}
 
-    runtime_api_key = api_key.strip() or os.getenv("GLM_API_KEY", "").strip()
-    glm_used = False
-    glm_attempted = False
-    glm_error = ""
-    glm_timeout_seconds = _to_int_env("GLM_TIMEOUT_SECONDS", DEFAULT_GLM_TIMEOUT_SECONDS)
-    glm_input_sentences = 0
-    if runtime_api_key:
-        glm_attempted = True
-        try:
-            review_sentences = _build_glm_input_sentences(result["sentences"])
-            glm_input_sentences = len(review_sentences)
-            if review_sentences:
-                client = GLMClient(
-                    api_key=runtime_api_key,
-                    base_url=base_url,
-                    model=model,
-                    timeout=glm_timeout_seconds,
-                )
-                raw_glm_issues = client.review(review_sentences)
-                if not raw_glm_issues and client.last_error:
-                    # Retry once with a much smaller slice to improve robustness on large uploads.
-                    retry_sentences = review_sentences[:20]
-                    retry_client = GLMClient(
-                        api_key=runtime_api_key,
-                        base_url=base_url,
-                        model=model,
-                        timeout=glm_timeout_seconds,
-                    )
-                    raw_glm_issues = retry_client.review(retry_sentences)
-                    glm_input_sentences = len(retry_sentences)
-                    glm_error = retry_client.last_error
-                else:
-                    glm_error = client.last_error
-                glm_issues = normalize_glm_issues(raw_glm_issues)
-                if glm_issues:
-                    result["issues"] = merge_issues(result["issues"], glm_issues)
-                    glm_used = True
-        except Exception as exc:  # pragma: no cover - protective fallback
-            glm_error = str(exc).strip()[:200]
-
-    result["source"] = "hybrid" if glm_used else "heuristic"
-    result["engine"] = {
-        "glm_enabled": bool(runtime_api_key),
-        "glm_attempted": glm_attempted,
-        "glm_used": glm_used,
-        "glm_timeout_seconds": glm_timeout_seconds,
-        "glm_input_sentences": glm_input_sentences,
-        "glm_error": glm_error,
-        "base_url": base_url,
-        "model": model,
-    }
-    return result
+
+@app.get("/api/documents")
+async def list_documents(request: Request) -> dict[str, Any]:
+    return {"documents": await asyncio.to_thread(_get_analysis_store(request).documents)}
+
+
+# Registered before the catch-all ``{doc_id:path}`` route so ``/diff`` is not read as an id.
+@app.get("/api/documents/{doc_id:path}/diff", response_model=None)
+async def diff_document(
+    request: Request,
+    doc_id: str,
+    from_revision: int | None = Query(None, alias="from"),
+    to_revision: int | None = Query(None, alias="to"),
+) -> Response:
+    store = _get_analysis_store(request)
+    if to_revision is None:
+        to_revision = await asyncio.to_thread(store.latest_revision, doc_id)
+        if to_revision is None:
+            raise HTTPException(status_code=404, detail="Document not found.")
+    if from_revision is None:
+        from_revision = max(1, to_revision - 1)
+    old, new = await asyncio.gather(
+        asyncio.to_thread(store.load, doc_id, from_revision),
+        asyncio.to_thread(store.load, doc_id, to_revision),
+    )
+    if old is None or new is None:
+        raise HTTPException(status_code=404, detail="Document revision not found.")
+    return _JSONResponse(await asyncio.to_thread(diff_revisions, old, new))
+
+
+@app.get("/api/documents/{doc_id:path}")
+async def get_document(request: Request, doc_id: str) -> dict[str, Any]:
+    revisions = await asyncio.to_thread(_get_analysis_store(request).revisions, doc_id)
+    if not revisions:
+        raise HTTPException(status_code=404, detail="Document not found.")
+    return {"doc_id": doc_id, "revisions": revisions}
+
+
+@app.delete("/api/documents/{doc_id:path}")
+async def remove_document(request: Request, doc_id: str) -> dict[str, Any]:
+    if not await asyncio.to_thread(_get_analysis_store(request).remove, doc_id):
+        raise HTTPException(status_code=404, detail="Document not found.")
+    return {"doc_id": doc_id, "removed": True}
+
+
+@app.post("/api/jobs", status_code=202)
+async def create_job(
+    request: Request,
+    file: UploadFile = File(...),
+    base_url: str = Form(DEFAULT_GLM_BASE_URL),
+    model: str = Form(DEFAULT_GLM_MODEL),
+    api_key: str = Form(""),
+    review_mode: str = Form(""),
+    doc_id: str = Form(""),
+) -> dict[str, Any]:
+    run = await _read_analysis_run(
+        request, file, base_url, model, api_key, review_mode, doc_id
+    )
+    # The job queue already bounds waiting work; workers wait for admission.
+    run.admission_wait = None
+    try:
+        job = _get_job_manager(request).submit(
+            lambda job: _run_analysis_job(run, job), cleanup=run.upload.close
+        )
+    except QueueFullError as exc:
+        run.upload.close()
+        raise HTTPException(
+            status_code=429,
+            detail="Analysis queue is full. Please retry shortly.",
+            headers={"Retry-After": "5"},
+        ) from exc
+    return {"id": job.id, "status": job.status}
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(request: Request, job_id: str) -> dict[str, Any]:
+    job = _get_job_manager(request).get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job.to_dict()
+
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(request: Request, job_id: str) -> dict[str, Any]:
+    job = _get_job_manager(request).cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return {"id": job.id, "status": job.status}
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+import hashlib
+import math
+import threading
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from starlette.responses import JSONResponse
+
+from app.services.metrics import ADMISSION_REJECTED, RATE_LIMITED
+
+
+DEFAULT_QUEUE_SIZE = 16
+DEFAULT_ADMISSION_WAIT_SECONDS = 10
+DEFAULT_LLM_MAX_CONCURRENCY = 8
+DEFAULT_RATE_LIMIT_PER_MINUTE = 0
+DEFAULT_RATE_LIMIT_BURST = 10
+DEFAULT_RATE_LIMIT_MAX_CLIENTS = 10_000
+# Weight of the newest sample in a pool's moving average of slot hold times.
+SERVICE_TIME_ALPHA = 0.2
+
+
+class AdmissionRejected(Exception):
+    """A request shed by an ``AdmissionPool``; ``retry_after`` is in whole seconds."""
+
+    def __init__(self, pool: str, retry_after: int) -> None:
+        super().__init__(f"Server is busy ({pool}). Please retry in {retry_after}s.")
+        self.pool = pool
+        self.retry_after = retry_after
+
+
+class AdmissionPool:
+    """Bounded concurrency with a short FIFO wait queue and deadline-aware shedding.
+
+    ``slot(max_wait)`` runs at most ``limit`` holders at once. A caller that
+    has to wait is rejected straight away when ``queue_size`` callers already
+    wait or when the expected wait (queue rounds times the average hold time)
+    exceeds ``max_wait``, and after ``max_wait`` seconds otherwise, so a
+    request that would miss its deadline gives its place back early.
+    ``max_wait=None`` waits as long as needed and is never shed.
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int = DEFAULT_QUEUE_SIZE) -> None:
+        self.name = name
+        self.limit = max(1, limit)
+        self.queue_size = max(0, queue_size)
+        self.active = 0
+        self.service_seconds = 0.0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def expected_wait(self) -> float:
+        return (self.waiting // self.limit + 1) * self.service_seconds
+
+    def _reject(self) -> AdmissionRejected:
+        ADMISSION_REJECTED.inc(pool=self.name)
+        return AdmissionRejected(self.name, max(1, math.ceil(self.expected_wait())))
+
+    async def _acquire(self, max_wait: float | None) -> None:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return
+        if max_wait is not None and (
+            self.waiting >= self.queue_size or self.expected_wait() > max_wait
+        ):
+            raise self._reject()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, max_wait)
+        except asyncio.TimeoutError:
+            raise self._reject() from None
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the caller went away.
+                self._release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def _release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self, max_wait: float | None = None) -> AsyncIterator[float]:
+        """Holds a slot; yields the seconds spent waiting for it."""
+        started = time.perf_counter()
+        await self._acquire(max_wait)
+        admitted = time.perf_counter()
+        try:
+            yield admitted - started
+        finally:
+            held = time.perf_counter() - admitted
+            self.service_seconds += SERVICE_TIME_ALPHA * (held - self.service_seconds)
+            self._release()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": self.waiting,
+            "service_ms": round(self.service_seconds * 1000, 3),
+        }
+
+
+def api_key_client(api_key: str) -> str:
+    """Rate-limit key for an API key; the key itself is never stored."""
+    return "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+class RateLimiter:
+    """Token buckets per client: ``rate_per_minute`` refill, ``burst`` capacity.
+
+    Buckets of the ``max_clients`` most recently seen clients are kept; an
+    evicted client starts again with a full bucket. A rate of 0 disables
+    limiting.
+    """
+
+    def __init__(
+        self,
+        rate_per_minute: float = DEFAULT_RATE_LIMIT_PER_MINUTE,
+        burst: int = DEFAULT_RATE_LIMIT_BURST,
+        max_clients: int = DEFAULT_RATE_LIMIT_MAX_CLIENTS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rate = max(0.0, rate_per_minute) / 60.0
+        self.burst = max(1, burst)
+        self.max_clients = max(1, max_clients)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def __bool__(self) -> bool:
+        return self.rate > 0
+
+    def acquire(self, client: str) -> float:
+        """Takes a token for ``client``: 0.0 when allowed, else seconds until one refills."""
+        if not self:
+            return 0.0
+        now = self._clock()
+        with self._lock:
+            tokens, updated = self._buckets.pop(client, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            self._buckets[client] = (tokens, now)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        if allowed:
+            return 0.0
+        RATE_LIMITED.inc(by=client.split(":", 1)[0])
+        return (1.0 - tokens) / self.rate
+
+
+def client_address(scope: dict[str, Any], trusted_proxies: int = 0) -> str:
+    """The caller's IP, as seen by the outermost of ``trusted_proxies`` proxies.
+
+    Each proxy appends the address it received the request from to
+    ``X-Forwarded-For``, so only the last ``trusted_proxies`` hops can be
+    trusted; anything left of them is whatever the client sent.
+    """
+    if trusted_proxies > 0:
+        hops = [
+            hop.strip()
+            for name, value in scope.get("headers", [])
+            if name == b"x-forwarded-for"
+            for hop in value.decode("latin-1").split(",")
+        ]
+        hops = [hop for hop in hops if hop]
+        if hops:
+            return hops[max(0, len(hops) - trusted_proxies)]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def rate_limited_response(retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        {"detail": "Too many requests. Please retry later."},
+        status_code=429,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class RateLimitMiddleware:
+    """Charges one token per ``POST`` to ``paths`` by client IP, before the body is read.
+
+    Rejected uploads are answered 429 without receiving their (possibly
+    large) body. ``limiter_for`` returns the app's limiter for a scope.
+    """
+
+    def __init__(
+        self,
+        app: Callable[..., Awaitable[None]],
+        *,
+        limiter_for: Callable[[dict[str, Any]], RateLimiter],
+        paths: tuple[str, ...],
+        trusted_proxies: int = 0,
+    ) -> None:
+        self.app = app
+        self.limiter_for = limiter_for
+        self.paths = paths
+        self.trusted_proxies = trusted_proxies
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] == "http" and scope["method"] == "POST" and scope["path"] in self.paths:
+            client = "ip:" + client_address(scope, self.trusted_proxies)
+            retry_after = self.limiter_for(scope).acquire(client)
+            if retry_after:
+                await rate_limited_response(retry_after)(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
@@ -1,146 +1,323 @@
 from __future__ import annotations
 
+from dataclasses import dataclass, field
+from itertools import chain
 import re
-from typing import Any
+import time
+from typing import Any, Iterable, Iterator, NamedTuple, Sequence
 
+from app.services.claims import DEFAULT_CLAIM_MAX_ISSUES, find_conflicts, index_claims
+from app.services.corpus import (
+    DEFAULT_CORPUS_MAX_ISSUES,
+    DEFAULT_CORPUS_MIN_DOCUMENTS,
+    TermIndex,
+    extract_terms,
+)
+from app.services.fingerprints import (
+    KIND_DUPLICATE,
+    KIND_POLARITY,
+    CandidatePair,
+    find_candidate_pairs,
+    sentence_features,
+)
+from app.services.latex import LatexIndex
+from app.services.metrics import record_stage, stage_timer
+from app.services.rules import FigureCaptionRule, default_rule_engine
+from app.services.tables import IssueTable, SentenceTable, sentence_id, sentence_index
+
+
+DEFAULT_STRUCTURE_MAX_ISSUES = 50
+
+# Bump whenever heuristic rule semantics change so cached analysis results are invalidated.
+HEURISTIC_RULE_VERSION = "7"
 
 SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?。！？])\s+")
+WHITESPACE_RE = re.compile(r"\s+")
+# Longest unfinished sentence buffered while streaming before it is split anyway.
+SENTENCE_MAX_CHARS = 20_000
+
+
+class SentenceRecord(NamedTuple):
+    index: int
+    text: str
+    start: int
+    end: int
+
+
+def iter_sentences(chunks: Iterable[str]) -> Iterator[SentenceRecord]:
+    """Split streamed text into sentences without materializing the document.
+
+    ``start``/``end`` are character offsets into the concatenated chunks, and
+    ``text`` has whitespace collapsed exactly like :func:`split_sentences`.
+    Only the unfinished tail sentence is buffered between chunks, and each
+    character is scanned for a boundary once. A tail growing past
+    ``SENTENCE_MAX_CHARS`` without a boundary is split at whitespace before the cap.
+    """
+    carry = ""
+    carry_offset = 0
+    # Where matching resumes in ``carry``: text before it holds no boundary.
+    scan_from = 0
+    index = 0
+
+    def emit(raw: str, offset: int) -> SentenceRecord | None:
+        nonlocal index
+        stripped = raw.lstrip()
+        if not stripped:
+            return None
+        start = offset + len(raw) - len(stripped)
+        stripped = stripped.rstrip()
+        text = WHITESPACE_RE.sub(" ", stripped)
+        index += 1
+        return SentenceRecord(index - 1, text, start, start + len(stripped))
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        buffer = carry + chunk
+        consumed = 0
+        resume = len(buffer)
+        for match in SENTENCE_SPLIT_RE.finditer(buffer, scan_from):
+            if match.end() == len(buffer):
+                # The whitespace run may continue in the next chunk.
+                resume = match.start()
+                break
+            record = emit(buffer[consumed : match.start()], carry_offset + consumed)
+            if record is not None:
+                yield record
+            consumed = match.end()
+        carry = buffer[consumed:]
+        carry_offset += consumed
+        scan_from = resume - consumed
+
+        while len(carry) > SENTENCE_MAX_CHARS:
+            cut = max(
+                carry.rfind(" ", 0, SENTENCE_MAX_CHARS), carry.rfind("\n", 0, SENTENCE_MAX_CHARS)
+            )
+            if cut <= 0:
+                cut = SENTENCE_MAX_CHARS
+            record = emit(carry[:cut], carry_offset)
+            if record is not None:
+                yield record
+            carry = carry[cut:]
+            carry_offset += cut
+            scan_from = max(0, scan_from - cut)
+
+    record = emit(carry, carry_offset)
+    if record is not None:
+        yield record
 
 
 def split_sentences(text: str) -> list[str]:
-    cleaned = re.sub(r"\s+", " ", text).strip()
-    if not cleaned:
-        return []
-    parts = SENTENCE_SPLIT_RE.split(cleaned)
-    return [part.strip() for part in parts if part.strip()]
-
-
-def _make_issue(
-    issue_id: str,
-    issue_type: str,
-    severity: str,
-    sentence_id: str,
-    title: str,
-    detail: str,
-) -> dict[str, str]:
-    return {
-        "id": issue_id,
-        "type": issue_type,
-        "severity": severity,
-        "sentence_id": sentence_id,
-        "title": title,
-        "detail": detail,
-    }
-
-
-def detect_heuristic_issues(sentences: list[str]) -> list[dict[str, str]]:
-    issues: list[dict[str, str]] = []
-    lower_sentences = [sentence.lower() for sentence in sentences]
-    sid = lambda idx: f"s-{idx + 1}"
-
-    term_idx_a = next(
-        (
-            idx
-            for idx, sentence in enumerate(lower_sentences)
-            if "threshold voltage window" in sentence
-        ),
-        None,
-    )
-    term_idx_b = next(
-        (
-            idx
-            for idx, sentence in enumerate(lower_sentences)
-            if "switching threshold bandwidth" in sentence
-        ),
-        None,
-    )
-    if term_idx_a is not None and term_idx_b is not None:
+    return [record.text for record in iter_sentences([text])]
+
+
+def detect_heuristic_issues(
+    sentences: Sequence[str], structure: LatexIndex | None = None
+) -> IssueTable:
+    # With a LaTeX index, captions are compared with the sentences that reference
+    # them (detect_structure_issues) instead of keyword-scanning for "caption".
+    exclude = (FigureCaptionRule,) if structure else ()
+    issues = IssueTable()
+    counters: dict[str, int] = {}
+    for hit in default_rule_engine().evaluate(sentences, exclude=exclude):
+        counters[hit.id_prefix] = counters.get(hit.id_prefix, 0) + 1
         issues.append(
-            _make_issue(
-                issue_id="h-term-1",
-                issue_type="term",
-                severity="medium",
-                sentence_id=sid(term_idx_b),
-                title="Terminology Drift",
-                detail=(
-                    "The concept name changes from 'threshold voltage window' "
-                    "to 'switching threshold bandwidth'."
-                ),
-            )
+            issue_id=f"h-{hit.id_prefix}-{counters[hit.id_prefix]}",
+            issue_type=hit.issue_type,
+            severity=hit.severity,
+            sentence=hit.sentence_index,
+            title=hit.title,
+            detail=hit.detail,
         )
+    return issues
 
-    improve_idx = next(
-        (
-            idx
-            for idx, sentence in enumerate(lower_sentences)
-            if ("improve" in sentence or "higher robustness" in sentence)
-            and "robust" in sentence
-        ),
-        None,
-    )
-    reduce_idx = next(
-        (
-            idx
-            for idx, sentence in enumerate(lower_sentences)
-            if ("reduce" in sentence or "lower robustness" in sentence)
-            and "robust" in sentence
-        ),
-        None,
-    )
-    if improve_idx is not None and reduce_idx is not None and improve_idx != reduce_idx:
-        issues.append(
-            _make_issue(
-                issue_id="h-logic-1",
-                issue_type="logic",
-                severity="high",
-                sentence_id=sid(reduce_idx),
-                title="Logic Conflict",
-                detail=(
-                    "One sentence claims robustness improves while another says it decreases."
-                ),
+
+def detect_structure_issues(
+    sentences: Sequence[str],
+    starts: Sequence[int],
+    structure: LatexIndex,
+    max_issues: int = DEFAULT_STRUCTURE_MAX_ISSUES,
+) -> IssueTable:
+    """Cross-reference checks from a LaTeX label/ref/caption index.
+
+    ``starts`` are the sentences' character offsets. Flags captions whose trend
+    contradicts a sentence that references the float, references to labels
+    that are never defined, and figures or tables that are never referenced.
+    """
+    hits: list[tuple[int, str, str, str]] = []
+    referenced: set[str] = set()
+    conflicting: set[int] = set()
+    for key, offset in structure.refs:
+        ref_idx = structure.sentence_at(starts, offset)
+        target = structure.labels.get(key)
+        if target is None:
+            if key not in referenced:
+                detail = f"'{key}' is referenced but never labelled."
+                hits.append((ref_idx, "medium", "Undefined reference", detail))
+            referenced.add(key)
+            continue
+        referenced.add(key)
+        if target.caption_offset is None:
+            continue
+        caption_idx = structure.sentence_at(starts, target.caption_offset)
+        if caption_idx == ref_idx or caption_idx in conflicting:
+            continue
+        caption = sentence_features(sentences[caption_idx])
+        claim = sentence_features(sentences[ref_idx])
+        if caption.polarity * claim.polarity < 0 and caption.tokens & claim.tokens:
+            conflicting.add(caption_idx)
+            hits.append(
+                (
+                    caption_idx,
+                    "high",
+                    "Figure Caption Conflict",
+                    f"{sentence_id(ref_idx)} describes the opposite trend to this {target.kind} caption.",
+                )
             )
+    for key, target in structure.labels.items():
+        if target.kind in ("figure", "table") and key not in referenced:
+            anchor = target.caption_offset if target.caption_offset is not None else target.offset
+            hits.append(
+                (
+                    structure.sentence_at(starts, anchor),
+                    "low",
+                    f"Unreferenced {target.kind}",
+                    f"'{key}' is never referenced in the text.",
+                )
+            )
+
+    issues = IssueTable()
+    for number, (index, severity, title, detail) in enumerate(
+        sorted(hits, key=lambda hit: hit[0])[:max_issues], start=1
+    ):
+        issues.append(f"h-ref-{number}", "citation_figure", severity, index, title, detail)
+    return issues
+
+
+def detect_corpus_issues(
+    sentences: Sequence[str],
+    corpus: TermIndex,
+    min_documents: int = DEFAULT_CORPUS_MIN_DOCUMENTS,
+    max_issues: int = DEFAULT_CORPUS_MAX_ISSUES,
+) -> IssueTable:
+    """Flag terms written differently from how the indexed corpus writes them.
+
+    One index lookup per distinct term; a variant is reported when the corpus
+    form is used by at least ``min_documents`` documents and by at least twice
+    as many as the form used here.
+    """
+    first_seen: dict[str, dict[str, int]] = {}
+    for index, sentence in enumerate(sentences):
+        for term in extract_terms(sentence, index):
+            first_seen.setdefault(term.canonical, {}).setdefault(term.surface, index)
+    if not first_seen:
+        return IssueTable()
+
+    hits: list[tuple[int, str, str, int]] = []
+    for canonical, counts in corpus.surface_counts(first_seen).items():
+        preferred, preferred_docs = max(counts.items(), key=lambda item: (item[1], item[0]))
+        if preferred_docs < min_documents:
+            continue
+        for surface, index in first_seen[canonical].items():
+            if surface != preferred and counts.get(surface, 0) * 2 <= preferred_docs:
+                hits.append((index, surface, preferred, preferred_docs))
+
+    kept: list[tuple[int, str, str, int]] = []
+    flagged: dict[int, list[str]] = {}
+    # Longest variants first, so "threshold-voltage window" hides the
+    # "threshold-voltage" hit inside it on the same sentence.
+    for index, surface, preferred, preferred_docs in sorted(
+        hits, key=lambda hit: (-len(hit[1]), hit[0], hit[1])
+    ):
+        if any(surface in longer for longer in flagged.get(index, [])):
+            continue
+        flagged.setdefault(index, []).append(surface)
+        kept.append((index, surface, preferred, preferred_docs))
+        if len(kept) >= max_issues:
+            break
+
+    issues = IssueTable()
+    for number, (index, surface, preferred, preferred_docs) in enumerate(sorted(kept), start=1):
+        issues.append(
+            issue_id=f"h-corpus-{number}",
+            issue_type="term",
+            severity="low",
+            sentence=index,
+            title="Terminology differs from corpus",
+            detail=f"'{surface}' is written '{preferred}' in {preferred_docs} indexed documents.",
         )
+    return issues
 
-    figure_claim_idx = next(
-        (
-            idx
-            for idx, sentence in enumerate(lower_sentences)
-            if "figure" in sentence and "improve" in sentence and "robust" in sentence
-        ),
-        None,
-    )
-    caption_conflict_idx = next(
-        (
-            idx
-            for idx, sentence in enumerate(lower_sentences)
-            if "caption" in sentence and "reduce" in sentence and "robust" in sentence
-        ),
-        None,
-    )
-    if figure_claim_idx is not None and caption_conflict_idx is not None:
+
+def detect_numeric_issues(
+    sentences: Sequence[str], max_issues: int = DEFAULT_CLAIM_MAX_ISSUES
+) -> IssueTable:
+    """Flag a quantity restated with another value, e.g. accuracy 92.3% vs 91.8%.
+
+    One regex pass per sentence builds a subject index, so the check is linear
+    in the document and runs on every upload before any LLM call.
+    """
+    conflicts = find_conflicts(index_claims(sentences))[:max_issues]
+    issues = IssueTable()
+    for number, (first, later) in enumerate(conflicts, start=1):
         issues.append(
-            _make_issue(
-                issue_id="h-cite-1",
-                issue_type="citation_figure",
-                severity="high",
-                sentence_id=sid(caption_conflict_idx),
-                title="Figure Caption Conflict",
-                detail=(
-                    "Main text and figure caption describe opposite robustness trends."
-                ),
-            )
+            issue_id=f"h-numeric-{number}",
+            issue_type="numeric",
+            severity="medium",
+            sentence=later.sentence_index,
+            title="Inconsistent numeric claim",
+            detail=(
+                f"'{later.subject}' is {later.text} here but {first.text} "
+                f"in {sentence_id(first.sentence_index)}."
+            ),
         )
+    return issues
+
+
+PAIR_ISSUES = {
+    KIND_POLARITY: (
+        "medium",
+        "Possible contradiction",
+        "States the opposite trend to {other} on the same subject.",
+    ),
+    KIND_DUPLICATE: ("low", "Near-duplicate sentence", "Repeats {other} almost verbatim."),
+}
+
 
+def detect_pair_issues(pairs: list[CandidatePair]) -> IssueTable:
+    """One issue per candidate pair, placed on the later sentence.
+
+    Numeric pairs are left to :func:`detect_numeric_issues`, which compares
+    the quantities themselves, so a conflict is reported once. Opposite trends
+    are only reported between sentences with the same subject tokens: a pair
+    that also differs in a dataset or a model may be about another setting,
+    and is left to the GLM ``pairs`` review.
+    """
+    issues = IssueTable()
+    for pair in pairs:
+        if pair.kind not in PAIR_ISSUES:
+            continue
+        if pair.kind == KIND_POLARITY and pair.similarity < 1.0:
+            continue
+        severity, title, detail = PAIR_ISSUES[pair.kind]
+        issues.append(
+            issue_id=f"h-pair-{len(issues) + 1}",
+            issue_type="logic",
+            severity=severity,
+            sentence=pair.second,
+            title=title,
+            detail=detail.format(other=sentence_id(pair.first)),
+        )
     return issues
 
 
 def merge_issues(
-    base_issues: list[dict[str, str]], glm_issues: list[dict[str, str]]
+    base_issues: Iterable[dict[str, str]], glm_issues: Iterable[dict[str, str]]
 ) -> list[dict[str, str]]:
     seen: set[tuple[str, str]] = set()
     merged: list[dict[str, str]] = []
 
-    for issue in base_issues + glm_issues:
+    for issue in chain(base_issues, glm_issues):
         key = (issue.get("type", ""), issue.get("sentence_id", ""))
         if key in seen:
             continue
@@ -149,16 +326,19 @@ def merge_issues(
     return merged
 
 
-def normalize_glm_issues(raw_issues: list[dict[str, Any]]) -> list[dict[str, str]]:
+def normalize_glm_issues(
+    raw_issues: list[dict[str, Any]], start: int = 0
+) -> list[dict[str, str]]:
     normalized: list[dict[str, str]] = []
-    for idx, issue in enumerate(raw_issues):
+    for idx, issue in enumerate(raw_issues, start=start):
         sentence_id = str(issue.get("sentence_id", "")).strip()
         issue_type = str(issue.get("type", "")).strip() or "logic"
         severity = str(issue.get("severity", "")).strip().lower() or "medium"
         title = str(issue.get("title", "")).strip() or "LLM Review Issue"
         detail = str(issue.get("detail", "")).strip() or "Detected by LLM review."
 
-        if not sentence_id.startswith("s-"):
+        # Anything else cannot be anchored to a sentence of the document.
+        if sentence_index(sentence_id) < 0:
             continue
         if severity not in {"low", "medium", "high"}:
             severity = "medium"
@@ -178,12 +358,74 @@ def normalize_glm_issues(raw_issues: list[dict[str, Any]]) -> list[dict[str, str
     return normalized
 
 
-def analyze_text(text: str) -> dict[str, Any]:
-    sentences = split_sentences(text)
-    issues = detect_heuristic_issues(sentences)
-    return {
-        "sentences": [{"id": f"s-{idx + 1}", "text": sentence} for idx, sentence in enumerate(sentences)],
-        "issues": issues,
-        "source": "heuristic",
-    }
+def heuristic_rule_version() -> str:
+    # Loaded term pair files change the registry without a code change.
+    return f"{HEURISTIC_RULE_VERSION}:{default_rule_engine().fingerprint}"
+
+
+@dataclass
+class DocumentAnalysis:
+    """Heuristic analysis of one document, kept in columnar form.
+
+    Response dicts are only built by :meth:`to_dict`, at the API boundary.
+    """
+
+    sentences: SentenceTable
+    issues: IssueTable
+    candidate_pairs: list[CandidatePair] = field(default_factory=list)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "sentences": self.sentences.to_dicts(),
+            "issues": self.issues.to_dicts(),
+            "source": "heuristic",
+            # Internal: feeds the "pairs" GLM review mode; not part of API responses.
+            "candidate_pairs": [
+                {
+                    "first": sentence_id(pair.first),
+                    "second": sentence_id(pair.second),
+                    "kind": pair.kind,
+                    "similarity": pair.similarity,
+                }
+                for pair in self.candidate_pairs
+            ],
+        }
+
+
+def analyze_document(
+    text: str | Iterable[str],
+    timings: dict[str, float] | None = None,
+    corpus: TermIndex | None = None,
+    structure: LatexIndex | None = None,
+) -> DocumentAnalysis:
+    # ``structure`` is filled by the parser while ``text`` is consumed, so it is
+    # only read after splitting.
+    # When chunks come from a producer timed into timings["parse"] (see
+    # metrics.timed_iter), that time is excluded from the split stage.
+    parse_before = timings.get("parse", 0.0) if timings is not None else 0.0
+    started = time.perf_counter()
+    sentences = SentenceTable()
+    for record in iter_sentences([text] if isinstance(text, str) else text):
+        sentences.append(record.text, record.start, record.end)
+    texts = sentences.text_column()
+    parse_ms = timings.get("parse", 0.0) - parse_before if timings is not None else 0.0
+    record_stage(timings, "split", time.perf_counter() - started - parse_ms / 1000)
+    with stage_timer(timings, "heuristics"):
+        issues = detect_heuristic_issues(texts, structure)
+        if structure:
+            issues.extend(detect_structure_issues(texts, sentences.starts, structure))
+        issues.extend(detect_numeric_issues(texts))
+        pairs = find_candidate_pairs(texts)
+        issues.extend(detect_pair_issues(pairs))
+        if corpus is not None and len(corpus):
+            issues.extend(detect_corpus_issues(texts, corpus))
+    return DocumentAnalysis(sentences, issues, pairs)
+
 
+def analyze_text(
+    text: str | Iterable[str],
+    timings: dict[str, float] | None = None,
+    corpus: TermIndex | None = None,
+    structure: LatexIndex | None = None,
+) -> dict[str, Any]:
+    return analyze_document(text, timings, corpus, structure).to_dict()
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+import hashlib
+import json
+from pathlib import Path
+import sqlite3
+import threading
+import time
+from typing import Any
+
+from app.services import jsonio
+
+
+DEFAULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_CACHE_DISK_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_CACHE_TTL_SECONDS = 7 * 24 * 3600
+
+
+def content_hash(data: bytes, settings: dict[str, Any]) -> str:
+    digest = hashlib.sha256()
+    digest.update(data)
+    digest.update(b"\0")
+    digest.update(json.dumps(settings, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class TieredCache:
+    """JSON value cache with an in-memory LRU tier and an optional SQLite tier.
+
+    The memory tier is bounded by the serialized size of its values. Entries
+    found only on disk are promoted back into memory on read. The disk tier
+    keeps at most ``disk_max_bytes`` of values per namespace, dropping the
+    oldest rows first, and ignores and deletes rows older than ``ttl_seconds``
+    (0 turns either limit off). Async callers use ``aget``/``aset``, which run
+    disk work in a thread.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+        sqlite_path: str | None = None,
+        disk_max_bytes: int = DEFAULT_CACHE_DISK_MAX_BYTES,
+        ttl_seconds: float = DEFAULT_CACHE_TTL_SECONDS,
+    ) -> None:
+        self.namespace = namespace
+        self.max_bytes = max(0, max_bytes)
+        self.sqlite_path = sqlite_path or None
+        self.disk_max_bytes = max(0, disk_max_bytes)
+        self.ttl_seconds = max(0.0, ttl_seconds)
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._size = 0
+        self._disk_size = 0
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        if self.sqlite_path:
+            Path(self.sqlite_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.sqlite_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, "
+                "created_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS cache_entries_age "
+                "ON cache_entries (namespace, created_at)"
+            )
+            self._expire()
+            self._disk_size = self._db.execute(
+                "SELECT COALESCE(SUM(length(value)), 0) FROM cache_entries WHERE namespace = ?",
+                (self.namespace,),
+            ).fetchone()[0]
+            self._db.commit()
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size
+
+    @property
+    def disk_size_bytes(self) -> int:
+        return self._disk_size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remember(self, key: str, blob: bytes) -> None:
+        if len(blob) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._size -= len(previous)
+        self._entries[key] = blob
+        self._size += len(blob)
+        while self._size > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def _cutoff(self) -> float:
+        """Rows created before this time have expired."""
+        return time.time() - self.ttl_seconds if self.ttl_seconds else 0.0
+
+    def _expire(self) -> None:
+        if not self.ttl_seconds or self._db is None:
+            return
+        condition = "WHERE namespace = ? AND created_at < ?"
+        params = (self.namespace, self._cutoff())
+        expired = self._db.execute(
+            f"SELECT COALESCE(SUM(length(value)), 0) FROM cache_entries {condition}", params
+        ).fetchone()[0]
+        if expired:
+            self._db.execute(f"DELETE FROM cache_entries {condition}", params)
+            self._disk_size -= expired
+
+    def _evict_disk(self) -> None:
+        assert self._db is not None
+        while self.disk_max_bytes and self._disk_size > self.disk_max_bytes:
+            oldest = self._db.execute(
+                "SELECT key, length(value) FROM cache_entries WHERE namespace = ? "
+                "ORDER BY created_at LIMIT 64",
+                (self.namespace,),
+            ).fetchall()
+            if not oldest:
+                self._disk_size = 0
+                return
+            for key, size in oldest:
+                if self._disk_size <= self.disk_max_bytes:
+                    break
+                self._db.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                )
+                self._disk_size -= size
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            blob = self._entries.get(key)
+            if blob is not None:
+                self._entries.move_to_end(key)
+            elif self._db is not None:
+                row = self._db.execute(
+                    "SELECT value FROM cache_entries "
+                    "WHERE namespace = ? AND key = ? AND created_at >= ?",
+                    (self.namespace, key, self._cutoff()),
+                ).fetchone()
+                if row is not None:
+                    blob = bytes(row[0])
+                    self._remember(key, blob)
+        if blob is None:
+            return None
+        return jsonio.loads(blob)
+
+    def set(self, key: str, value: Any) -> None:
+        blob = jsonio.dumps_bytes(value)
+        with self._lock:
+            self._remember(key, blob)
+            if self._db is not None:
+                if self.disk_max_bytes and len(blob) > self.disk_max_bytes:
+                    return
+                replaced = self._db.execute(
+                    "SELECT length(value) FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                ).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache_entries (namespace, key, value, created_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (self.namespace, key, blob, time.time()),
+                )
+                self._disk_size += len(blob) - (replaced[0] if replaced else 0)
+                self._expire()
+                self._evict_disk()
+                self._db.commit()
+
+    async def aget(self, key: str) -> Any | None:
+        """``get`` for the event loop: only a disk lookup is moved to a thread."""
+        if self._db is None or key in self._entries:
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: Any) -> None:
+        if self._db is None:
+            self.set(key, value)
+        else:
+            await asyncio.to_thread(self.set, key, value)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import codecs
+
+
+SNIFF_BYTES = 4096
+BINARY_CONTROL_RATIO = 0.3
+# Share of NULs on one byte parity that marks BOM-less UTF-16 Latin text.
+UTF16_NUL_RATIO = 0.6
+
+BOMS = (
+    # UTF-32 first: its little-endian BOM starts with the UTF-16 one.
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+# Codecs tried in order for text without a BOM; latin1 accepts any bytes.
+FALLBACK_CODECS = ("utf-8", "gb18030", "latin1")
+# C0 control characters other than tab, newline, vertical tab, form feed and CR.
+CONTROL_BYTES = bytes(range(9)) + bytes(range(14, 32))
+
+
+def bom_encoding(sample: bytes) -> str | None:
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding
+    return None
+
+
+def _utf16_encoding(head: memoryview) -> str | None:
+    """``utf-16-le``/``-be`` when every other byte is mostly NUL, as in BOM-less UTF-16."""
+    if len(head) < 4:
+        return None
+    even = head[0::2].tobytes().count(0)
+    odd = head[1::2].tobytes().count(0)
+    half = len(head) // 2
+    if odd >= UTF16_NUL_RATIO * half and even < odd / 4:
+        return "utf-16-le"
+    if even >= UTF16_NUL_RATIO * half and odd < even / 4:
+        return "utf-16-be"
+    return None
+
+
+def sniff_encoding(sample: bytes) -> str | None:
+    """Codec implied by ``sample``'s BOM or NUL layout, or None to decide while decoding.
+
+    Only the first ``SNIFF_BYTES`` are inspected for the NUL layout.
+    """
+    encoding = bom_encoding(sample)
+    if encoding is None and b"\x00" in sample:
+        encoding = _utf16_encoding(memoryview(sample)[:SNIFF_BYTES])
+    return encoding
+
+
+def looks_binary(sample: bytes) -> bool:
+    """True for content that is not text in any supported encoding.
+
+    NULs outside UTF-16/32 text, or more than ``BINARY_CONTROL_RATIO`` control
+    bytes in the first ``SNIFF_BYTES``, mark binary data. Counting is done by
+    ``bytes.translate`` rather than a Python loop.
+    """
+    if not sample:
+        return False
+    if sniff_encoding(sample) is not None:
+        return False
+    if b"\x00" in sample:
+        return True
+    head = sample[:SNIFF_BYTES]
+    controls = len(head) - len(head.translate(None, CONTROL_BYTES))
+    return controls / len(head) > BINARY_CONTROL_RATIO
+
+
+class StreamDecoder:
+    """Incremental decoder that picks its codec once, from the bytes themselves.
+
+    A BOM (or BOM-less UTF-16 layout) in the first chunk fixes the codec.
+    Otherwise chunks are decoded strictly as UTF-8; on the first invalid
+    sequence the stream moves to the next of ``FALLBACK_CODECS`` if everything
+    decoded so far was ASCII (and so reads the same in all of them), else the
+    current codec continues with replacement characters. Each byte is decoded
+    once, apart from the one chunk that triggers a switch.
+    """
+
+    def __init__(self, sample: bytes = b"") -> None:
+        encoding = sniff_encoding(sample)
+        self._codecs = FALLBACK_CODECS if encoding is None else (encoding,)
+        self._position = 0
+        self._ascii = True
+        errors = "strict" if len(self._codecs) > 1 else "replace"
+        self._decoder = codecs.getincrementaldecoder(self._codecs[0])(errors=errors)
+
+    @property
+    def encoding(self) -> str:
+        return self._codecs[self._position]
+
+    def decode(self, data: bytes, final: bool = False) -> str:
+        pending = self._decoder.getstate()[0]
+        try:
+            text = self._decoder.decode(data, final)
+        except UnicodeDecodeError:
+            if self._ascii and self._position + 1 < len(self._codecs):
+                self._position += 1
+                errors = "strict" if self._position + 1 < len(self._codecs) else "replace"
+            else:
+                errors = "replace"
+            self._decoder = codecs.getincrementaldecoder(self.encoding)(errors=errors)
+            return self.decode(pending + data, final)
+        self._ascii = self._ascii and text.isascii()
+        return text
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import re
+from typing import Iterable, Iterator
+
+from app.services.corpus import STOPWORDS
+
+
+DEFAULT_CLAIM_MAX_ISSUES = 50
+# A subject quoted with more distinct values than this is being measured under
+# several conditions (per dataset, per temperature), not restated.
+MAX_DISTINCT_VALUES = 3
+MAX_SUBJECT_WORDS = 2
+
+VALUE = r"(?P<value>[-+]?\d+(?:,\d{3})*(?:\.\d+)?)"
+UNIT = r"(?:\s?(?P<unit>%|percent\b|(?:[kKMGTmµμn]?(?:Hz|V|A|W|s|g|m|Ω|eV|dB|°C|K))\b|°C))?"
+HEDGE = r"(?:(?:about|approximately|around|nearly|roughly|only|just|~|≈)\s*)?"
+LINK = r"(?:of|is|was|were|are|remains|remained|reached|reaches|achieved|achieves|=|:)"
+PREPOSITION = r"(?:of|for|on|in)"
+# A noun phrase, optionally qualified: "learning rate of the proposed model".
+SUBJECT = (
+    r"(?P<subject>[A-Za-z][A-Za-z-]*(?:\s+[A-Za-z][A-Za-z-]*){0,2}"
+    rf"(?:\s+{PREPOSITION}\s+[A-Za-z][\w-]*(?:\s+[A-Za-z][\w-]*){{0,2}})?)"
+)
+
+# "an accuracy of 92.3%", "the threshold voltage was 0.45 V", "n = 120".
+SUBJECT_FIRST_RE = re.compile(rf"\b{SUBJECT}\s*{LINK}\s+{HEDGE}{VALUE}{UNIT}")
+# "92.3% accuracy", "a 12 dB gain".
+VALUE_FIRST_RE = re.compile(
+    rf"(?<![\w.]){VALUE}\s?(?P<unit>%|dB|V|mV|Hz|kHz|MHz|GHz)\s+(?P<subject>[A-Za-z][A-Za-z-]*)\b"
+)
+# "120 participants", "1,024 images".
+COUNT_RE = re.compile(
+    r"(?<![\w.])(?P<value>\d+(?:,\d{3})*)\s+(?:\w+\s+)?"
+    r"(?P<subject>participants|patients|subjects|respondents|volunteers|samples|images|"
+    r"students|interviews|questionnaires|specimens|devices)\b",
+    re.IGNORECASE,
+)
+SAMPLE_SIZE_RE = re.compile(r"(?<![\w.])[nN]\s*=\s*(?P<value>\d+(?:,\d{3})*)\b")
+SAMPLE_SIZE = "sample size"
+QUALIFIER_RE = re.compile(rf"\s+({PREPOSITION})\s+", re.IGNORECASE)
+
+UNIT_ALIASES = {"percent": "%"}
+# Modifiers that do not change what is measured: "final accuracy" is "accuracy".
+NEUTRAL_MODIFIERS = frozenset(
+    "final overall resulting reported measured obtained achieved observed corresponding".split()
+)
+# Labels and statistics that legitimately take a different number each time.
+IGNORED_SUBJECTS = frozenset(
+    "p p-value value figure fig table tab equation eq section chapter step stage case "
+    "round iteration epoch version year day ref".split()
+)
+
+
+@dataclass(frozen=True)
+class NumericClaim:
+    subject: str
+    value: float
+    unit: str
+    text: str
+    sentence_index: int
+    # Subject as written, for claims without a unit (see ``index_claims``).
+    phrase: str = ""
+
+
+def normalize_subject(phrase: str, exact: bool = False) -> str:
+    """Last ``MAX_SUBJECT_WORDS`` content words, lower-cased and singular.
+
+    ``exact`` keeps every content word after the last stopword as written.
+    """
+    words: list[str] = []
+    for word in phrase.lower().split():
+        if word in STOPWORDS:
+            words = []
+            continue
+        if exact:
+            words.append(word)
+            continue
+        if word in NEUTRAL_MODIFIERS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+            word = word[:-1]
+        words.append(word)
+    return " ".join(words if exact else words[-MAX_SUBJECT_WORDS:])
+
+
+def subject_key(phrase: str, exact: bool = False) -> str:
+    """The measured head noun, plus the of/for/on/in phrase narrowing it down.
+
+    "the learning rate of the proposed model" is "learning rate of proposed
+    model", so it is not compared with the model's batch size. Empty when the
+    head is a label such as "Figure" or "p-value".
+    """
+    head, preposition, qualifier = (QUALIFIER_RE.split(phrase, maxsplit=1) + ["", ""])[:3]
+    subject = normalize_subject(head, exact)
+    if not subject or subject in IGNORED_SUBJECTS:
+        return ""
+    # The qualifier names a condition (a model, a dataset) and is kept as written.
+    qualifier = normalize_subject(qualifier, exact=True)
+    return f"{subject} {preposition.lower()} {qualifier}" if qualifier else subject
+
+
+def _claim(
+    subject: str, value: str, unit: str | None, text: str, index: int, phrase: str = ""
+) -> NumericClaim:
+    unit = (unit or "").strip()
+    return NumericClaim(
+        subject=subject,
+        value=float(value.replace(",", "")),
+        unit=UNIT_ALIASES.get(unit.lower(), unit),
+        text=text.replace(" ", "").replace("percent", "%"),
+        sentence_index=index,
+        phrase=phrase or subject,
+    )
+
+
+def extract_claims(sentence: str, sentence_index: int = 0) -> Iterator[NumericClaim]:
+    """``(subject, value, unit)`` tuples quoted in one sentence, left to right."""
+    taken: list[tuple[int, int]] = []
+
+    def free(match: re.Match[str]) -> bool:
+        span = match.span("value")
+        if any(start < span[1] and span[0] < end for start, end in taken):
+            return False
+        taken.append(span)
+        return True
+
+    for match in SAMPLE_SIZE_RE.finditer(sentence):
+        if free(match):
+            yield _claim(SAMPLE_SIZE, match["value"], "", match["value"], sentence_index)
+    for match in COUNT_RE.finditer(sentence):
+        if free(match):
+            yield _claim(SAMPLE_SIZE, match["value"], "", match["value"], sentence_index)
+    for match in SUBJECT_FIRST_RE.finditer(sentence):
+        subject = subject_key(match["subject"])
+        if subject and free(match):
+            text = sentence[match.start("value") : match.end()]
+            phrase = subject_key(match["subject"], exact=True)
+            yield _claim(subject, match["value"], match["unit"], text, sentence_index, phrase)
+    for match in VALUE_FIRST_RE.finditer(sentence):
+        subject = normalize_subject(match["subject"])
+        if subject and subject not in IGNORED_SUBJECTS and free(match):
+            text = sentence[match.start("value") : match.end("unit")]
+            yield _claim(subject, match["value"], match["unit"], text, sentence_index)
+
+
+def index_claims(sentences: Iterable[str]) -> dict[tuple[str, str], list[NumericClaim]]:
+    """Claims grouped by normalized subject and unit, in sentence order.
+
+    A unit says what kind of quantity two claims measure; without one only
+    subjects written the same way are grouped.
+    """
+    index: dict[tuple[str, str], list[NumericClaim]] = {}
+    for sentence_index, sentence in enumerate(sentences):
+        for claim in extract_claims(sentence, sentence_index):
+            subject = claim.subject if claim.unit else claim.phrase
+            index.setdefault((subject, claim.unit), []).append(claim)
+    return index
+
+
+def find_conflicts(
+    index: dict[tuple[str, str], list[NumericClaim]],
+) -> list[tuple[NumericClaim, NumericClaim]]:
+    """``(first claim, later claim with another value)`` pairs, by later sentence.
+
+    Subjects quoted with more than ``MAX_DISTINCT_VALUES`` values are skipped.
+    """
+    conflicts: list[tuple[NumericClaim, NumericClaim]] = []
+    for claims in index.values():
+        values = {claim.value for claim in claims}
+        if len(values) < 2 or len(values) > MAX_DISTINCT_VALUES:
+            continue
+        first = claims[0]
+        reported: set[float] = {first.value}
+        for claim in claims[1:]:
+            if claim.value in reported or claim.sentence_index == first.sentence_index:
+                continue
+            reported.add(claim.value)
+            conflicts.append((first, claim))
+    conflicts.sort(key=lambda pair: (pair[1].sentence_index, pair[1].subject))
+    return conflicts
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+import re
+import sqlite3
+import threading
+import time
+from typing import Iterable, Iterator
+
+
+DEFAULT_CORPUS_MIN_DOCUMENTS = 2
+DEFAULT_CORPUS_MAX_ISSUES = 50
+# Keeps ``IN (...)`` lookups under SQLite's bound-parameter limit.
+LOOKUP_CHUNK = 500
+MAX_TERM_WORDS = 3
+# Single words are only indexed when long enough to be a closed compound
+# ("dataset", "wavelength") that may also be written as two words.
+MIN_SINGLE_WORD_CHARS = 6
+
+WORD_RE = re.compile(r"[A-Za-z][A-Za-z0-9]*(?:-[A-Za-z0-9]+)*")
+STOPWORDS = frozenset(
+    """
+    a about above after again against all also an and any are as at be because been before
+    being below between both but by can could did do does doing down during each either few
+    for from further had has have having here how however if in into is it its itself may
+    might more most must no nor not of off on once only or other our out over own per same
+    should so some such than that the their them then there these they this those through
+    thus to too under until up upon us using very via was we were what when where whether
+    which while who whom why will with within without would yet you your
+    """.split()
+)
+
+
+@dataclass(frozen=True)
+class TermOccurrence:
+    canonical: str
+    surface: str
+    sentence_index: int
+
+
+def _singular(word: str) -> str:
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def extract_terms(sentence: str, sentence_index: int = 0) -> Iterator[TermOccurrence]:
+    """Noun-phrase-like candidates: runs of up to three content words.
+
+    ``surface`` keeps how the words are joined (space or hyphen) and
+    ``canonical`` drops the separators, so "threshold-voltage", "threshold
+    voltage" and "thresholdvoltage" share a canonical key while plural forms
+    and capitalisation do not count as variants.
+    """
+    runs: list[list[str]] = [[]]
+    cursor = 0
+    for match in WORD_RE.finditer(sentence):
+        gap = sentence[cursor : match.start()]
+        cursor = match.end()
+        word = match.group(0).lower()
+        if word in STOPWORDS or (gap.strip() and runs[-1]):
+            runs.append([])
+        if word not in STOPWORDS:
+            runs[-1].append(word)
+    for run in runs:
+        for size in range(1, MAX_TERM_WORDS + 1):
+            for start in range(len(run) - size + 1):
+                words = run[start : start + size]
+                if size == 1 and len(words[0]) < MIN_SINGLE_WORD_CHARS:
+                    continue
+                parts = [_singular(part) for word in words for part in word.split("-")]
+                surface = " ".join(_singular(word) for word in words)
+                canonical = "".join(parts)
+                yield TermOccurrence(canonical, surface, sentence_index)
+
+
+class TermIndex:
+    """Persistent inverted index: term → (document, sentence) postings.
+
+    Each term row also keeps how many indexed documents use it, so variant
+    lookups read one index entry per term instead of scanning postings.
+    Without ``sqlite_path`` the index lives in an in-memory SQLite database.
+    """
+
+    def __init__(self, sqlite_path: str | None = None) -> None:
+        self.sqlite_path = sqlite_path or None
+        if self.sqlite_path:
+            Path(self.sqlite_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.sqlite_path or ":memory:", check_same_thread=False)
+        if self.sqlite_path:
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS corpus_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS corpus_documents ("
+            "doc_id TEXT PRIMARY KEY, title TEXT NOT NULL, sentence_count INTEGER NOT NULL, "
+            "added_at REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS corpus_terms ("
+            "term_id INTEGER PRIMARY KEY, canonical TEXT NOT NULL, surface TEXT NOT NULL, "
+            "doc_count INTEGER NOT NULL DEFAULT 0, UNIQUE (canonical, surface));"
+            "CREATE TABLE IF NOT EXISTS corpus_postings ("
+            "term_id INTEGER NOT NULL, doc_id TEXT NOT NULL, sentence_index INTEGER NOT NULL, "
+            "PRIMARY KEY (term_id, doc_id, sentence_index)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS corpus_postings_doc ON corpus_postings (doc_id);"
+        )
+        self._db.commit()
+        self._version = self._read_version()
+
+    @property
+    def version(self) -> int:
+        """Bumped on every add/remove; part of analysis cache keys.
+
+        Read from memory without the lock, so building a cache key on the
+        event loop never waits for a document being indexed.
+        """
+        return self._version
+
+    def _read_version(self) -> int:
+        row = self._db.execute("SELECT value FROM corpus_meta WHERE key = 'version'").fetchone()
+        return int(row[0]) if row else 0
+
+    def _bump_version(self) -> None:
+        self._db.execute(
+            "INSERT INTO corpus_meta (key, value) VALUES ('version', '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+
+    def _remove_locked(self, doc_id: str) -> bool:
+        term_ids = [
+            row[0]
+            for row in self._db.execute(
+                "SELECT DISTINCT term_id FROM corpus_postings WHERE doc_id = ?", (doc_id,)
+            )
+        ]
+        self._db.executemany(
+            "UPDATE corpus_terms SET doc_count = doc_count - 1 WHERE term_id = ?",
+            [(term_id,) for term_id in term_ids],
+        )
+        self._db.execute("DELETE FROM corpus_postings WHERE doc_id = ?", (doc_id,))
+        deleted = self._db.execute(
+            "DELETE FROM corpus_documents WHERE doc_id = ?", (doc_id,)
+        ).rowcount
+        self._db.execute("DELETE FROM corpus_terms WHERE doc_count <= 0")
+        return bool(deleted)
+
+    def add_document(self, doc_id: str, sentences: list[str], title: str = "") -> int:
+        """Index ``sentences`` under ``doc_id``, replacing any earlier version.
+
+        Returns the number of distinct terms indexed for the document.
+        """
+        postings: dict[tuple[str, str], set[int]] = {}
+        for index, sentence in enumerate(sentences):
+            for term in extract_terms(sentence, index):
+                postings.setdefault((term.canonical, term.surface), set()).add(index)
+
+        with self._lock:
+            with self._db:
+                self._remove_locked(doc_id)
+                self._db.execute(
+                    "INSERT INTO corpus_documents (doc_id, title, sentence_count, added_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (doc_id, title, len(sentences), time.time()),
+                )
+                self._db.executemany(
+                    "INSERT INTO corpus_terms (canonical, surface, doc_count) VALUES (?, ?, 1) "
+                    "ON CONFLICT(canonical, surface) DO UPDATE SET doc_count = doc_count + 1",
+                    list(postings),
+                )
+                rows: list[tuple[int, str, int]] = []
+                for (canonical, surface), indexes in postings.items():
+                    term_id = self._db.execute(
+                        "SELECT term_id FROM corpus_terms WHERE canonical = ? AND surface = ?",
+                        (canonical, surface),
+                    ).fetchone()[0]
+                    rows.extend((term_id, doc_id, index) for index in indexes)
+                self._db.executemany(
+                    "INSERT INTO corpus_postings (term_id, doc_id, sentence_index) "
+                    "VALUES (?, ?, ?)",
+                    rows,
+                )
+                self._bump_version()
+            # After the commit, so a version never names uncommitted postings.
+            self._version += 1
+        return len(postings)
+
+    def remove_document(self, doc_id: str) -> bool:
+        with self._lock:
+            with self._db:
+                removed = self._remove_locked(doc_id)
+                if removed:
+                    self._bump_version()
+            if removed:
+                self._version += 1
+        return removed
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM corpus_documents").fetchone()[0]
+
+    def surface_counts(self, canonicals: Iterable[str]) -> dict[str, dict[str, int]]:
+        """``{canonical: {surface: documents using it}}`` for the given keys."""
+        keys = sorted(set(canonicals))
+        found: dict[str, dict[str, int]] = {}
+        with self._lock:
+            for offset in range(0, len(keys), LOOKUP_CHUNK):
+                chunk = keys[offset : offset + LOOKUP_CHUNK]
+                marks = ",".join("?" * len(chunk))
+                for canonical, surface, doc_count in self._db.execute(
+                    "SELECT canonical, surface, doc_count FROM corpus_terms "
+                    f"WHERE canonical IN ({marks}) AND doc_count > 0",
+                    chunk,
+                ):
+                    found.setdefault(canonical, {})[surface] = doc_count
+        return found
+
+    def postings(self, surface: str) -> list[tuple[str, int]]:
+        """``(doc_id, sentence_index)`` pairs where ``surface`` occurs."""
+        with self._lock:
+            return [
+                (doc_id, sentence_index)
+                for doc_id, sentence_index in self._db.execute(
+                    "SELECT p.doc_id, p.sentence_index FROM corpus_terms t "
+                    "JOIN corpus_postings p ON p.term_id = t.term_id "
+                    "WHERE t.surface = ? ORDER BY p.doc_id, p.sentence_index",
+                    (surface,),
+                )
+            ]
+
+    def documents(self) -> list[dict[str, object]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT doc_id, title, sentence_count, added_at FROM corpus_documents "
+                "ORDER BY added_at"
+            ).fetchall()
+        return [
+            {"doc_id": doc_id, "title": title, "sentences": count, "added_at": added_at}
+            for doc_id, title, count, added_at in rows
+        ]
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            documents = self._db.execute("SELECT COUNT(*) FROM corpus_documents").fetchone()[0]
+            terms = self._db.execute("SELECT COUNT(*) FROM corpus_terms").fetchone()[0]
+            postings = self._db.execute("SELECT COUNT(*) FROM corpus_postings").fetchone()[0]
+        return {"documents": documents, "terms": terms, "postings": postings, "version": self.version}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+import re
+from typing import Sequence
+import zlib
+
+import numpy as np
+
+from app.services.corpus import STOPWORDS
+
+
+DEFAULT_PAIR_SIMILARITY = 0.5
+DEFAULT_DUPLICATE_SIMILARITY = 0.9
+DEFAULT_MAX_CANDIDATE_PAIRS = 200
+# Buckets this crowded hold boilerplate (repeated captions, headers); comparing
+# everything inside them is what would make the search quadratic again.
+DEFAULT_MAX_BUCKET_SIZE = 32
+# 24 bands of 3 rows: pairs with Jaccard 0.5 share a bucket ~96% of the time,
+# pairs at 0.2 only ~17%, and every bucket hit is verified exactly.
+LSH_BANDS = 24
+LSH_ROWS = 3
+MIN_FEATURES = 3
+# Features hashed per NumPy block; bounds the (features x hashes) scratch array.
+FEATURE_CHUNK = 65_536
+SEED = 20_240_601
+
+KIND_POLARITY = "polarity"
+KIND_NUMERIC = "numeric"
+KIND_DUPLICATE = "duplicate"
+KIND_PRIORITY = {KIND_POLARITY: 0, KIND_NUMERIC: 1, KIND_DUPLICATE: 2}
+
+TOKEN_RE = re.compile("[A-Za-z][A-Za-z0-9]*(?:-[A-Za-z0-9]+)*|[\u4e00-\u9fff]+")
+DIGIT_RE = re.compile(r"\d")
+NUMBER_RE = re.compile(r"(?<![\w.])[-+]?\d+(?:[.,]\d+)*(?:\s?%)?")
+# Figure, table, equation and citation numbers say where, not how much.
+REFERENCE_RE = re.compile(
+    r"\b(?:fig(?:ure)?s?|tables?|tab|eqs?|equations?|sections?|sec|chapters?|refs?)\.?\s*"
+    r"\(?\d+[\w.]*\)?|\[[\d,\s–-]+\]",
+    re.IGNORECASE,
+)
+
+POSITIVE_STEMS = (
+    "increas", "improv", "enhanc", "higher", "boost", "strengthen", "outperform",
+    "better", "rais", "accelerat", "gain",
+)
+NEGATIVE_STEMS = (
+    "decreas", "reduc", "lower", "degrad", "weaken", "worse", "declin", "deteriorat",
+    "underperform", "diminish", "drop", "slow",
+)
+NEGATIONS = frozenset(
+    "not no never cannot neither nor doesn don didn isn aren wasn weren hasn haven".split()
+)
+CJK_POSITIVE = ("提高", "增加", "提升", "改善", "增强", "上升", "升高", "加快")
+CJK_NEGATIVE = ("降低", "减少", "下降", "减弱", "恶化", "削弱", "减小", "变差")
+CJK_NEGATIONS = ("没有", "不", "未")
+CJK_POLARITY_RE = re.compile("|".join(CJK_POSITIVE + CJK_NEGATIVE + CJK_NEGATIONS))
+
+
+@dataclass(frozen=True)
+class SentenceFeatures:
+    tokens: frozenset[str]
+    numbers: frozenset[str]
+    polarity: int
+
+
+@dataclass(frozen=True)
+class CandidatePair:
+    first: int
+    second: int
+    kind: str
+    similarity: float
+
+
+@lru_cache(maxsize=65_536)
+def _classify_word(word: str) -> tuple[str, int]:
+    """``(subject token or "", trend direction, or 2 for a negation)`` of a lower-cased word."""
+    if word in NEGATIONS:
+        return "", 2
+    if word.startswith(POSITIVE_STEMS):
+        return "", 1
+    if word.startswith(NEGATIVE_STEMS):
+        return "", -1
+    if word in STOPWORDS or len(word) < 2:
+        return "", 0
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        word = word[:-1]
+    return word, 0
+
+
+def sentence_features(sentence: str) -> SentenceFeatures:
+    """Subject tokens, quoted numbers and trend direction of one sentence.
+
+    Trend words, negations and numbers are kept out of ``tokens`` so that
+    "X increases Y by 5%" and "X does not reduce Y by 7%" share a subject.
+    CJK runs contribute character bigrams.
+    """
+    numbers: frozenset[str] = frozenset()
+    if DIGIT_RE.search(sentence):
+        numbers = frozenset(
+            match.group(0).replace(" ", "")
+            for match in NUMBER_RE.finditer(REFERENCE_RE.sub(" ", sentence))
+        )
+    tokens: set[str] = set()
+    score = 0
+    negations = 0
+    for word in TOKEN_RE.findall(sentence):
+        if word[0] >= "\u4e00":
+            for marker in CJK_POLARITY_RE.findall(word):
+                if marker in CJK_POSITIVE:
+                    score += 1
+                elif marker in CJK_NEGATIVE:
+                    score -= 1
+                else:
+                    negations += 1
+            for run in CJK_POLARITY_RE.split(word):
+                tokens.update(run[i : i + 2] for i in range(max(len(run) - 1, 0)))
+            continue
+        token, direction = _classify_word(word.lower())
+        if direction == 2:
+            negations += 1
+        elif direction:
+            score += direction
+        elif token:
+            tokens.add(token)
+    polarity = (score > 0) - (score < 0)
+    if negations % 2:
+        polarity = -polarity
+    return SentenceFeatures(frozenset(tokens), numbers, polarity)
+
+
+def _hash_parameters(count: int) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(SEED)
+    multipliers = rng.integers(1, 2**63, size=count, dtype=np.uint64) | np.uint64(1)
+    increments = rng.integers(0, 2**63, size=count, dtype=np.uint64)
+    return multipliers, increments
+
+
+def minhash_signatures(token_sets: list[frozenset[str]]) -> np.ndarray:
+    """``(len(token_sets), LSH_BANDS * LSH_ROWS)`` MinHash matrix.
+
+    Every feature of every sentence is hashed by all permutations in one
+    vectorized multiply-shift per block; ``minimum.reduceat`` then takes the
+    per-sentence minimum. Sets must be non-empty.
+    """
+    count = len(token_sets)
+    width = LSH_BANDS * LSH_ROWS
+    if not count:
+        return np.zeros((0, width), dtype=np.uint64)
+    lengths = np.fromiter((len(tokens) for tokens in token_sets), dtype=np.int64, count=count)
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    hashes = np.fromiter(
+        (zlib.crc32(token.encode("utf-8")) for tokens in token_sets for token in tokens),
+        dtype=np.uint64,
+        count=int(offsets[-1]),
+    )
+    multipliers, increments = _hash_parameters(width)
+    shift = np.uint64(32)
+    signatures = np.empty((count, width), dtype=np.uint64)
+    low = 0
+    while low < count:
+        high = int(np.searchsorted(offsets, offsets[low] + FEATURE_CHUNK, side="right")) - 1
+        high = min(max(high, low + 1), count)
+        block = hashes[offsets[low] : offsets[high], None]
+        # uint64 arithmetic wraps, which is exactly the multiply-shift family.
+        mixed = (block * multipliers + increments) >> shift
+        signatures[low:high] = np.minimum.reduceat(mixed, offsets[low:high] - offsets[low], axis=0)
+        low = high
+    return signatures
+
+
+def lsh_candidates(
+    signatures: np.ndarray, max_bucket_size: int = DEFAULT_MAX_BUCKET_SIZE
+) -> set[tuple[int, int]]:
+    """Row pairs that share at least one band bucket."""
+    pairs: set[tuple[int, int]] = set()
+    if len(signatures) < 2:
+        return pairs
+    mixers = _hash_parameters(LSH_ROWS)[0]
+    for band in range(LSH_BANDS):
+        rows = signatures[:, band * LSH_ROWS : (band + 1) * LSH_ROWS]
+        keys = (rows * mixers).sum(axis=1)
+        order = np.argsort(keys, kind="stable")
+        ordered = keys[order]
+        starts = np.flatnonzero(np.r_[True, ordered[1:] != ordered[:-1]])
+        sizes = np.diff(np.r_[starts, len(ordered)])
+        shared = (sizes > 1) & (sizes <= max_bucket_size)
+        for start, size in zip(starts[shared].tolist(), sizes[shared].tolist()):
+            members = sorted(order[start : start + size].tolist())
+            for offset, first in enumerate(members):
+                for second in members[offset + 1 :]:
+                    pairs.add((first, second))
+    return pairs
+
+
+def _classify(
+    first: SentenceFeatures, second: SentenceFeatures, similarity: float, duplicate_similarity: float
+) -> str:
+    if first.polarity * second.polarity < 0:
+        return KIND_POLARITY
+    if first.numbers and second.numbers and first.numbers != second.numbers:
+        return KIND_NUMERIC
+    if similarity >= duplicate_similarity and first.polarity == second.polarity:
+        return KIND_DUPLICATE
+    return ""
+
+
+def find_candidate_pairs(
+    sentences: Sequence[str],
+    min_similarity: float = DEFAULT_PAIR_SIMILARITY,
+    duplicate_similarity: float = DEFAULT_DUPLICATE_SIMILARITY,
+    max_pairs: int = DEFAULT_MAX_CANDIDATE_PAIRS,
+    max_bucket_size: int = DEFAULT_MAX_BUCKET_SIZE,
+) -> list[CandidatePair]:
+    """Sentence pairs about the same subject that disagree or repeat each other.
+
+    MinHash + LSH proposes pairs in roughly linear time; each proposal is then
+    checked with the exact Jaccard similarity of the subject tokens. A pair is
+    kept when the trend directions oppose (``polarity``), the quoted numbers
+    differ (``numeric``), or the sentences are near copies (``duplicate``).
+    At most ``max_pairs`` are returned, strongest kinds and matches first.
+    """
+    features = [sentence_features(sentence) for sentence in sentences]
+    indexed = [index for index, item in enumerate(features) if len(item.tokens) >= MIN_FEATURES]
+    signatures = minhash_signatures([features[index].tokens for index in indexed])
+
+    found: list[CandidatePair] = []
+    for row_a, row_b in lsh_candidates(signatures, max_bucket_size):
+        first, second = indexed[row_a], indexed[row_b]
+        tokens_a, tokens_b = features[first].tokens, features[second].tokens
+        similarity = len(tokens_a & tokens_b) / len(tokens_a | tokens_b)
+        if similarity < min_similarity:
+            continue
+        kind = _classify(features[first], features[second], similarity, duplicate_similarity)
+        if kind:
+            found.append(CandidatePair(first, second, kind, round(similarity, 3)))
+
+    found.sort(key=lambda pair: (KIND_PRIORITY[pair.kind], -pair.similarity, pair.first, pair.second))
+    return sorted(found[: max(max_pairs, 0)], key=lambda pair: (pair.first, pair.second))
@@ -1,20 +1,110 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import re
 import socket
+import time
 import urllib.error
 import urllib.request
 from typing import Any
 
+import httpx
 
-class GLMClient:
-    def __init__(self, api_key: str, base_url: str, model: str, timeout: int = 45) -> None:
+from app.services.metrics import GLM_REQUESTS, GLM_TIMEOUTS, STAGE_SECONDS
+
+
+DEFAULT_GLM_MAX_CONNECTIONS = 32
+DEFAULT_GLM_MAX_IN_FLIGHT = 16
+DEFAULT_GLM_KEEPALIVE_SECONDS = 30.0
+
+# ``last_error_kind`` values, so callers can tell a flaky provider from a bad
+# request without parsing ``last_error`` text.
+ERROR_MISSING_KEY = "missing_key"
+ERROR_TIMEOUT = "timeout"
+ERROR_NETWORK = "network"
+ERROR_RATE_LIMITED = "rate_limited"
+ERROR_SERVER = "server"
+ERROR_CLIENT = "client"
+ERROR_PARSE = "parse"
+
+REVIEW_PROMPT = (
+    "You are an academic consistency reviewer. "
+    "Analyze the sentence list and return JSON with shape: "
+    '{"issues":[{"type":"term|logic|citation_figure","sentence_id":"s-1","severity":"low|medium|high","title":"...","detail":"..."}]}. '
+    "Only return JSON."
+)
+# For the "pairs" review mode: sentences arrive two by two, sharing a "pair" key.
+PAIR_REVIEW_PROMPT = (
+    "You are an academic consistency reviewer. "
+    "Sentences come in pairs that share a \"pair\" key and discuss the same subject. "
+    "For each pair, decide whether the two sentences contradict each other (opposite trends, "
+    "different numbers for the same quantity) or needlessly repeat each other, and report "
+    "only pairs that do, on the later sentence. Return JSON with shape: "
+    '{"issues":[{"type":"term|logic|citation_figure","sentence_id":"s-1","severity":"low|medium|high","title":"...","detail":"..."}]}. '
+    "Only return JSON."
+)
+
+
+class _GLMClientBase:
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str,
+        model: str,
+        timeout: int = 45,
+        prompt: str = REVIEW_PROMPT,
+    ) -> None:
         self.api_key = api_key.strip()
         self.base_url = base_url.rstrip("/")
         self.model = model.strip()
         self.timeout = timeout
+        self.prompt = prompt
         self.last_error = ""
+        self.last_error_kind = ""
+        self.last_retry_after: float | None = None
+
+    @property
+    def endpoint(self) -> str:
+        return f"{self.base_url}/chat/completions"
+
+    def _reset_error(self) -> None:
+        self.last_error = ""
+        self.last_error_kind = ""
+        self.last_retry_after = None
+
+    def _set_http_error(self, status: int, detail: str, retry_after: str | None) -> None:
+        self.last_error = f"GLM HTTP {status}: {detail[:180].strip() or 'request rejected'}"
+        if status == 429:
+            self.last_error_kind = ERROR_RATE_LIMITED
+        elif status >= 500:
+            self.last_error_kind = ERROR_SERVER
+        else:
+            self.last_error_kind = ERROR_CLIENT
+        try:
+            self.last_retry_after = float(retry_after) if retry_after else None
+        except ValueError:
+            # HTTP-date form; the caller falls back to its own backoff.
+            self.last_retry_after = None
+
+    def _headers(self) -> dict[str, str]:
+        return {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}",
+        }
+
+    def _request_body(self, sentences: list[dict[str, str]]) -> bytes:
+        user_payload = {"sentences": sentences}
+        request_body = {
+            "model": self.model,
+            "temperature": 0.1,
+            "messages": [
+                {"role": "system", "content": self.prompt},
+                {"role": "user", "content": json.dumps(user_payload, ensure_ascii=False)},
+            ],
+            "response_format": {"type": "json_object"},
+        }
+        return json.dumps(request_body).encode("utf-8")
 
     def _extract_json_payload(self, content: str) -> dict[str, Any]:
         content = content.strip()
@@ -26,39 +116,36 @@ class GLMClient:
                 raise ValueError("GLM response does not contain JSON payload.")
             return json.loads(match.group(0))
 
+    def _parse_response_body(self, body: str) -> list[dict[str, Any]]:
+        try:
+            payload = json.loads(body)
+            content = payload["choices"][0]["message"]["content"]
+            parsed = self._extract_json_payload(content)
+            issues = parsed.get("issues", [])
+            if not isinstance(issues, list):
+                self.last_error = "GLM response JSON has no valid issues list."
+                self.last_error_kind = ERROR_PARSE
+                return []
+            return [item for item in issues if isinstance(item, dict)]
+        except (KeyError, IndexError, ValueError, TypeError, json.JSONDecodeError):
+            self.last_error = "GLM response parse failed."
+            self.last_error_kind = ERROR_PARSE
+            return []
+
+
+class GLMClient(_GLMClientBase):
     def review(self, sentences: list[dict[str, str]]) -> list[dict[str, Any]]:
-        self.last_error = ""
+        self._reset_error()
         if not self.api_key:
             self.last_error = "Missing API key."
+            self.last_error_kind = ERROR_MISSING_KEY
             return []
 
-        prompt = (
-            "You are an academic consistency reviewer. "
-            "Analyze the sentence list and return JSON with shape: "
-            '{"issues":[{"type":"term|logic|citation_figure","sentence_id":"s-1","severity":"low|medium|high","title":"...","detail":"..."}]}. '
-            "Only return JSON."
-        )
-
-        user_payload = {"sentences": sentences}
-        request_body = {
-            "model": self.model,
-            "temperature": 0.1,
-            "messages": [
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": json.dumps(user_payload, ensure_ascii=False)},
-            ],
-            "response_format": {"type": "json_object"},
-        }
-
-        encoded = json.dumps(request_body).encode("utf-8")
         req = urllib.request.Request(
-            url=f"{self.base_url}/chat/completions",
-            data=encoded,
+            url=self.endpoint,
+            data=self._request_body(sentences),
             method="POST",
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.api_key}",
-            },
+            headers=self._headers(),
         )
 
         try:
@@ -70,28 +157,138 @@ class GLMClient:
                 detail = exc.read().decode("utf-8", "ignore")
             except Exception:
                 detail = ""
-            self.last_error = f"GLM HTTP {exc.code}: {detail[:180].strip() or 'request rejected'}"
+            self._set_http_error(exc.code, detail, exc.headers.get("Retry-After") if exc.headers else None)
             return []
         except urllib.error.URLError as exc:
             reason = getattr(exc, "reason", "") or str(exc)
             self.last_error = f"GLM network error: {str(reason)[:180]}"
+            self.last_error_kind = (
+                ERROR_TIMEOUT if isinstance(reason, TimeoutError) else ERROR_NETWORK
+            )
             return []
         except socket.timeout:
             self.last_error = "The read operation timed out"
+            self.last_error_kind = ERROR_TIMEOUT
             return []
         except TimeoutError:
             self.last_error = "The read operation timed out"
+            self.last_error_kind = ERROR_TIMEOUT
+            return []
+
+        return self._parse_response_body(body)
+
+
+class GLMConnectionPool:
+    """Keep-alive HTTP pool shared by every async GLM call of one app instance.
+
+    ``max_in_flight`` caps concurrent ``/chat/completions`` requests across all
+    uploads handled by the worker; extra calls wait for a free slot instead of
+    opening more upstream connections.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = DEFAULT_GLM_MAX_CONNECTIONS,
+        max_in_flight: int = DEFAULT_GLM_MAX_IN_FLIGHT,
+        keepalive_seconds: float = DEFAULT_GLM_KEEPALIVE_SECONDS,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self.max_connections = max(1, max_connections)
+        self.max_in_flight = max(1, max_in_flight)
+        self.keepalive_seconds = keepalive_seconds
+        self._transport = transport
+        self._client: httpx.AsyncClient | None = None
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self.in_flight = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=self.keepalive_seconds,
+                ),
+                transport=self._transport,
+            )
+        return self._client
+
+    async def post(
+        self, url: str, *, content: bytes, headers: dict[str, str], timeout: float
+    ) -> httpx.Response:
+        async with self._slots:
+            self.in_flight += 1
+            try:
+                return await self.client.post(url, content=content, headers=headers, timeout=timeout)
+            finally:
+                self.in_flight -= 1
+
+    async def aclose(self) -> None:
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+
+class AsyncGLMClient(_GLMClientBase):
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str,
+        model: str,
+        timeout: int = 45,
+        pool: GLMConnectionPool | None = None,
+        prompt: str = REVIEW_PROMPT,
+    ) -> None:
+        super().__init__(
+            api_key=api_key, base_url=base_url, model=model, timeout=timeout, prompt=prompt
+        )
+        self.pool = pool or GLMConnectionPool()
+        self.last_request_seconds = 0.0
+        self.last_parse_seconds = 0.0
+
+    async def review(self, sentences: list[dict[str, str]]) -> list[dict[str, Any]]:
+        self._reset_error()
+        self.last_request_seconds = 0.0
+        self.last_parse_seconds = 0.0
+        if not self.api_key:
+            self.last_error = "Missing API key."
+            self.last_error_kind = ERROR_MISSING_KEY
             return []
 
+        started = time.perf_counter()
         try:
-            payload = json.loads(body)
-            content = payload["choices"][0]["message"]["content"]
-            parsed = self._extract_json_payload(content)
-            issues = parsed.get("issues", [])
-            if not isinstance(issues, list):
-                self.last_error = "GLM response JSON has no valid issues list."
-                return []
-            return [item for item in issues if isinstance(item, dict)]
-        except (KeyError, IndexError, ValueError, TypeError, json.JSONDecodeError):
-            self.last_error = "GLM response parse failed."
+            response = await self.pool.post(
+                self.endpoint,
+                content=self._request_body(sentences),
+                headers=self._headers(),
+                timeout=self.timeout,
+            )
+        except httpx.TimeoutException:
+            self.last_error = "The read operation timed out"
+            self.last_error_kind = ERROR_TIMEOUT
+            GLM_TIMEOUTS.inc()
+            GLM_REQUESTS.inc(outcome="timeout")
+            return []
+        except httpx.TransportError as exc:
+            self.last_error = f"GLM network error: {str(exc)[:180] or type(exc).__name__}"
+            self.last_error_kind = ERROR_NETWORK
+            GLM_REQUESTS.inc(outcome="network_error")
             return []
+        finally:
+            self.last_request_seconds = time.perf_counter() - started
+            STAGE_SECONDS.observe(self.last_request_seconds, stage="llm_request")
+
+        if response.status_code >= 400:
+            self._set_http_error(
+                response.status_code, response.text, response.headers.get("Retry-After")
+            )
+            GLM_REQUESTS.inc(outcome="http_error")
+            return []
+
+        started = time.perf_counter()
+        issues = self._parse_response_body(response.text)
+        self.last_parse_seconds = time.perf_counter() - started
+        STAGE_SECONDS.observe(self.last_parse_seconds, stage="llm_parse")
+        GLM_REQUESTS.inc(outcome="parse_error" if self.last_error else "ok")
+        return issues
@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable
+import uuid
+
+from app.services import jsonio
+
+
+DEFAULT_JOB_WORKERS = 2
+DEFAULT_JOB_QUEUE_SIZE = 16
+DEFAULT_JOB_MAX_RETAINED = 256
+
+ACTIVE_STATUSES = {"queued", "running"}
+
+
+class QueueFullError(RuntimeError):
+    pass
+
+
+@dataclass
+class Job:
+    id: str
+    status: str = "queued"
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    error: str = ""
+    result: dict[str, Any] = field(default_factory=dict)
+
+    def touch(self, status: str | None = None) -> None:
+        if status is not None:
+            self.status = status
+        self.updated_at = time.time()
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class JobStore:
+    """Keeps recent jobs in memory and, optionally, finished jobs in SQLite."""
+
+    def __init__(
+        self, sqlite_path: str | None = None, max_retained: int = DEFAULT_JOB_MAX_RETAINED
+    ) -> None:
+        self.max_retained = max(1, max_retained)
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        if sqlite_path:
+            Path(sqlite_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, payload TEXT NOT NULL, "
+                "updated_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def put(self, job: Job) -> None:
+        with self._lock:
+            self._jobs[job.id] = job
+            self._jobs.move_to_end(job.id)
+            while len(self._jobs) > self.max_retained:
+                oldest_id = next(
+                    (
+                        job_id
+                        for job_id, item in self._jobs.items()
+                        if item.status not in ACTIVE_STATUSES
+                    ),
+                    None,
+                )
+                if oldest_id is None:
+                    break
+                del self._jobs[oldest_id]
+
+    def persist(self, job: Job) -> None:
+        self.put(job)
+        if self._db is None:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO jobs (id, status, payload, updated_at) VALUES (?, ?, ?, ?)",
+                (job.id, job.status, jsonio.dumps(job.to_dict()), job.updated_at),
+            )
+            self._db.commit()
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None or self._db is None:
+                return job
+            row = self._db.execute("SELECT payload FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return Job(**jsonio.loads(row[0]))
+
+    def delete(self, job_id: str) -> None:
+        with self._lock:
+            self._jobs.pop(job_id, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+                self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+JobRunner = Callable[[Job], Awaitable[None]]
+# Releases what a job holds (its spooled upload, say), whether or not it ran.
+JobCleanup = Callable[[], None]
+
+
+class JobManager:
+    """In-process worker pool fed by a bounded queue.
+
+    ``submit`` raises :class:`QueueFullError` instead of waiting when the queue
+    is full, so callers can shed load with HTTP 429. A job's ``cleanup`` runs
+    once it leaves the queue: after it ran, when it was cancelled before
+    starting, or when ``stop`` drops it.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        workers: int = DEFAULT_JOB_WORKERS,
+        queue_size: int = DEFAULT_JOB_QUEUE_SIZE,
+    ) -> None:
+        self.store = store
+        self.worker_count = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self._queue: asyncio.Queue[tuple[Job, JobRunner, JobCleanup | None]] | None = None
+        self._workers: list[asyncio.Task[None]] = []
+        self._running: dict[str, asyncio.Task[None]] = {}
+
+    def _ensure_started(self) -> asyncio.Queue[tuple[Job, JobRunner, JobCleanup | None]]:
+        loop = asyncio.get_running_loop()
+        alive = [task for task in self._workers if not task.done() and task.get_loop() is loop]
+        if self._queue is None or not alive:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._workers = [
+                loop.create_task(self._work(self._queue)) for _ in range(self.worker_count)
+            ]
+        return self._queue
+
+    async def start(self) -> None:
+        self._ensure_started()
+
+    async def stop(self) -> None:
+        for task in [*self._workers, *self._running.values()]:
+            task.cancel()
+        await asyncio.gather(*self._workers, *self._running.values(), return_exceptions=True)
+        while self._queue is not None and not self._queue.empty():
+            job, _runner, cleanup = self._queue.get_nowait()
+            if job.status == "queued":
+                job.touch("cancelled")
+                self.store.persist(job)
+            if cleanup is not None:
+                cleanup()
+        self._workers = []
+        self._running = {}
+        self._queue = None
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def submit(self, runner: JobRunner, cleanup: JobCleanup | None = None) -> Job:
+        queue = self._ensure_started()
+        job = Job(id=uuid.uuid4().hex)
+        try:
+            queue.put_nowait((job, runner, cleanup))
+        except asyncio.QueueFull as exc:
+            raise QueueFullError("Job queue is full.") from exc
+        self.store.put(job)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        return self.store.get(job_id)
+
+    def cancel(self, job_id: str) -> Job | None:
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+        if job.status in ACTIVE_STATUSES:
+            task = self._running.get(job_id)
+            if task is not None:
+                task.cancel()
+            job.touch("cancelled")
+            self.store.persist(job)
+        else:
+            self.store.delete(job_id)
+        return job
+
+    async def _work(self, queue: asyncio.Queue[tuple[Job, JobRunner, JobCleanup | None]]) -> None:
+        while True:
+            job, runner, cleanup = await queue.get()
+            try:
+                if job.status != "queued":
+                    continue
+                job.touch("running")
+                task = asyncio.ensure_future(runner(job))
+                self._running[job.id] = task
+                try:
+                    await task
+                    job.touch("done")
+                except asyncio.CancelledError:
+                    if not task.cancelled():
+                        raise
+                    job.touch("cancelled")
+                except Exception as exc:
+                    job.error = str(getattr(exc, "detail", "") or exc).strip()[:200]
+                    job.touch("failed")
+                finally:
+                    self._running.pop(job.id, None)
+                self.store.persist(job)
+            finally:
+                if cleanup is not None:
+                    cleanup()
+                queue.task_done()
@@ -0,0 +1,385 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from dataclasses import dataclass, field
+import posixpath
+import re
+from typing import Callable, Iterable, Iterator, Sequence
+
+
+MAX_INPUT_DEPTH = 16
+MAIN_FILE_NAMES = ("main.tex", "thesis.tex", "paper.tex", "manuscript.tex")
+
+COMMENT_RE = re.compile(r"(?<!\\)%[^\n]*")
+STRUCTURE_RE = re.compile(r"\\(begin|end)\s*\{([^}]*)\}|\\(input|include)\s*\{([^}]*)\}")
+TOKEN_RE = re.compile(r"\\([A-Za-z@]+)\*?|\\(.)|\$\$|\$|~|[{}]", re.DOTALL)
+INLINE_MATH_COMMAND_RE = re.compile(r"\\([A-Za-z]+|.)")
+LABEL_RE = re.compile(r"\\label\s*\{([^}]*)\}")
+DOCUMENT_CLASS_RE = re.compile(r"\\documentclass")
+BEGIN_DOCUMENT_RE = re.compile(r"\\begin\s*\{document\}")
+# Text kept between chunks so a marker split across two is still found.
+MARKER_OVERLAP_CHARS = 64
+
+# Environments whose content is not prose: maths, code, drawings, tables and
+# the bibliography. Their labels are still indexed.
+SKIPPED_ENVIRONMENTS = frozenset(
+    """
+    equation equation* align align* alignat alignat* gather gather* multline multline*
+    flalign flalign* eqnarray eqnarray* displaymath math tikzpicture pgfpicture lstlisting
+    verbatim verbatim* Verbatim minted comment thebibliography tabular tabular* tabularx
+    longtable algorithmic filecontents filecontents*
+    """.split()
+)
+FLOAT_ENVIRONMENTS = {
+    "figure": "figure",
+    "figure*": "figure",
+    "subfigure": "figure",
+    "wrapfigure": "figure",
+    "table": "table",
+    "table*": "table",
+    "algorithm": "algorithm",
+}
+HEADING_COMMANDS = frozenset(
+    "part chapter section subsection subsubsection paragraph subparagraph title".split()
+)
+REF_COMMANDS = frozenset("ref eqref autoref cref Cref pageref nameref vref".split())
+CITE_COMMANDS = frozenset(
+    "cite citep citet citealp citeauthor citeyear parencite textcite autocite footcite nocite".split()
+)
+# Formatting wrappers whose last argument is prose.
+KEEP_COMMANDS = frozenset(
+    "textbf textit emph underline texttt textsc textrm textsf textup textsl mbox text "
+    "href hl uline".split()
+)
+# Commands whose arguments are layout, paths or metadata rather than prose.
+DROP_COMMANDS = frozenset(
+    """
+    footnote includegraphics url vspace hspace bibliography bibliographystyle usepackage
+    newcommand renewcommand providecommand setlength addtolength setcounter documentclass
+    graphicspath hypersetup pagestyle thispagestyle input include label caption
+    """.split()
+)
+ESCAPES = {
+    "%": "%", "&": "&", "_": "_", "#": "#", "$": "$", "{": "{", "}": "}",
+    "\\": " ", ",": " ", " ": " ",
+}
+TERMINAL_PUNCTUATION = ".!?。！？"
+
+
+@dataclass
+class LatexTarget:
+    kind: str
+    offset: int
+    caption_offset: int | None = None
+
+
+@dataclass
+class LatexIndex:
+    """Labels, references, citations and captions of a LaTeX source.
+
+    Offsets count characters of the prose stream produced by ``LatexReader``,
+    the same offsets ``iter_sentences`` reports, so ``sentence_at`` can place
+    each entry on a sentence.
+    """
+
+    files: list[str] = field(default_factory=list)
+    labels: dict[str, LatexTarget] = field(default_factory=dict)
+    refs: list[tuple[str, int]] = field(default_factory=list)
+    cites: list[tuple[str, int]] = field(default_factory=list)
+    captions: list[int] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.files)
+
+    @staticmethod
+    def sentence_at(starts: Sequence[int], offset: int) -> int:
+        return max(bisect_right(starts, offset) - 1, 0)
+
+
+def _has_main_markers(chunks: Iterable[str]) -> bool:
+    """True once ``\\documentclass`` and ``\\begin{document}`` have both been seen.
+
+    Chunks are scanned as they arrive, with a short overlap for markers split
+    across chunks, so a file is only read up to its ``\\begin{document}``.
+    """
+    tail = ""
+    has_class = has_begin = False
+    for chunk in chunks:
+        window = tail + chunk
+        has_class = has_class or DOCUMENT_CLASS_RE.search(window) is not None
+        has_begin = has_begin or BEGIN_DOCUMENT_RE.search(window) is not None
+        if has_class and has_begin:
+            return True
+        tail = window[-MARKER_OVERLAP_CHARS:]
+    return False
+
+
+def find_main_file(
+    names: Iterable[str], read: Callable[[str], Iterable[str] | str | None]
+) -> str | None:
+    """The ``.tex`` file with both ``\\documentclass`` and ``\\begin{document}``.
+
+    ``read`` returns a file's text, whole or as chunks; chunked files are
+    only consumed up to the markers. Conventional names (``main.tex``,
+    ``thesis.tex``...) and shallower paths are tried first.
+    """
+    candidates = [name for name in names if name.lower().endswith(".tex")]
+    candidates.sort(
+        key=lambda name: (
+            posixpath.basename(name).lower() not in MAIN_FILE_NAMES,
+            name.count("/"),
+            name.lower(),
+        )
+    )
+    for name in candidates:
+        text = read(name)
+        if text is None:
+            continue
+        if _has_main_markers([text] if isinstance(text, str) else text):
+            return name
+    return None
+
+
+def _balanced(text: str, start: int, open_char: str, close_char: str) -> int:
+    """Index just past the group opening at ``text[start]``."""
+    depth = 0
+    position = start
+    while position < len(text):
+        char = text[position]
+        if char == "\\":
+            position += 2
+            continue
+        if char == open_char:
+            depth += 1
+        elif char == close_char:
+            depth -= 1
+            if depth == 0:
+                return position + 1
+        position += 1
+    return len(text)
+
+
+def _read_arguments(text: str, position: int) -> tuple[list[str], int]:
+    """Brace arguments (optional ``[...]`` ones skipped) directly after a command."""
+    arguments: list[str] = []
+    while position < len(text):
+        lookahead = position
+        while lookahead < len(text) and text[lookahead] in " \t":
+            lookahead += 1
+        if lookahead < len(text) and text[lookahead] == "[" and not arguments:
+            position = _balanced(text, lookahead, "[", "]")
+        elif lookahead < len(text) and text[lookahead] == "{":
+            end = _balanced(text, lookahead, "{", "}")
+            arguments.append(text[lookahead + 1 : end - 1])
+            position = end
+        else:
+            break
+    return arguments, position
+
+
+def _math_text(math: str) -> str:
+    """Inline maths as plain text: ``$n = 120$`` → ``n = 120``, ``$5\\%$`` → ``5%``."""
+    text = INLINE_MATH_COMMAND_RE.sub(
+        lambda match: ESCAPES.get(match.group(1), "") if len(match.group(1)) == 1 else "", math
+    )
+    return re.sub(r"[{}^_]", "", text).strip()
+
+
+class LatexReader:
+    """Prose of a LaTeX project, following ``\\input``/``\\include`` as reached.
+
+    ``read(name)`` returns a project file's text (``None`` when missing) and is
+    only called for the main file and the inputs the body actually reaches.
+    The preamble, maths, code and tables are dropped; captions and headings
+    become sentences of their own, and ``index`` collects labels, references,
+    citations and captions on the way.
+    """
+
+    def __init__(
+        self,
+        read: Callable[[str], str | None],
+        index: LatexIndex | None = None,
+        max_depth: int = MAX_INPUT_DEPTH,
+    ) -> None:
+        self._read = read
+        self.index = index if index is not None else LatexIndex()
+        self.max_depth = max_depth
+        self._emitted = 0
+        self._in_body = False
+        self._done = False
+        self._visited: set[str] = set()
+        self._root = ""
+        # Open float environments: [kind, caption offset, labels defined inside].
+        self._floats: list[list] = []
+        self._envs: list[str] = []
+
+    def iter_text(self, main: str) -> Iterator[str]:
+        text = self._read(main)
+        if text is None:
+            return
+        self._root = posixpath.dirname(main)
+        # A fragment without \begin{document} is all body.
+        self._in_body = not BEGIN_DOCUMENT_RE.search(COMMENT_RE.sub("", text))
+        yield from self._walk(main, text, 0)
+
+    def _resolve(self, target: str) -> str:
+        # Like LaTeX itself, paths are relative to the main file's directory.
+        target = target.strip()
+        if not target.lower().endswith(".tex"):
+            target += ".tex"
+        return posixpath.normpath(posixpath.join(self._root, target))
+
+    def _walk(self, name: str, text: str | None, depth: int) -> Iterator[str]:
+        if text is None or name in self._visited:
+            return
+        self._visited.add(name)
+        self.index.files.append(name)
+        text = COMMENT_RE.sub("", text)
+        position = 0
+        while not self._done:
+            match = STRUCTURE_RE.search(text, position)
+            end = match.start() if match else len(text)
+            if self._in_body and end > position:
+                prose = self._prose(text[position:end])
+                if prose:
+                    self._emitted += len(prose)
+                    yield prose
+            if match is None:
+                return
+            position = match.end()
+            command, environment, include, target = match.groups()
+            if include:
+                if self._in_body and depth < self.max_depth:
+                    path = self._resolve(target)
+                    yield from self._walk(path, self._read(path), depth + 1)
+                continue
+            environment = (environment or "").strip()
+            if environment == "document":
+                self._in_body = command == "begin"
+                self._done = command == "end"
+                continue
+            if not self._in_body:
+                continue
+            if command == "begin":
+                if environment in SKIPPED_ENVIRONMENTS:
+                    position = self._skip_environment(text, position, environment)
+                    continue
+                self._envs.append(environment)
+                if environment in FLOAT_ENVIRONMENTS:
+                    self._floats.append([FLOAT_ENVIRONMENTS[environment], None, []])
+                    # Placement and width arguments: [t], {r}{0.5\textwidth}.
+                    position = _read_arguments(text, position)[1]
+                elif text.startswith("[", position):
+                    position = _balanced(text, position, "[", "]")
+            elif self._envs and self._envs[-1] == environment:
+                self._envs.pop()
+                if environment in FLOAT_ENVIRONMENTS and self._floats:
+                    self._floats.pop()
+
+    def _skip_environment(self, text: str, position: int, environment: str) -> int:
+        pattern = re.compile(r"\\(begin|end)\s*\{" + re.escape(environment) + r"\}")
+        depth = 1
+        cursor = position
+        while depth:
+            match = pattern.search(text, cursor)
+            if match is None:
+                cursor = len(text)
+                break
+            depth += 1 if match.group(1) == "begin" else -1
+            cursor = match.end()
+        for label in LABEL_RE.findall(text, position, cursor):
+            self.index.labels.setdefault(label.strip(), LatexTarget("equation", self._emitted))
+        return cursor
+
+    def _prose(self, segment: str) -> str:
+        out: list[str] = []
+        self._clean(segment, out)
+        return "".join(out)
+
+    def _offset(self, out: list[str]) -> int:
+        return self._emitted + sum(len(piece) for piece in out)
+
+    def _clean(self, text: str, out: list[str]) -> None:
+        position = 0
+        while position < len(text):
+            match = TOKEN_RE.search(text, position)
+            if match is None:
+                out.append(text[position:])
+                return
+            out.append(text[position : match.start()])
+            position = match.end()
+            token = match.group(0)
+            name, escaped = match.group(1), match.group(2)
+            if escaped in ("[", "("):
+                # \[...\] is display maths (dropped); \(...\) is inline.
+                closer = "\\]" if escaped == "[" else "\\)"
+                close = text.find(closer, position)
+                close = len(text) if close < 0 else close
+                if escaped == "(":
+                    out.append(_math_text(text[position:close]))
+                position = close + len(closer)
+            elif escaped is not None:
+                out.append(ESCAPES.get(escaped, ""))
+            elif name is not None:
+                arguments, position = _read_arguments(text, position)
+                self._command(name, arguments, out)
+            elif token in ("$", "$$"):
+                close = text.find(token, position)
+                while close > 0 and text[close - 1] == "\\":
+                    close = text.find(token, close + 1)
+                close = len(text) if close < 0 else close
+                if token == "$":
+                    out.append(_math_text(text[position:close]))
+                position = close + len(token)
+            elif token == "~":
+                out.append(" ")
+
+    def _sentence(self, text: str, out: list[str]) -> None:
+        """Emit ``text`` on its own line, closed with a full stop if it has none."""
+        out.append("\n")
+        mark = len(out)
+        self._clean(text, out)
+        cleaned = "".join(out[mark:]).rstrip()
+        if cleaned and cleaned[-1] not in TERMINAL_PUNCTUATION:
+            out.append(".")
+        out.append("\n")
+
+    def _command(self, name: str, arguments: list[str], out: list[str]) -> None:
+        if name in HEADING_COMMANDS and arguments:
+            self._sentence(arguments[-1], out)
+        elif name == "caption" and arguments:
+            # Where the caption text starts, past the newline ``_sentence`` adds.
+            offset = self._offset(out) + 1
+            self.index.captions.append(offset)
+            if self._floats:
+                self._floats[-1][1] = offset
+                for label in self._floats[-1][2]:
+                    self.index.labels[label].caption_offset = offset
+            self._sentence(arguments[-1], out)
+        elif name == "label" and arguments:
+            label = arguments[-1].strip()
+            kind = self._floats[-1][0] if self._floats else "section"
+            caption = self._floats[-1][1] if self._floats else None
+            self.index.labels[label] = LatexTarget(kind, self._offset(out), caption)
+            if self._floats:
+                self._floats[-1][2].append(label)
+        elif name in REF_COMMANDS and arguments:
+            keys = [key.strip() for key in arguments[-1].split(",") if key.strip()]
+            offset = self._offset(out)
+            self.index.refs.extend((key, offset) for key in keys)
+            out.append(", ".join(keys))
+        elif name in CITE_COMMANDS and arguments:
+            # "devices~\cite{x}." reads "devices." once the citation is gone.
+            while out and not out[-1].strip(" \t"):
+                out.pop()
+            if out:
+                out[-1] = out[-1].rstrip(" \t")
+            offset = self._offset(out)
+            self.index.cites.extend(
+                (key.strip(), offset) for key in arguments[-1].split(",") if key.strip()
+            )
+        elif name in KEEP_COMMANDS and arguments:
+            self._clean(arguments[-1], out)
+        elif name not in DROP_COMMANDS:
+            for argument in arguments:
+                self._clean(argument, out)
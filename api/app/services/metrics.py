@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from contextlib import contextmanager
+import threading
+import time
+from typing import Iterable, Iterator, TypeVar
+
+
+DEFAULT_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+
+T = TypeVar("T")
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0.0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple[str, ...], list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        # Layout per series: one slot per bucket, then +Inf count, then sum.
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            series[slot] += 1
+            series[-1] += value
+
+    def count(self, **labels: str) -> int:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            return int(sum(series[:-1])) if series else 0
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            cumulative = 0.0
+            for bound, hits in zip((*self.buckets, float("inf")), series[:-1]):
+                cumulative += hits
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(cumulative)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Counter | Histogram] = {}
+
+    def counter(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        metric = self._metrics.setdefault(name, Counter(name, help_text, labelnames))
+        assert isinstance(metric, Counter)
+        return metric
+
+    def histogram(
+        self, name: str, help_text: str, labelnames: tuple[str, ...] = ()
+    ) -> Histogram:
+        metric = self._metrics.setdefault(name, Histogram(name, help_text, labelnames))
+        assert isinstance(metric, Histogram)
+        return metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "pcp_stage_duration_seconds",
+    "Wall time of analysis stages (llm_request/llm_parse are per GLM call).",
+    ("stage",),
+)
+RESULT_CACHE = REGISTRY.counter(
+    "pcp_result_cache_total", "Result cache lookups by result.", ("result",)
+)
+REVIEW_MEMO = REGISTRY.counter(
+    "pcp_review_memo_total", "Per-window GLM review memo lookups by result.", ("result",)
+)
+GLM_REQUESTS = REGISTRY.counter(
+    "pcp_glm_requests_total", "GLM /chat/completions calls by outcome.", ("outcome",)
+)
+GLM_RETRIES = REGISTRY.counter("pcp_glm_retries_total", "GLM window requests sent again.")
+GLM_TIMEOUTS = REGISTRY.counter("pcp_glm_timeouts_total", "GLM calls that timed out.")
+GLM_BISECTIONS = REGISTRY.counter(
+    "pcp_glm_bisections_total", "Failing GLM windows split into two smaller windows."
+)
+GLM_SHORT_CIRCUITS = REGISTRY.counter(
+    "pcp_glm_short_circuits_total", "GLM window reviews skipped because the circuit was open."
+)
+GLM_HEDGES = REGISTRY.counter(
+    "pcp_glm_hedges_total",
+    "Hedged GLM calls by which request answered first (first, hedge, none).",
+    ("winner",),
+)
+GLM_ESCALATIONS = REGISTRY.counter(
+    "pcp_glm_escalations_total",
+    "Windows escalated from a cheap route to the primary model, by reason.",
+    ("reason",),
+)
+ADMISSION_REJECTED = REGISTRY.counter(
+    "pcp_admission_rejected_total", "Requests shed by an admission pool, by pool.", ("pool",)
+)
+RATE_LIMITED = REGISTRY.counter(
+    "pcp_rate_limited_total", "Requests refused by the rate limiter, by client key kind.", ("by",)
+)
+BYTES_INGESTED = REGISTRY.counter("pcp_bytes_ingested_total", "Upload bytes received.")
+
+
+def record_stage(timings: dict[str, float] | None, stage: str, seconds: float) -> None:
+    """Add ``seconds`` to ``timings[stage]`` (in ms) and to the stage histogram."""
+    seconds = max(seconds, 0.0)
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    if timings is not None:
+        timings[stage] = round(timings.get(stage, 0.0) + seconds * 1000, 3)
+
+
+@contextmanager
+def stage_timer(timings: dict[str, float] | None, stage: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(timings, stage, time.perf_counter() - started)
+
+
+def timed_iter(items: Iterable[T], timings: dict[str, float], stage: str) -> Iterator[T]:
+    """Yield from ``items`` while charging only the time spent producing them to ``stage``."""
+    iterator = iter(items)
+    elapsed = 0.0
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                elapsed += time.perf_counter() - started
+                return
+            elapsed += time.perf_counter() - started
+            yield item
+    finally:
+        record_stage(timings, stage, elapsed)
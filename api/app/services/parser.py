@@ -1,9 +1,27 @@
 from __future__ import annotations
 
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from dataclasses import dataclass
+import hashlib
+import importlib
 import io
+import math
+import multiprocessing
+import os
 from pathlib import Path
+import shutil
+import signal
+import tempfile
+import threading
+from typing import IO, Awaitable, Callable, Iterator
 import zipfile
 
+from app.services.charset import SNIFF_BYTES, StreamDecoder, looks_binary
+from app.services.latex import LatexIndex, LatexReader, find_main_file
+
 
 TEXT_SUFFIXES = {
     ".txt",
@@ -18,75 +36,492 @@ TEXT_SUFFIXES = {
     ".yaml",
     ".yml",
 }
+# Members of a batch ZIP that are treated as separate submissions.
+SUBMISSION_SUFFIXES = {".txt", ".tex", ".md", ".docx", ".pdf", ".zip"}
+
+
+DEFAULT_PDF_PARALLEL_MIN_PAGES = 16
+DEFAULT_PDF_PAGE_TIMEOUT_SECONDS = 10.0
+# Time a worker gets beyond its pages' timeouts before it is presumed stuck.
+EXTRACTION_GRACE_SECONDS = 30.0
+DEFAULT_DOCX_PARALLEL_MIN_BYTES = 2 * 1024 * 1024
+DEFAULT_UPLOAD_MAX_BYTES = 128 * 1024 * 1024
+DEFAULT_UPLOAD_SPOOL_MEMORY_BYTES = 2 * 1024 * 1024
+DEFAULT_ZIP_MAX_TOTAL_BYTES = 64 * 1024 * 1024
+DEFAULT_ZIP_MAX_MEMBERS = 2000
+DEFAULT_ZIP_MAX_RATIO = 100.0
+STREAM_CHUNK_BYTES = 64 * 1024
+DEFAULT_WARM_EXTRACTION_WORKERS = 1
+# Optional extractor libraries imported lazily on the request path.
+EXTRACTOR_MODULES = ("docx", "pypdf")
+
+_extraction_pool: ProcessPoolExecutor | None = None
+_extraction_pool_lock = threading.Lock()
+
+
+def _env_number(name: str, default_value: float) -> float:
+    raw = os.getenv(name, "").strip()
+    try:
+        value = float(raw) if raw else default_value
+    except ValueError:
+        return default_value
+    return value if value >= 0 else default_value
 
 
-def _decode_text(data: bytes) -> str:
-    for encoding in ("utf-8", "utf-16", "gb18030", "latin1"):
+def extraction_workers() -> int:
+    configured = int(_env_number("PARSER_PROCESSES", 0))
+    if configured > 0:
+        return configured
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+
+def get_extraction_pool() -> ProcessPoolExecutor:
+    global _extraction_pool
+    with _extraction_pool_lock:
+        if _extraction_pool is None:
+            # "spawn" keeps workers independent of the server's threads and event loop.
+            _extraction_pool = ProcessPoolExecutor(
+                max_workers=extraction_workers(),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=preload_extractors,
+            )
+        return _extraction_pool
+
+
+def preload_extractors() -> list[str]:
+    """Imports the available ``EXTRACTOR_MODULES`` and returns their names."""
+    loaded: list[str] = []
+    for name in EXTRACTOR_MODULES:
         try:
-            return data.decode(encoding)
-        except UnicodeDecodeError:
+            importlib.import_module(name)
+        except ImportError:
             continue
-    return data.decode("utf-8", errors="ignore")
+        loaded.append(name)
+    return loaded
+
+
+def warm_extraction_pool(max_workers: int = DEFAULT_WARM_EXTRACTION_WORKERS) -> int:
+    """Starts up to ``max_workers`` extraction workers now instead of on the
+    first large upload; the rest still start on demand.
+
+    Each worker is a full interpreter with the extractor libraries loaded, so
+    warming all of them would hold that memory on an idle instance. Returns
+    the number of workers warmed.
+    """
+    if max_workers <= 0:
+        return 0
+    warmed = min(extraction_workers(), max_workers)
+    pool = get_extraction_pool()
+    # Workers are spawned as tasks find none idle, so these start ``warmed`` at most.
+    for future in [pool.submit(preload_extractors) for _ in range(warmed)]:
+        future.result()
+    return warmed
 
 
-def _looks_binary(data: bytes) -> bool:
-    if not data:
-        return False
-    if b"\x00" in data:
-        return True
+def _discard_extraction_pool(pool: ProcessPoolExecutor) -> None:
+    """Drops a pool whose worker died; the next ``get_extraction_pool`` starts afresh."""
+    global _extraction_pool
+    with _extraction_pool_lock:
+        if _extraction_pool is pool:
+            _extraction_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
 
-    sample = data[:4096]
-    non_text_bytes = sum(1 for byte in sample if byte < 9 or (13 < byte < 32))
-    return non_text_bytes / max(len(sample), 1) > 0.3
 
+def _terminate_extraction_pool(pool: ProcessPoolExecutor) -> None:
+    """Kills the workers of a pool with a stuck task and drops the pool.
 
-def _extract_text_from_zip(data: bytes) -> str:
+    A running task cannot be cancelled, and a page stuck in C code never sees
+    its alarm. Other tasks on the pool fail with ``BrokenProcessPool`` and are
+    retried on a fresh pool by their callers.
+    """
+    processes = list((pool._processes or {}).values())
+    _discard_extraction_pool(pool)
+    for process in processes:
+        process.terminate()
+
+
+def shutdown_extraction_pool() -> None:
+    global _extraction_pool
+    with _extraction_pool_lock:
+        if _extraction_pool is not None:
+            _extraction_pool.shutdown(wait=False, cancel_futures=True)
+            _extraction_pool = None
+
+
+class _PageTimeout(Exception):
+    pass
+
+
+@contextmanager
+def _page_deadline(seconds: float) -> Iterator[None]:
+    # SIGALRM only exists on POSIX and only fires in the main thread, which is
+    # where pool workers run their tasks; request threads cannot be bounded,
+    # so PDFs only leave the pool when the page timeout is off.
+    usable = (
+        seconds > 0
+        and hasattr(signal, "setitimer")
+        and threading.current_thread() is threading.main_thread()
+    )
+    if not usable:
+        yield
+        return
+
+    def on_alarm(_signum: int, _frame: object) -> None:
+        raise _PageTimeout()
+
+    previous = signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
     try:
-        archive = zipfile.ZipFile(io.BytesIO(data))
-    except zipfile.BadZipFile as exc:
-        raise ValueError("Uploaded ZIP file is invalid.") from exc
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
 
-    chunks: list[str] = []
-    for item in sorted(archive.infolist(), key=lambda entry: entry.filename.lower()):
-        if item.is_dir():
-            continue
-        suffix = Path(item.filename).suffix.lower()
-        if suffix not in TEXT_SUFFIXES:
-            continue
 
-        content = archive.read(item)
-        if not content or _looks_binary(content):
+def _extract_pdf_pages(pages: list, page_timeout: float) -> list[str]:
+    texts: list[str] = []
+    for page in pages:
+        try:
+            with _page_deadline(page_timeout):
+                extracted = page.extract_text() or ""
+        except Exception:
             continue
+        if extracted.strip():
+            texts.append(extracted.strip())
+    return texts
 
-        text = _decode_text(content).strip()
+
+def _extract_pdf_range(
+    source: bytes | str, start: int, end: int, page_timeout: float
+) -> list[str]:
+    from pypdf import PdfReader  # type: ignore
+
+    stream: IO[bytes] = io.BytesIO(source) if isinstance(source, bytes) else open(source, "rb")
+    with stream:
+        reader = PdfReader(stream)
+        return _extract_pdf_pages(list(reader.pages[start:end]), page_timeout)
+
+
+def _submit_pdf_range(
+    source: str, start: int, end: int, page_timeout: float
+) -> tuple[ProcessPoolExecutor, Future[list[str]]] | None:
+    for _attempt in range(2):
+        pool = get_extraction_pool()
+        try:
+            return pool, pool.submit(_extract_pdf_range, source, start, end, page_timeout)
+        except (BrokenProcessPool, RuntimeError):
+            # Broken, or shut down by another upload that found it broken.
+            _discard_extraction_pool(pool)
+    return None
+
+
+def _extract_pdf_in_processes(
+    source: str, page_count: int, page_timeout: float, split: bool
+) -> list[str]:
+    """Pages of the PDF at ``source``, extracted in the worker pool.
+
+    With ``split`` the pages are spread over the workers in ranges. A range
+    whose worker died is retried once on a fresh pool; one whose worker
+    overruns its pages' timeouts has the worker killed and its pages skipped.
+    """
+    range_size = max(1, page_count)
+    if split:
+        # A few ranges per worker keeps cores busy when some pages are much slower.
+        range_size = max(1, math.ceil(page_count / (extraction_workers() * 4)))
+    ranges = [
+        (start, min(start + range_size, page_count))
+        for start in range(0, page_count, range_size)
+    ]
+    tasks = [_submit_pdf_range(source, start, end, page_timeout) for start, end in ranges]
+
+    pages: list[str] = []
+    for (start, end), task in zip(ranges, tasks):
+        # Pages time out inside the worker; this bound catches a worker stuck anyway.
+        budget = None
+        if page_timeout > 0:
+            budget = (end - start) * page_timeout + EXTRACTION_GRACE_SECONDS
+        retried = False
+        while task is not None:
+            pool, future = task
+            try:
+                pages.extend(future.result(timeout=budget))
+            except FutureTimeoutError:
+                if not future.running():
+                    # Queued behind other uploads' ranges; its clock has not started.
+                    continue
+                _terminate_extraction_pool(pool)
+            except (BrokenProcessPool, CancelledError):
+                # A worker died (killed for memory, say) and took the pool with it.
+                _discard_extraction_pool(pool)
+                if not retried:
+                    retried = True
+                    task = _submit_pdf_range(source, start, end, page_timeout)
+                    continue
+            except Exception:
+                pass
+            break
+    return pages
+
+
+def _extract_docx_paragraphs(source: bytes | str | IO[bytes]) -> str:
+    from docx import Document  # type: ignore
+
+    doc = Document(io.BytesIO(source) if isinstance(source, bytes) else source)
+    lines = [paragraph.text.strip() for paragraph in doc.paragraphs if paragraph.text.strip()]
+    return "\n".join(lines)
+
+
+@contextmanager
+def _as_named_file(stream: IO[bytes]) -> Iterator[str]:
+    # Worker processes cannot share an anonymous spool file, so hand them a path.
+    stream.seek(0)
+    with tempfile.NamedTemporaryFile(prefix="upload-", suffix=".bin") as named:
+        shutil.copyfileobj(stream, named, STREAM_CHUNK_BYTES)
+        named.flush()
+        yield named.name
+
+
+def _stream_size(stream: IO[bytes]) -> int:
+    position = stream.tell()
+    size = stream.seek(0, io.SEEK_END)
+    stream.seek(position)
+    return size
+
+
+def _iter_stream_text(
+    stream: IO[bytes],
+    first_chunk: bytes | None = None,
+    on_bytes: Callable[[int], None] | None = None,
+) -> Iterator[str]:
+    chunk = stream.read(STREAM_CHUNK_BYTES) if first_chunk is None else first_chunk
+    decoder = StreamDecoder(chunk)
+    while chunk:
+        if on_bytes is not None:
+            on_bytes(len(chunk))
+        text = decoder.decode(chunk)
         if text:
-            chunks.append(text)
+            yield text
+        chunk = stream.read(STREAM_CHUNK_BYTES)
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
 
-    if not chunks:
+@dataclass(frozen=True)
+class ZipLimits:
+    max_total_bytes: int = DEFAULT_ZIP_MAX_TOTAL_BYTES
+    max_members: int = DEFAULT_ZIP_MAX_MEMBERS
+    max_ratio: float = DEFAULT_ZIP_MAX_RATIO
+
+    @classmethod
+    def from_env(cls) -> ZipLimits:
+        return cls(
+            max_total_bytes=int(_env_number("ZIP_MAX_TOTAL_BYTES", DEFAULT_ZIP_MAX_TOTAL_BYTES)),
+            max_members=int(_env_number("ZIP_MAX_MEMBERS", DEFAULT_ZIP_MAX_MEMBERS)),
+            max_ratio=_env_number("ZIP_MAX_RATIO", DEFAULT_ZIP_MAX_RATIO),
+        )
+
+
+def _open_zip(stream: IO[bytes], limits: ZipLimits) -> zipfile.ZipFile:
+    try:
+        archive = zipfile.ZipFile(stream)
+    except zipfile.BadZipFile as exc:
+        raise ValueError("Uploaded ZIP file is invalid.") from exc
+    if len(archive.infolist()) > limits.max_members:
+        archive.close()
+        raise ValueError(f"Uploaded ZIP has more than {limits.max_members} entries.")
+    return archive
+
+
+def _check_zip_member(item: zipfile.ZipInfo, limits: ZipLimits, total_bytes: int) -> None:
+    if item.file_size > limits.max_ratio * max(item.compress_size, 1):
+        raise ValueError("Uploaded ZIP has a suspicious compression ratio.")
+    if total_bytes + item.file_size > limits.max_total_bytes:
+        raise ValueError("Uploaded ZIP expands beyond the allowed text size.")
+
+
+def iter_latex_text(source: str, structure: LatexIndex | None = None) -> Iterator[str]:
+    """Prose of a single ``.tex`` file; ``structure`` collects its labels and refs."""
+    yield from LatexReader(lambda _name: source, structure).iter_text("main.tex")
+
+
+def iter_zip_texts(
+    stream: IO[bytes],
+    limits: ZipLimits | None = None,
+    structure: LatexIndex | None = None,
+) -> Iterator[str]:
+    """Yield text of the archive's text members, reading each in bounded chunks.
+
+    When a ``.tex`` member has both ``\\documentclass`` and ``\\begin{document}``,
+    the archive is read as a LaTeX project instead: only that main file and
+    the ``\\input``/``\\include`` files its body reaches are decompressed, and
+    their prose is yielded in document order (see ``LatexReader``). Otherwise
+    members are separated by a blank line. Archives over ``limits`` raise
+    ``ValueError`` before their content is decompressed where the headers allow.
+    """
+    limits = limits or ZipLimits.from_env()
+    archive = _open_zip(stream, limits)
+
+    with archive:
+        entries = archive.infolist()
+        total_bytes = 0
+        # Decompressed bytes counted per member: a member read again (sniffed
+        # for the main file, then read for its text) is only counted once.
+        counted: dict[str, int] = {}
+
+        def check(item: zipfile.ZipInfo) -> None:
+            _check_zip_member(item, limits, total_bytes - counted.get(item.filename, 0))
+
+        def counter(name: str) -> Callable[[int], None]:
+            position = 0
+
+            def count(size: int) -> None:
+                nonlocal position, total_bytes
+                position += size
+                new_bytes = position - counted.get(name, 0)
+                if new_bytes <= 0:
+                    return
+                counted[name] = position
+                total_bytes += new_bytes
+                if total_bytes > limits.max_total_bytes:
+                    raise ValueError("Uploaded ZIP expands beyond the allowed text size.")
+
+            return count
+
+        members = {item.filename: item for item in entries if not item.is_dir()}
+
+        def is_text_member(name: str) -> bool:
+            return name in members and Path(name).suffix.lower() in TEXT_SUFFIXES
+
+        def iter_member(name: str) -> Iterator[str]:
+            item = members[name]
+            check(item)
+            with archive.open(item) as member:
+                first_chunk = member.read(STREAM_CHUNK_BYTES)
+                if first_chunk and not looks_binary(first_chunk):
+                    yield from _iter_stream_text(member, first_chunk, on_bytes=counter(name))
+
+        def sniff_member(name: str) -> Iterator[str] | None:
+            return iter_member(name) if is_text_member(name) else None
+
+        def read_member(name: str) -> str | None:
+            if not is_text_member(name):
+                return None
+            return "".join(iter_member(name))
+
+        # Candidates are only decompressed up to their \begin{document}.
+        main = find_main_file(members, sniff_member)
+        if main is not None:
+            yield from LatexReader(read_member, structure).iter_text(main)
+            return
+
+        emitted = False
+        for item in sorted(entries, key=lambda entry: entry.filename.lower()):
+            if item.is_dir():
+                continue
+            suffix = Path(item.filename).suffix.lower()
+            if suffix not in TEXT_SUFFIXES:
+                continue
+            check(item)
+
+            with archive.open(item) as member:
+                first_chunk = member.read(STREAM_CHUNK_BYTES)
+                if not first_chunk or looks_binary(first_chunk):
+                    continue
+                started = False
+                count = counter(item.filename)
+                for text in _iter_stream_text(member, first_chunk, on_bytes=count):
+                    if not started:
+                        text = text.lstrip()
+                        if not text:
+                            continue
+                        if emitted:
+                            yield "\n\n"
+                        started = True
+                    yield text
+                emitted = emitted or started
+
+    if not emitted:
         raise ValueError(
             "No readable text found in uploaded ZIP. Include .tex/.txt/.md files."
         )
-    return "\n\n".join(chunks)
 
 
-def parse_file_bytes(filename: str, data: bytes) -> str:
+def iter_zip_submissions(
+    stream: IO[bytes],
+    limits: ZipLimits | None = None,
+    memory_bytes: int = DEFAULT_UPLOAD_SPOOL_MEMORY_BYTES,
+) -> Iterator[tuple[str, SpooledUpload]]:
+    """Yield ``(member name, spooled copy)`` for each submission in a batch archive.
+
+    Unlike ``iter_zip_texts`` every supported member stays a separate document.
+    The same ``limits`` apply; the caller closes each yielded upload.
+    """
+    limits = limits or ZipLimits.from_env()
+    archive = _open_zip(stream, limits)
+
+    with archive:
+        total_bytes = 0
+        for item in sorted(archive.infolist(), key=lambda entry: entry.filename.lower()):
+            path = Path(item.filename)
+            if item.is_dir() or "__MACOSX" in path.parts or path.name.startswith("."):
+                continue
+            if path.suffix.lower() not in SUBMISSION_SUFFIXES:
+                continue
+            _check_zip_member(item, limits, total_bytes)
+            with archive.open(item) as member:
+                upload = spool_stream(
+                    member.read,
+                    max_bytes=limits.max_total_bytes - total_bytes,
+                    memory_bytes=memory_bytes,
+                )
+            total_bytes += upload.size
+            if upload.size:
+                yield item.filename, upload
+            else:
+                upload.close()
+
+
+def iter_upload_text(
+    filename: str, stream: IO[bytes], structure: LatexIndex | None = None
+) -> Iterator[str]:
+    """Text chunks of an upload. LaTeX sources (a ``.tex`` file or a project
+    ZIP) yield prose only and fill ``structure`` with their label/ref index."""
     suffix = Path(filename).suffix.lower()
+    stream.seek(0)
+
+    if suffix == ".tex":
+        yield from iter_latex_text("".join(_iter_stream_text(stream)), structure)
+        return
 
     if suffix in TEXT_SUFFIXES:
-        return _decode_text(data)
+        yield from _iter_stream_text(stream)
+        return
 
     if suffix == ".zip":
-        return _extract_text_from_zip(data)
+        yield from iter_zip_texts(stream, structure=structure)
+        return
 
     if suffix == ".docx":
         try:
-            from docx import Document  # type: ignore
+            from docx import Document  # type: ignore  # noqa: F401
         except ImportError as exc:  # pragma: no cover - runtime dependency
             raise ValueError("DOCX support requires python-docx. Please install dependencies.") from exc
 
-        doc = Document(io.BytesIO(data))
-        lines = [paragraph.text.strip() for paragraph in doc.paragraphs if paragraph.text.strip()]
-        return "\n".join(lines)
+        min_bytes = _env_number("DOCX_PARALLEL_MIN_BYTES", DEFAULT_DOCX_PARALLEL_MIN_BYTES)
+        if _stream_size(stream) >= min_bytes and extraction_workers() > 1:
+            pool = get_extraction_pool()
+            try:
+                with _as_named_file(stream) as path:
+                    yield pool.submit(_extract_docx_paragraphs, path).result()
+                return
+            except BrokenProcessPool:
+                _discard_extraction_pool(pool)
+                stream.seek(0)
+        yield _extract_docx_paragraphs(stream)
+        return
 
     if suffix == ".pdf":
         try:
@@ -95,25 +530,119 @@ def parse_file_bytes(filename: str, data: bytes) -> str:
             raise ValueError("PDF support requires pypdf. Please install dependencies.") from exc
 
         try:
-            reader = PdfReader(io.BytesIO(data))
+            reader = PdfReader(stream)
         except Exception as exc:
             raise ValueError(
                 "Failed to read PDF file. It may be encrypted, image-only, or malformed."
             ) from exc
 
-        pages: list[str] = []
-        for page in reader.pages:
-            try:
-                extracted = page.extract_text() or ""
-            except Exception:
-                continue
-            if extracted.strip():
-                pages.append(extracted.strip())
-        return "\n".join(pages)
+        page_timeout = _env_number("PDF_PAGE_TIMEOUT_SECONDS", DEFAULT_PDF_PAGE_TIMEOUT_SECONDS)
+        page_count = len(reader.pages)
+        min_pages = _env_number("PDF_PARALLEL_MIN_PAGES", DEFAULT_PDF_PARALLEL_MIN_PAGES)
+        split = page_count >= min_pages and extraction_workers() > 1
+        if split or page_timeout > 0:
+            # Only a worker process can bound a page, so the timeout needs the pool.
+            with _as_named_file(stream) as path:
+                pages = _extract_pdf_in_processes(path, page_count, page_timeout, split)
+        else:
+            pages = _extract_pdf_pages(list(reader.pages), page_timeout)
+        for idx, page in enumerate(pages):
+            yield "\n" + page if idx else page
+        return
 
-    if _looks_binary(data):
+    sample = stream.read(SNIFF_BYTES)
+    if looks_binary(sample):
         raise ValueError(
             "Unsupported binary file content. Please upload PDF, DOCX, LaTeX ZIP, or text files."
         )
+    stream.seek(0)
+    yield from _iter_stream_text(stream)
+
 
-    return _decode_text(data)
+def parse_upload(filename: str, stream: IO[bytes]) -> str:
+    return "".join(iter_upload_text(filename, stream))
+
+
+def parse_file_bytes(filename: str, data: bytes) -> str:
+    return parse_upload(filename, io.BytesIO(data))
+
+
+@dataclass
+class SpooledUpload:
+    """An upload copied to a spool file (memory first, then disk) while hashing it."""
+
+    file: IO[bytes]
+    size: int
+    sha256: bytes
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def spool_stream(
+    read: Callable[[int], bytes],
+    max_bytes: int = DEFAULT_UPLOAD_MAX_BYTES,
+    memory_bytes: int = DEFAULT_UPLOAD_SPOOL_MEMORY_BYTES,
+) -> SpooledUpload:
+    """Synchronous ``spool_upload`` for file-like sources such as ZIP members."""
+    spool = tempfile.SpooledTemporaryFile(max_size=memory_bytes)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        while True:
+            chunk = read(STREAM_CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise ValueError("Uploaded ZIP expands beyond the allowed text size.")
+            digest.update(chunk)
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return SpooledUpload(file=spool, size=size, sha256=digest.digest())
+
+
+def adopt_spool(file: IO[bytes], max_bytes: int = DEFAULT_UPLOAD_MAX_BYTES) -> SpooledUpload:
+    """Hashes an already spooled upload in place instead of copying it again.
+
+    The returned upload owns ``file``. Blocking: the spool may be on disk.
+    """
+    size = file.seek(0, io.SEEK_END)
+    if size > max_bytes:
+        limit_mb = max_bytes // (1024 * 1024)
+        raise ValueError(f"Uploaded file exceeds the {limit_mb} MB limit.")
+    file.seek(0)
+    digest = hashlib.sha256()
+    while chunk := file.read(STREAM_CHUNK_BYTES):
+        digest.update(chunk)
+    file.seek(0)
+    return SpooledUpload(file=file, size=size, sha256=digest.digest())
+
+
+async def spool_upload(
+    read: Callable[[int], Awaitable[bytes]],
+    max_bytes: int = DEFAULT_UPLOAD_MAX_BYTES,
+    memory_bytes: int = DEFAULT_UPLOAD_SPOOL_MEMORY_BYTES,
+) -> SpooledUpload:
+    spool = tempfile.SpooledTemporaryFile(max_size=memory_bytes)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        while True:
+            chunk = await read(STREAM_CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                limit_mb = max_bytes // (1024 * 1024)
+                raise ValueError(f"Uploaded file exceeds the {limit_mb} MB limit.")
+            digest.update(chunk)
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return SpooledUpload(file=spool, size=size, sha256=digest.digest())
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import random
+import time
+from typing import Callable
+
+from app.services.glm_client import (
+    ERROR_NETWORK,
+    ERROR_PARSE,
+    ERROR_RATE_LIMITED,
+    ERROR_SERVER,
+    ERROR_TIMEOUT,
+)
+
+
+DEFAULT_RETRY_BASE_DELAY = 0.5
+DEFAULT_RETRY_MAX_DELAY = 8.0
+DEFAULT_MAX_BISECT_DEPTH = 3
+DEFAULT_REVIEW_DEADLINE_SECONDS = 90
+DEFAULT_BREAKER_FAILURES = 5
+DEFAULT_BREAKER_RESET_SECONDS = 30
+
+# Worth sending the same payload again after a pause.
+RETRYABLE_ERRORS = frozenset({ERROR_TIMEOUT, ERROR_NETWORK, ERROR_RATE_LIMITED, ERROR_SERVER})
+# Likely caused by the payload size: a long generation that timed out, or one
+# that came back as broken JSON. Half the sentences usually succeeds.
+BISECTABLE_ERRORS = frozenset({ERROR_TIMEOUT, ERROR_PARSE})
+# Say something about the provider rather than the request; these trip the breaker.
+HEALTH_ERRORS = frozenset({ERROR_TIMEOUT, ERROR_NETWORK, ERROR_RATE_LIMITED, ERROR_SERVER})
+
+CIRCUIT_OPEN_ERROR = "GLM circuit open; provider failing, review skipped."
+DEADLINE_ERROR = "GLM review deadline exceeded."
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    retries: int = 1
+    base_delay: float = DEFAULT_RETRY_BASE_DELAY
+    max_delay: float = DEFAULT_RETRY_MAX_DELAY
+    max_bisect_depth: int = DEFAULT_MAX_BISECT_DEPTH
+    deadline_seconds: float | None = DEFAULT_REVIEW_DEADLINE_SECONDS
+
+    def backoff(self, attempt: int, retry_after: float | None = None) -> float:
+        """Full-jitter exponential delay before retry number ``attempt`` (1-based)."""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** max(attempt - 1, 0)))
+        delay = random.uniform(0, ceiling)
+        if retry_after is not None:
+            # Honour the provider's hint, but never wait longer than max_delay.
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker for one GLM endpoint.
+
+    After ``failure_threshold`` provider failures in a row the circuit opens and
+    ``allow`` refuses calls for ``reset_seconds``. Then a single probe is let
+    through (half-open): success closes the circuit, failure re-opens it, and
+    a probe that ends without an answer (cancelled) is released for the next
+    caller with ``release_probe``.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_BREAKER_FAILURES,
+        reset_seconds: float = DEFAULT_BREAKER_RESET_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._probing or self._clock() - self._opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def release_probe(self) -> None:
+        self._probing = False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._probing or self._failures >= self.failure_threshold:
+            self._opened_at = self._clock()
+            self._probing = False
+
+
+class CircuitBreakerRegistry:
+    """One breaker per GLM endpoint, model and API key, shared by every upload of the app."""
+
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_BREAKER_FAILURES,
+        reset_seconds: float = DEFAULT_BREAKER_RESET_SECONDS,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    def get(self, key: str) -> CircuitBreaker:
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(self.failure_threshold, self.reset_seconds)
+            self._breakers[key] = breaker
+        return breaker
@@ -0,0 +1,517 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+import hashlib
+from typing import Any, AsyncIterator, Callable, Sequence
+import zlib
+
+from app.services.cache import TieredCache
+from app.services.fingerprints import CandidatePair
+from app.services.glm_client import REVIEW_PROMPT, AsyncGLMClient
+from app.services.metrics import GLM_BISECTIONS, GLM_RETRIES, GLM_SHORT_CIRCUITS, REVIEW_MEMO
+from app.services.resilience import (
+    BISECTABLE_ERRORS,
+    CIRCUIT_OPEN_ERROR,
+    DEADLINE_ERROR,
+    HEALTH_ERRORS,
+    RETRYABLE_ERRORS,
+    CircuitBreaker,
+    RetryPolicy,
+)
+from app.services.tokens import (
+    DEFAULT_RESPONSE_TOKENS,
+    TokenCounter,
+    estimate_tokens,
+    model_context_tokens,
+)
+
+
+DEFAULT_WINDOW_TOKENS = 3000
+DEFAULT_WINDOW_OVERLAP = 2
+DEFAULT_REVIEW_CONCURRENCY = 4
+DEFAULT_WINDOW_RETRIES = 1
+# A window may end early, once half full, after a sentence whose checksum is a
+# multiple of this divisor. Boundaries then depend on sentence content rather
+# than position, so an edit only changes the windows around it.
+DEFAULT_BOUNDARY_DIVISOR = 16
+# JSON framing of one {"id": ..., "text": ...} entry in the request body.
+SENTENCE_OVERHEAD_TOKENS = 8
+
+
+def window_token_budget(
+    model: str,
+    window_tokens: int = 0,
+    count_tokens: TokenCounter = estimate_tokens,
+    response_tokens: int = DEFAULT_RESPONSE_TOKENS,
+    prompt: str = REVIEW_PROMPT,
+    route_models: Sequence[str] = (),
+) -> int:
+    """Sentence tokens one request may carry.
+
+    That is what the smallest context among ``model`` and the ``route_models``
+    a window may also be sent to leaves after ``prompt`` and the reserved
+    response, so long papers need as few requests as possible. A positive
+    ``window_tokens`` caps it further.
+    """
+    context = min(model_context_tokens(name) for name in (model, *route_models))
+    available = context - count_tokens(prompt) - response_tokens
+    if window_tokens > 0:
+        available = min(window_tokens, available)
+    return max(1, available)
+
+
+@dataclass(frozen=True)
+class ReviewWindow:
+    index: int
+    start: int
+    sentences: list[dict[str, str]]
+
+    @property
+    def sentence_ids(self) -> set[str]:
+        return {item["id"] for item in self.sentences}
+
+
+@dataclass
+class WindowOutcome:
+    window: ReviewWindow
+    issues: list[dict[str, Any]] = field(default_factory=list)
+    error: str = ""
+    error_kind: str = ""
+    attempts: int = 0
+    cached: bool = False
+    bisected: bool = False
+    request_seconds: float = 0.0
+    parse_seconds: float = 0.0
+
+    @property
+    def failed(self) -> bool:
+        return bool(self.error) and not self.issues
+
+
+def build_review_windows(
+    sentences: list[dict[str, str]],
+    max_tokens: int = DEFAULT_WINDOW_TOKENS,
+    overlap: int = DEFAULT_WINDOW_OVERLAP,
+    boundary_divisor: int = DEFAULT_BOUNDARY_DIVISOR,
+    count_tokens: TokenCounter = estimate_tokens,
+) -> list[ReviewWindow]:
+    # Sentences are never clipped: one longer than the budget gets a window of
+    # its own rather than losing the end of its claim.
+    prepared: list[dict[str, str]] = []
+    costs: list[int] = []
+    for idx, item in enumerate(sentences):
+        sid = str(item.get("id", f"s-{idx + 1}")).strip() or f"s-{idx + 1}"
+        text = str(item.get("text", "")).strip()
+        if not text:
+            continue
+        prepared.append({"id": sid, "text": text})
+        costs.append(count_tokens(text) + SENTENCE_OVERHEAD_TOKENS)
+
+    windows: list[ReviewWindow] = []
+    start = 0
+    while start < len(prepared):
+        end = start
+        used_tokens = 0
+        while end < len(prepared):
+            cost = costs[end]
+            if end > start and used_tokens + cost > max_tokens:
+                break
+            used_tokens += cost
+            end += 1
+            if boundary_divisor > 0 and used_tokens * 2 >= max_tokens:
+                checksum = zlib.crc32(prepared[end - 1]["text"].encode("utf-8"))
+                if checksum % boundary_divisor == 0:
+                    break
+        windows.append(ReviewWindow(index=len(windows), start=start, sentences=prepared[start:end]))
+        if end >= len(prepared):
+            break
+        # Overlap keeps claims that straddle a boundary visible to both windows,
+        # but each window must still advance by at least one sentence.
+        start = max(end - max(overlap, 0), start + 1)
+    return windows
+
+
+def pair_review_sentences(
+    sentences: list[dict[str, str]], pairs: list[CandidatePair]
+) -> list[dict[str, str]]:
+    """Candidate pairs as consecutive entries tagged ``"pair": "p-<n>"``.
+
+    A sentence in several pairs is repeated, once per pair, so every pair can
+    be judged on its own.
+    """
+    entries: list[dict[str, str]] = []
+    for number, pair in enumerate(pairs, start=1):
+        for index in (pair.first, pair.second):
+            item = sentences[index]
+            entries.append({"id": item["id"], "text": item["text"], "pair": f"p-{number}"})
+    return entries
+
+
+def build_pair_windows(
+    entries: list[dict[str, str]],
+    max_tokens: int = DEFAULT_WINDOW_TOKENS,
+    count_tokens: TokenCounter = estimate_tokens,
+) -> list[ReviewWindow]:
+    """Pack ``pair_review_sentences`` output into windows, never splitting a pair."""
+    windows: list[ReviewWindow] = []
+    current: list[dict[str, str]] = []
+    used_tokens = 0
+    start = 0
+    position = 0
+    while position < len(entries):
+        end = position + 1
+        while end < len(entries) and entries[end].get("pair") == entries[position].get("pair"):
+            end += 1
+        group = entries[position:end]
+        cost = sum(count_tokens(item["text"]) + SENTENCE_OVERHEAD_TOKENS for item in group)
+        if current and used_tokens + cost > max_tokens:
+            windows.append(ReviewWindow(index=len(windows), start=start, sentences=current))
+            current, used_tokens, start = [], 0, position
+        current.extend(group)
+        used_tokens += cost
+        position = end
+    if current:
+        windows.append(ReviewWindow(index=len(windows), start=start, sentences=current))
+    return windows
+
+
+def document_sentence_id(doc: int, sid: str) -> str:
+    return f"d{doc}:{sid}"
+
+
+def split_document_sentence_id(value: str) -> tuple[int, str] | None:
+    prefix, sep, sid = value.partition(":")
+    if not sep or not prefix.startswith("d") or not prefix[1:].isdigit():
+        return None
+    return int(prefix[1:]), sid
+
+
+def pack_documents(
+    documents: list[list[dict[str, str]]],
+    max_tokens: int = DEFAULT_WINDOW_TOKENS,
+    overlap: int = DEFAULT_WINDOW_OVERLAP,
+    count_tokens: TokenCounter = estimate_tokens,
+) -> list[ReviewWindow]:
+    """Windows over several documents, with sentence IDs prefixed ``d<index>:``.
+
+    Documents that fit the budget whole are packed together into shared
+    windows, first come first served, and never split across two of them.
+    Larger documents get their own windows from ``build_review_windows``, or
+    from ``build_pair_windows`` when the entries carry ``pair`` tags.
+    """
+    windows: list[ReviewWindow] = []
+    shared: list[dict[str, str]] = []
+    shared_tokens = 0
+
+    def flush() -> None:
+        nonlocal shared, shared_tokens
+        if shared:
+            windows.append(ReviewWindow(index=len(windows), start=0, sentences=shared))
+        shared, shared_tokens = [], 0
+
+    for doc, sentences in enumerate(documents):
+        prefixed = []
+        for item in sentences:
+            if not item.get("text", "").strip():
+                continue
+            entry = {"id": document_sentence_id(doc, item["id"]), "text": item["text"]}
+            if "pair" in item:
+                entry["pair"] = document_sentence_id(doc, item["pair"])
+            prefixed.append(entry)
+        if not prefixed:
+            continue
+        cost = sum(count_tokens(item["text"]) + SENTENCE_OVERHEAD_TOKENS for item in prefixed)
+        if cost > max_tokens:
+            if "pair" in prefixed[0]:
+                own_windows = build_pair_windows(prefixed, max_tokens, count_tokens)
+            else:
+                own_windows = build_review_windows(
+                    prefixed, max_tokens=max_tokens, overlap=overlap, count_tokens=count_tokens
+                )
+            for window in own_windows:
+                windows.append(
+                    ReviewWindow(index=len(windows), start=window.start, sentences=window.sentences)
+                )
+            continue
+        if shared_tokens + cost > max_tokens:
+            flush()
+        shared.extend(prefixed)
+        shared_tokens += cost
+    flush()
+    return windows
+
+
+def split_document_outcome(outcome: WindowOutcome) -> dict[int, WindowOutcome]:
+    """Undo ``pack_documents`` prefixes: one outcome per document in the window."""
+    sentences: dict[int, list[dict[str, str]]] = {}
+    for item in outcome.window.sentences:
+        parsed = split_document_sentence_id(item["id"])
+        if parsed is not None:
+            sentences.setdefault(parsed[0], []).append({"id": parsed[1], "text": item["text"]})
+    issues: dict[int, list[dict[str, Any]]] = {doc: [] for doc in sentences}
+    for issue in outcome.issues:
+        parsed = split_document_sentence_id(str(issue.get("sentence_id", "")).strip())
+        if parsed is not None and parsed[0] in issues:
+            issues[parsed[0]].append({**issue, "sentence_id": parsed[1]})
+    return {
+        doc: WindowOutcome(
+            ReviewWindow(index=outcome.window.index, start=outcome.window.start, sentences=items),
+            issues=issues[doc],
+            error=outcome.error,
+            error_kind=outcome.error_kind,
+            attempts=outcome.attempts,
+            cached=outcome.cached,
+            bisected=outcome.bisected,
+            request_seconds=outcome.request_seconds,
+            parse_seconds=outcome.parse_seconds,
+        )
+        for doc, items in sentences.items()
+    }
+
+
+def window_memo_key(window: ReviewWindow, scope: str) -> str:
+    digest = hashlib.sha256()
+    digest.update(scope.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(REVIEW_PROMPT.encode("utf-8"))
+    for item in window.sentences:
+        digest.update(b"\0")
+        digest.update(item["text"].encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _to_window_offsets(window: ReviewWindow, issues: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    positions = {item["id"]: offset for offset, item in enumerate(window.sentences)}
+    stored: list[dict[str, Any]] = []
+    for issue in issues:
+        entry = {key: value for key, value in issue.items() if key != "sentence_id"}
+        entry["offset"] = positions[str(issue.get("sentence_id", "")).strip()]
+        stored.append(entry)
+    return stored
+
+
+def _from_window_offsets(window: ReviewWindow, stored: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    issues: list[dict[str, Any]] = []
+    for entry in stored:
+        offset = entry.get("offset")
+        if not isinstance(offset, int) or not 0 <= offset < len(window.sentences):
+            continue
+        issue = {key: value for key, value in entry.items() if key != "offset"}
+        issue["sentence_id"] = window.sentences[offset]["id"]
+        issues.append(issue)
+    return issues
+
+
+async def _review_once(
+    client_factory: Callable[[], AsyncGLMClient],
+    outcome: WindowOutcome,
+    slots: asyncio.Semaphore,
+    timeout_cap: float | None = None,
+) -> float | None:
+    """Send the window once; returns the provider's Retry-After hint, if any."""
+    async with slots:
+        client = client_factory()
+        if timeout_cap is not None:
+            client.timeout = max(0.1, min(getattr(client, "timeout", timeout_cap), timeout_cap))
+        raw_issues = await client.review(outcome.window.sentences)
+    outcome.attempts += 1
+    outcome.request_seconds += getattr(client, "last_request_seconds", 0.0)
+    outcome.parse_seconds += getattr(client, "last_parse_seconds", 0.0)
+    window_ids = outcome.window.sentence_ids
+    outcome.issues = [
+        item for item in raw_issues if str(item.get("sentence_id", "")).strip() in window_ids
+    ]
+    outcome.error = client.last_error if not raw_issues else ""
+    outcome.error_kind = getattr(client, "last_error_kind", "") if outcome.error else ""
+    return getattr(client, "last_retry_after", None)
+
+
+def _remaining(deadline: float | None) -> float | None:
+    return None if deadline is None else deadline - asyncio.get_running_loop().time()
+
+
+async def _review_resilient(
+    client_factory: Callable[[], AsyncGLMClient],
+    window: ReviewWindow,
+    slots: asyncio.Semaphore,
+    policy: RetryPolicy,
+    breaker: CircuitBreaker | None,
+    deadline: float | None,
+    depth: int = 0,
+) -> WindowOutcome:
+    """Review one window, retrying transient errors and bisecting oversized ones."""
+    outcome = WindowOutcome(window)
+    while True:
+        if breaker is not None and not breaker.allow():
+            GLM_SHORT_CIRCUITS.inc()
+            outcome.error = outcome.error or CIRCUIT_OPEN_ERROR
+            outcome.error_kind = outcome.error_kind or "circuit_open"
+            return outcome
+        remaining = _remaining(deadline)
+        if remaining is not None and remaining <= 0:
+            outcome.error = outcome.error or DEADLINE_ERROR
+            outcome.error_kind = outcome.error_kind or "deadline"
+            return outcome
+
+        # Outside a closed circuit, a caller let through holds the half-open probe.
+        probing = breaker is not None and breaker.state != "closed"
+        try:
+            retry_after = await _review_once(client_factory, outcome, slots, timeout_cap=remaining)
+        except BaseException:
+            if probing:
+                breaker.release_probe()
+            raise
+        if breaker is not None:
+            if outcome.error_kind in HEALTH_ERRORS:
+                breaker.record_failure()
+            else:
+                # Any answer, even a rejected or unparsable one, shows the provider is up.
+                breaker.record_success()
+        if not outcome.failed:
+            return outcome
+
+        if (
+            outcome.error_kind in BISECTABLE_ERRORS
+            and len(window.sentences) > 1
+            and depth < policy.max_bisect_depth
+        ):
+            return await _review_halves(
+                client_factory, outcome, slots, policy, breaker, deadline, depth
+            )
+        if outcome.error_kind not in RETRYABLE_ERRORS or outcome.attempts > policy.retries:
+            return outcome
+        delay = policy.backoff(outcome.attempts, retry_after)
+        remaining = _remaining(deadline)
+        if remaining is not None and delay >= remaining:
+            return outcome
+        GLM_RETRIES.inc()
+        await asyncio.sleep(delay)
+
+
+async def _review_halves(
+    client_factory: Callable[[], AsyncGLMClient],
+    failed: WindowOutcome,
+    slots: asyncio.Semaphore,
+    policy: RetryPolicy,
+    breaker: CircuitBreaker | None,
+    deadline: float | None,
+    depth: int,
+) -> WindowOutcome:
+    GLM_BISECTIONS.inc()
+    window = failed.window
+    middle = len(window.sentences) // 2
+    pair = window.sentences[middle].get("pair")
+    if (
+        pair
+        and pair == window.sentences[middle - 1].get("pair")
+        and middle + 1 < len(window.sentences)
+    ):
+        # Pair windows are split between pairs, never inside one.
+        middle += 1
+    halves = [
+        ReviewWindow(index=window.index, start=window.start, sentences=window.sentences[:middle]),
+        ReviewWindow(
+            index=window.index, start=window.start + middle, sentences=window.sentences[middle:]
+        ),
+    ]
+    parts = await asyncio.gather(
+        *(
+            _review_resilient(client_factory, half, slots, policy, breaker, deadline, depth + 1)
+            for half in halves
+        )
+    )
+    merged = WindowOutcome(
+        window,
+        issues=[issue for part in parts for issue in part.issues],
+        attempts=failed.attempts + sum(part.attempts for part in parts),
+        bisected=True,
+        request_seconds=failed.request_seconds + sum(part.request_seconds for part in parts),
+        parse_seconds=failed.parse_seconds + sum(part.parse_seconds for part in parts),
+    )
+    errored = [part for part in parts if part.error]
+    if errored:
+        merged.error = errored[0].error
+        merged.error_kind = errored[0].error_kind
+    return merged
+
+
+async def iter_window_reviews(
+    client_factory: Callable[[], AsyncGLMClient],
+    windows: list[ReviewWindow],
+    concurrency: int = DEFAULT_REVIEW_CONCURRENCY,
+    retries: int = DEFAULT_WINDOW_RETRIES,
+    memo: TieredCache | None = None,
+    memo_scope: str = "",
+    policy: RetryPolicy | None = None,
+    breaker: CircuitBreaker | None = None,
+) -> AsyncIterator[WindowOutcome]:
+    """Review windows concurrently and yield each outcome as soon as it settles.
+
+    Transient failures (timeouts, network errors, 429s, 5xx) are retried with
+    jittered backoff, and windows that time out or return broken JSON are split
+    in half, all within ``policy.deadline_seconds``. While ``breaker`` is open,
+    windows fail immediately instead of waiting on a provider that is down.
+    With a ``memo``, windows whose sentence texts were reviewed before are
+    answered from it, with sentence IDs remapped to the current numbering.
+    """
+    policy = policy or RetryPolicy(retries=retries)
+    deadline = None
+    if policy.deadline_seconds is not None:
+        deadline = asyncio.get_running_loop().time() + policy.deadline_seconds
+    slots = asyncio.Semaphore(max(1, concurrency))
+    pending: set[asyncio.Future[WindowOutcome]] = set()
+    memo_keys: dict[int, str] = {}
+    for window in windows:
+        if memo is not None:
+            memo_keys[window.index] = window_memo_key(window, memo_scope)
+            stored = await memo.aget(memo_keys[window.index])
+            REVIEW_MEMO.inc(result="hit" if isinstance(stored, list) else "miss")
+            if isinstance(stored, list):
+                yield WindowOutcome(window, issues=_from_window_offsets(window, stored), cached=True)
+                continue
+        pending.add(
+            asyncio.ensure_future(
+                _review_resilient(client_factory, window, slots, policy, breaker, deadline)
+            )
+        )
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                outcome = task.result()
+                if memo is not None and not outcome.error:
+                    await memo.aset(
+                        memo_keys[outcome.window.index],
+                        _to_window_offsets(outcome.window, outcome.issues),
+                    )
+                yield outcome
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def review_windows(
+    client_factory: Callable[[], AsyncGLMClient],
+    windows: list[ReviewWindow],
+    concurrency: int = DEFAULT_REVIEW_CONCURRENCY,
+    retries: int = DEFAULT_WINDOW_RETRIES,
+    memo: TieredCache | None = None,
+    memo_scope: str = "",
+    policy: RetryPolicy | None = None,
+    breaker: CircuitBreaker | None = None,
+) -> list[WindowOutcome]:
+    outcomes = [
+        outcome
+        async for outcome in iter_window_reviews(
+            client_factory,
+            windows,
+            concurrency,
+            retries,
+            memo=memo,
+            memo_scope=memo_scope,
+            policy=policy,
+            breaker=breaker,
+        )
+    ]
+    return sorted(outcomes, key=lambda outcome: outcome.window.index)
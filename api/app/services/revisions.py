@@ -0,0 +1,327 @@
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+import hashlib
+from pathlib import Path
+import sqlite3
+import threading
+import time
+from typing import Any, Iterable, Sequence
+
+from app.services.tables import sentence_id, sentence_index
+
+
+DEFAULT_MAX_REVISIONS = 20
+ISSUE_FIELDS = ("id", "type", "severity", "sentence_id", "title", "detail")
+
+
+def sentence_hash(text: str) -> int:
+    """Signed 64-bit hash of ``text`` with whitespace runs collapsed."""
+    digest = hashlib.blake2b(" ".join(text.split()).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+@dataclass
+class Revision:
+    doc_id: str
+    revision: int
+    fingerprint: str
+    created_at: float
+    sentences: list[str]
+    hashes: list[int]
+    issues: list[dict[str, Any]]
+
+
+def align_sentences(old: Sequence[int], new: Sequence[int]) -> dict[int, int]:
+    """Maps old sentence indexes to the new indexes holding the same text.
+
+    The common head and tail are matched by hash directly, so a small edit
+    only runs ``SequenceMatcher`` over the few sentences around it.
+    """
+    head = 0
+    limit = min(len(old), len(new))
+    while head < limit and old[head] == new[head]:
+        head += 1
+    tail = 0
+    while tail < limit - head and old[-1 - tail] == new[-1 - tail]:
+        tail += 1
+
+    mapping = {index: index for index in range(head)}
+    shift = len(new) - len(old)
+    mapping.update((index, index + shift) for index in range(len(old) - tail, len(old)))
+    matcher = SequenceMatcher(
+        None, old[head : len(old) - tail], new[head : len(new) - tail], autojunk=False
+    )
+    for old_start, new_start, size in matcher.get_matching_blocks():
+        for offset in range(size):
+            mapping[head + old_start + offset] = head + new_start + offset
+    return mapping
+
+
+def _issue_key(issue: dict[str, Any], hashes: Sequence[int]) -> tuple[str, str, int | None]:
+    index = sentence_index(str(issue.get("sentence_id", "")))
+    anchor = hashes[index] if 0 <= index < len(hashes) else None
+    return str(issue.get("type", "")), str(issue.get("title", "")), anchor
+
+
+def diff_revisions(old: Revision, new: Revision) -> dict[str, Any]:
+    """Sentence and issue changes from ``old`` to ``new``.
+
+    Issues are matched by type, title and the text of their sentence, so
+    renumbered sentences do not show up as changes. An old issue that is not
+    matched is ``resolved`` when its sentence survives unchanged in ``new``
+    and ``removed`` when the sentence was edited or deleted; ``resolved``
+    entries carry ``to_sentence_id``, the sentence's id in ``new``. Issue
+    entries use the sentence ids of the revision they come from.
+    """
+    mapping = align_sentences(old.hashes, new.hashes)
+    kept = set(mapping.values())
+
+    old_keys = [_issue_key(issue, old.hashes) for issue in old.issues]
+    new_keys = [_issue_key(issue, new.hashes) for issue in new.issues]
+    unmatched_new = Counter(new_keys)
+    unmatched_new.subtract(old_keys)
+    unmatched_old = Counter(old_keys)
+    unmatched_old.subtract(new_keys)
+
+    added: list[dict[str, Any]] = []
+    for issue, key in zip(new.issues, new_keys):
+        if unmatched_new[key] > 0:
+            unmatched_new[key] -= 1
+            added.append(issue)
+
+    removed: list[dict[str, Any]] = []
+    resolved: list[dict[str, Any]] = []
+    for issue, key in zip(old.issues, old_keys):
+        if unmatched_old[key] <= 0:
+            continue
+        unmatched_old[key] -= 1
+        index = sentence_index(str(issue.get("sentence_id", "")))
+        if index in mapping:
+            resolved.append(dict(issue, to_sentence_id=sentence_id(mapping[index])))
+        else:
+            removed.append(issue)
+
+    return {
+        "doc_id": new.doc_id,
+        "from": old.revision,
+        "to": new.revision,
+        "sentences": {
+            "unchanged": len(mapping),
+            "added": [
+                {"id": sentence_id(index), "text": text}
+                for index, text in enumerate(new.sentences)
+                if index not in kept
+            ],
+            "removed": [
+                {"id": sentence_id(index), "text": text}
+                for index, text in enumerate(old.sentences)
+                if index not in mapping
+            ],
+        },
+        "issues": {
+            "unchanged": len(new.issues) - len(added),
+            "added": added,
+            "removed": removed,
+            "resolved": resolved,
+        },
+    }
+
+
+class AnalysisStore:
+    """Persistent analysis results, one numbered revision per document upload.
+
+    Revisions are keyed by ``(doc_id, revision)`` and indexed by the upload's
+    SHA-256 fingerprint; sentences are stored with their hashes so diffs do
+    not re-hash old revisions. Re-saving the latest revision's fingerprint
+    updates its issues instead of adding a revision, and only the newest
+    ``max_revisions`` revisions of each document are kept. Without
+    ``sqlite_path`` the store lives in an in-memory SQLite database.
+    """
+
+    def __init__(
+        self, sqlite_path: str | None = None, max_revisions: int = DEFAULT_MAX_REVISIONS
+    ) -> None:
+        self.sqlite_path = sqlite_path or None
+        self.max_revisions = max(1, max_revisions)
+        if self.sqlite_path:
+            Path(self.sqlite_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.sqlite_path or ":memory:", check_same_thread=False)
+        if self.sqlite_path:
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS analysis_revisions ("
+            "doc_id TEXT NOT NULL, revision INTEGER NOT NULL, fingerprint TEXT NOT NULL, "
+            "title TEXT NOT NULL, sentence_count INTEGER NOT NULL, issue_count INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, PRIMARY KEY (doc_id, revision));"
+            "CREATE INDEX IF NOT EXISTS analysis_revisions_fingerprint "
+            "ON analysis_revisions (fingerprint);"
+            "CREATE TABLE IF NOT EXISTS analysis_sentences ("
+            "doc_id TEXT NOT NULL, revision INTEGER NOT NULL, position INTEGER NOT NULL, "
+            "hash INTEGER NOT NULL, text TEXT NOT NULL, "
+            "PRIMARY KEY (doc_id, revision, position)) WITHOUT ROWID;"
+            "CREATE TABLE IF NOT EXISTS analysis_issues ("
+            "doc_id TEXT NOT NULL, revision INTEGER NOT NULL, position INTEGER NOT NULL, "
+            "issue_id TEXT NOT NULL, type TEXT NOT NULL, severity TEXT NOT NULL, "
+            "sentence_id TEXT NOT NULL, title TEXT NOT NULL, detail TEXT NOT NULL, "
+            "PRIMARY KEY (doc_id, revision, position)) WITHOUT ROWID;"
+        )
+        self._db.commit()
+
+    def _latest_locked(self, doc_id: str) -> tuple[int, str] | None:
+        return self._db.execute(
+            "SELECT revision, fingerprint FROM analysis_revisions WHERE doc_id = ? "
+            "ORDER BY revision DESC LIMIT 1",
+            (doc_id,),
+        ).fetchone()
+
+    def _write_issues_locked(
+        self, doc_id: str, revision: int, issues: Sequence[dict[str, Any]]
+    ) -> None:
+        self._db.execute(
+            "DELETE FROM analysis_issues WHERE doc_id = ? AND revision = ?", (doc_id, revision)
+        )
+        self._db.executemany(
+            "INSERT INTO analysis_issues (doc_id, revision, position, issue_id, type, severity, "
+            "sentence_id, title, detail) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (doc_id, revision, position, *(str(issue.get(field, "")) for field in ISSUE_FIELDS))
+                for position, issue in enumerate(issues)
+            ],
+        )
+
+    def _delete_locked(self, doc_id: str, below: int | None = None) -> int:
+        clause, params = "doc_id = ?", [doc_id]
+        if below is not None:
+            clause += " AND revision < ?"
+            params.append(below)
+        for table in ("analysis_sentences", "analysis_issues"):
+            self._db.execute(f"DELETE FROM {table} WHERE {clause}", params)
+        return self._db.execute(f"DELETE FROM analysis_revisions WHERE {clause}", params).rowcount
+
+    def save(
+        self,
+        doc_id: str,
+        fingerprint: str,
+        sentences: Iterable[str],
+        issues: Sequence[dict[str, Any]],
+        title: str = "",
+    ) -> int:
+        """Stores an analysis of ``doc_id`` and returns its revision number."""
+        texts = list(sentences)
+        with self._lock, self._db:
+            latest = self._latest_locked(doc_id)
+            if latest is not None and latest[1] == fingerprint:
+                revision = latest[0]
+                self._write_issues_locked(doc_id, revision, issues)
+                self._db.execute(
+                    "UPDATE analysis_revisions SET issue_count = ? "
+                    "WHERE doc_id = ? AND revision = ?",
+                    (len(issues), doc_id, revision),
+                )
+                return revision
+
+            revision = latest[0] + 1 if latest is not None else 1
+            self._db.execute(
+                "INSERT INTO analysis_revisions (doc_id, revision, fingerprint, title, "
+                "sentence_count, issue_count, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (doc_id, revision, fingerprint, title, len(texts), len(issues), time.time()),
+            )
+            self._db.executemany(
+                "INSERT INTO analysis_sentences (doc_id, revision, position, hash, text) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (doc_id, revision, position, sentence_hash(text), text)
+                    for position, text in enumerate(texts)
+                ],
+            )
+            self._write_issues_locked(doc_id, revision, issues)
+            self._delete_locked(doc_id, below=revision - self.max_revisions + 1)
+        return revision
+
+    def latest_revision(self, doc_id: str) -> int | None:
+        with self._lock:
+            latest = self._latest_locked(doc_id)
+        return latest[0] if latest is not None else None
+
+    def load(self, doc_id: str, revision: int) -> Revision | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT fingerprint, created_at FROM analysis_revisions "
+                "WHERE doc_id = ? AND revision = ?",
+                (doc_id, revision),
+            ).fetchone()
+            if row is None:
+                return None
+            sentences = self._db.execute(
+                "SELECT hash, text FROM analysis_sentences WHERE doc_id = ? AND revision = ? "
+                "ORDER BY position",
+                (doc_id, revision),
+            ).fetchall()
+            issues = self._db.execute(
+                "SELECT issue_id, type, severity, sentence_id, title, detail FROM analysis_issues "
+                "WHERE doc_id = ? AND revision = ? ORDER BY position",
+                (doc_id, revision),
+            ).fetchall()
+        return Revision(
+            doc_id=doc_id,
+            revision=revision,
+            fingerprint=row[0],
+            created_at=row[1],
+            sentences=[text for _hash, text in sentences],
+            hashes=[value for value, _text in sentences],
+            issues=[dict(zip(ISSUE_FIELDS, issue)) for issue in issues],
+        )
+
+    def revisions(self, doc_id: str) -> list[dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT revision, fingerprint, title, sentence_count, issue_count, created_at "
+                "FROM analysis_revisions WHERE doc_id = ? ORDER BY revision",
+                (doc_id,),
+            ).fetchall()
+        return [
+            {
+                "revision": revision,
+                "fingerprint": fingerprint,
+                "title": title,
+                "sentences": sentence_count,
+                "issues": issue_count,
+                "created_at": created_at,
+            }
+            for revision, fingerprint, title, sentence_count, issue_count, created_at in rows
+        ]
+
+    def find(self, fingerprint: str) -> list[tuple[str, int]]:
+        """``(doc_id, revision)`` pairs stored for an upload fingerprint."""
+        with self._lock:
+            return [
+                (doc_id, revision)
+                for doc_id, revision in self._db.execute(
+                    "SELECT doc_id, revision FROM analysis_revisions WHERE fingerprint = ? "
+                    "ORDER BY doc_id, revision",
+                    (fingerprint,),
+                )
+            ]
+
+    def documents(self) -> list[dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT doc_id, MAX(revision), COUNT(*), MAX(created_at) FROM analysis_revisions "
+                "GROUP BY doc_id ORDER BY MAX(created_at)"
+            ).fetchall()
+        return [
+            {"doc_id": doc_id, "latest": latest, "revisions": count, "updated_at": updated_at}
+            for doc_id, latest, count, updated_at in rows
+        ]
+
+    def remove(self, doc_id: str) -> bool:
+        with self._lock, self._db:
+            return bool(self._delete_locked(doc_id))
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
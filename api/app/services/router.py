@@ -0,0 +1,348 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass, replace
+import hashlib
+import json
+import os
+import random
+import time
+from typing import Any
+
+from app.services.glm_client import REVIEW_PROMPT, AsyncGLMClient, GLMConnectionPool
+from app.services.metrics import GLM_ESCALATIONS, GLM_HEDGES
+from app.services.resilience import HEALTH_ERRORS
+
+
+TIER_PRIMARY = "primary"
+TIER_CHEAP = "cheap"
+TIERS = (TIER_PRIMARY, TIER_CHEAP)
+
+DEFAULT_HEDGE_QUANTILE = 0.9
+DEFAULT_HEDGE_MAX_RATIO = 0.2
+DEFAULT_HEDGE_DELAY_SECONDS = 2.0
+DEFAULT_HEDGE_MIN_DELAY_SECONDS = 0.05
+# Latencies kept per route for the hedge quantile; older ones age out.
+LATENCY_WINDOW = 128
+# Below this many samples the quantile is noise; DEFAULT_HEDGE_DELAY_SECONDS applies.
+MIN_LATENCY_SAMPLES = 8
+EWMA_ALPHA = 0.2
+# A failed call counts as this many times the route's typical latency.
+FAILURE_LATENCY_PENALTY = 4.0
+
+
+@dataclass(frozen=True)
+class Route:
+    """One OpenAI-compatible ``/chat/completions`` endpoint and model."""
+
+    base_url: str
+    model: str
+    api_key: str = ""
+    weight: float = 1.0
+    tier: str = TIER_PRIMARY
+
+    @property
+    def key(self) -> str:
+        return f"{self.base_url.rstrip('/')}|{self.model.strip()}"
+
+
+def load_routes(raw: str) -> list[Route]:
+    """Parse ``GLM_ROUTES``: a JSON list of ``{"base_url", "model", "weight", "tier",
+    "api_key_env"}`` objects. Keys are read from the named environment variables,
+    never from the JSON itself; routes without one use the request's key, and
+    only when they share the request's ``base_url``."""
+    if not raw.strip():
+        return []
+    try:
+        entries = json.loads(raw)
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"GLM_ROUTES is not valid JSON: {exc}") from exc
+    if not isinstance(entries, list):
+        raise ValueError("GLM_ROUTES must be a JSON list of route objects.")
+    routes: list[Route] = []
+    for entry in entries:
+        if not isinstance(entry, dict) or not entry.get("base_url") or not entry.get("model"):
+            raise ValueError("Each GLM_ROUTES entry needs a base_url and a model.")
+        tier = str(entry.get("tier", TIER_PRIMARY)).strip().lower()
+        if tier not in TIERS:
+            raise ValueError(f"GLM_ROUTES tier must be one of {', '.join(TIERS)}.")
+        key_env = str(entry.get("api_key_env", "")).strip()
+        routes.append(
+            Route(
+                base_url=str(entry["base_url"]).rstrip("/"),
+                model=str(entry["model"]).strip(),
+                api_key=os.getenv(key_env, "").strip() if key_env else "",
+                weight=max(float(entry.get("weight", 1.0)), 0.0),
+                tier=tier,
+            )
+        )
+    return routes
+
+
+class LatencyStats:
+    """Recent successful latencies of one route plus a failure-penalised EWMA."""
+
+    def __init__(self, window: int = LATENCY_WINDOW) -> None:
+        self.samples: deque[float] = deque(maxlen=window)
+        self.ewma: float | None = None
+        self.failures = 0
+
+    def _smooth(self, seconds: float) -> None:
+        self.ewma = seconds if self.ewma is None else (
+            EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * self.ewma
+        )
+
+    def record_success(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        self._smooth(seconds)
+
+    def record_failure(self, seconds: float) -> None:
+        self.failures += 1
+        self._smooth(max(seconds, self.ewma or seconds) * FAILURE_LATENCY_PENALTY)
+
+    def quantile(self, q: float) -> float | None:
+        if len(self.samples) < MIN_LATENCY_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class ModelRouter:
+    """App-wide routing state: configured routes, their latency stats and the hedge budget.
+
+    A request is sent to one route, picked at random with probability
+    proportional to ``weight / typical latency``. If it has not answered after
+    the route's ``hedge_quantile`` latency, a duplicate goes to the next route
+    and the first answer wins; ``hedge_max_ratio`` caps duplicates as a share
+    of all requests so spend stays bounded.
+    """
+
+    def __init__(
+        self,
+        routes: list[Route] | None = None,
+        hedge_quantile: float = DEFAULT_HEDGE_QUANTILE,
+        hedge_max_ratio: float = DEFAULT_HEDGE_MAX_RATIO,
+        hedge_delay_seconds: float = DEFAULT_HEDGE_DELAY_SECONDS,
+        hedge_min_delay_seconds: float = DEFAULT_HEDGE_MIN_DELAY_SECONDS,
+        rng: random.Random | None = None,
+    ) -> None:
+        self.routes = list(routes or [])
+        self.hedge_quantile = min(max(hedge_quantile, 0.0), 1.0)
+        self.hedge_max_ratio = max(hedge_max_ratio, 0.0)
+        self.hedge_delay_seconds = hedge_delay_seconds
+        self.hedge_min_delay_seconds = hedge_min_delay_seconds
+        self._rng = rng or random.Random()
+        self._stats: dict[str, LatencyStats] = {}
+        self.requests = 0
+        self.hedges = 0
+
+    @classmethod
+    def from_env(cls) -> ModelRouter:
+        def number(name: str, default: float) -> float:
+            try:
+                return float(os.getenv(name, "").strip() or default)
+            except ValueError:
+                return default
+
+        return cls(
+            load_routes(os.getenv("GLM_ROUTES", "")),
+            hedge_quantile=number("GLM_HEDGE_QUANTILE", DEFAULT_HEDGE_QUANTILE),
+            hedge_max_ratio=number("GLM_HEDGE_MAX_RATIO", DEFAULT_HEDGE_MAX_RATIO),
+            hedge_delay_seconds=number("GLM_HEDGE_DELAY_SECONDS", DEFAULT_HEDGE_DELAY_SECONDS),
+        )
+
+    def __bool__(self) -> bool:
+        return bool(self.routes)
+
+    @property
+    def fingerprint(self) -> str:
+        """Identifies the configured routes (not their keys) in cache and memo keys."""
+        if not self.routes:
+            return ""
+        described = [(route.key, route.tier) for route in self.routes]
+        return hashlib.sha256(json.dumps(described).encode("utf-8")).hexdigest()[:16]
+
+    def stats(self, route: Route) -> LatencyStats:
+        return self._stats.setdefault(route.key, LatencyStats())
+
+    def order(self, routes: list[Route]) -> list[Route]:
+        """``routes`` in weighted random order, faster routes favoured."""
+        remaining = [route for route in routes if route.weight > 0] or list(routes)
+        ordered: list[Route] = []
+        while remaining:
+            scores = [
+                route.weight / max(self.stats(route).ewma or 1.0, 1e-3) for route in remaining
+            ]
+            pick = self._rng.uniform(0, sum(scores))
+            for index, score in enumerate(scores):
+                pick -= score
+                if pick <= 0 or index == len(scores) - 1:
+                    ordered.append(remaining.pop(index))
+                    break
+        return ordered
+
+    def hedge_delay(self, route: Route) -> float:
+        observed = self.stats(route).quantile(self.hedge_quantile)
+        delay = self.hedge_delay_seconds if observed is None else observed
+        return max(delay, self.hedge_min_delay_seconds)
+
+    def count_request(self) -> None:
+        self.requests += 1
+
+    def take_hedge(self) -> bool:
+        """Spend one duplicate request if the hedge budget allows it."""
+        if self.hedges + 1 > self.hedge_max_ratio * self.requests:
+            return False
+        self.hedges += 1
+        return True
+
+    def record(self, route: Route, client: AsyncGLMClient) -> None:
+        if client.last_error_kind in HEALTH_ERRORS:
+            self.stats(route).record_failure(client.last_request_seconds)
+        elif not client.last_error:
+            self.stats(route).record_success(client.last_request_seconds)
+
+    def client(
+        self,
+        *,
+        api_key: str,
+        base_url: str,
+        model: str,
+        timeout: int,
+        pool: GLMConnectionPool,
+        prompt: str = REVIEW_PROMPT,
+    ) -> RoutedGLMClient:
+        """A client for one review call; the request's own endpoint is a primary route.
+
+        The request's key is only sent to its own ``base_url``: keyless routes
+        on other hosts are left out of this call.
+        """
+        requested = Route(base_url=base_url.rstrip("/"), model=model.strip(), api_key=api_key)
+        routes = [
+            route if route.api_key else replace(route, api_key=requested.api_key)
+            for route in self.routes
+            if route.api_key or route.base_url == requested.base_url
+        ]
+        primary = [requested] + [
+            route for route in routes if route.tier == TIER_PRIMARY and route.key != requested.key
+        ]
+        cheap = [route for route in routes if route.tier == TIER_CHEAP]
+        return RoutedGLMClient(
+            self, primary, cheap, api_key=api_key, timeout=timeout, pool=pool, prompt=prompt
+        )
+
+
+class RoutedGLMClient:
+    """Drop-in for ``AsyncGLMClient`` that hedges across routes and cascades tiers.
+
+    With cheap routes, a window is first reviewed there; only windows the cheap
+    model flags (or fails on) are escalated to the primary routes. The
+    ``last_*`` attributes describe the call whose answer was used.
+    """
+
+    def __init__(
+        self,
+        router: ModelRouter,
+        primary: list[Route],
+        cheap: list[Route],
+        *,
+        api_key: str,
+        timeout: int,
+        pool: GLMConnectionPool,
+        prompt: str = REVIEW_PROMPT,
+    ) -> None:
+        self.router = router
+        self.primary = primary
+        self.cheap = cheap
+        self.api_key = api_key.strip()
+        self.timeout = timeout
+        self.pool = pool
+        self.prompt = prompt
+        self.last_error = ""
+        self.last_error_kind = ""
+        self.last_retry_after: float | None = None
+        self.last_request_seconds = 0.0
+        self.last_parse_seconds = 0.0
+        self.last_model = ""
+        self.hedged = False
+        self.escalated = False
+
+    async def _call(
+        self, route: Route, sentences: list[dict[str, str]]
+    ) -> tuple[AsyncGLMClient, list[dict[str, Any]]]:
+        client = AsyncGLMClient(
+            api_key=route.api_key,
+            base_url=route.base_url,
+            model=route.model,
+            timeout=self.timeout,
+            pool=self.pool,
+            prompt=self.prompt,
+        )
+        issues = await client.review(sentences)
+        self.router.record(route, client)
+        return client, issues
+
+    def _adopt(
+        self, client: AsyncGLMClient, issues: list[dict[str, Any]], started: float
+    ) -> list[dict[str, Any]]:
+        self.last_error = client.last_error
+        self.last_error_kind = client.last_error_kind
+        self.last_retry_after = client.last_retry_after
+        self.last_parse_seconds += client.last_parse_seconds
+        self.last_request_seconds += time.perf_counter() - started
+        self.last_model = client.model
+        return issues
+
+    async def _hedged(
+        self, routes: list[Route], sentences: list[dict[str, str]]
+    ) -> list[dict[str, Any]]:
+        started = time.perf_counter()
+        ordered = self.router.order(routes)
+        self.router.count_request()
+        running = {asyncio.ensure_future(self._call(ordered[0], sentences)): ordered[0]}
+        backups = ordered[1:]
+        failed: tuple[AsyncGLMClient, list[dict[str, Any]]] | None = None
+        try:
+            if backups:
+                done, _ = await asyncio.wait(
+                    running, timeout=min(self.router.hedge_delay(ordered[0]), self.timeout)
+                )
+                if not done and self.router.take_hedge():
+                    self.hedged = True
+                    route = backups.pop(0)
+                    running[asyncio.ensure_future(self._call(route, sentences))] = route
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    route = running.pop(task)
+                    client, issues = task.result()
+                    if not client.last_error:
+                        if self.hedged:
+                            won = "hedge" if route is not ordered[0] else "first"
+                            GLM_HEDGES.inc(winner=won)
+                        return self._adopt(client, issues, started)
+                    failed = (client, issues)
+                if not running and backups and failed[0].last_error_kind in HEALTH_ERRORS:
+                    # The provider failed fast: fail over instead of waiting for a retry.
+                    route = backups.pop(0)
+                    running[asyncio.ensure_future(self._call(route, sentences))] = route
+        finally:
+            for task in running:
+                task.cancel()
+        if self.hedged:
+            GLM_HEDGES.inc(winner="none")
+        return self._adopt(*failed, started)
+
+    async def review(self, sentences: list[dict[str, str]]) -> list[dict[str, Any]]:
+        self.last_request_seconds = 0.0
+        self.last_parse_seconds = 0.0
+        self.hedged = False
+        self.escalated = False
+        if self.cheap:
+            issues = await self._hedged(self.cheap, sentences)
+            if not issues and not self.last_error:
+                return issues
+            self.escalated = True
+            GLM_ESCALATIONS.inc(reason="error" if self.last_error else "flagged")
+        return await self._hedged(self.primary, sentences)
@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Iterable, Sequence, Union
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton that finds every keyword in one pass over a text.
+
+    Scanning is linear in the text length (failure links are followed at most
+    as often as characters are consumed), however many keywords are loaded.
+    """
+
+    def __init__(self, keywords: Iterable[str]) -> None:
+        self.keywords = sorted({keyword.lower() for keyword in keywords if keyword})
+        goto: list[dict[str, int]] = [{}]
+        outputs: list[set[int]] = [set()]
+        for keyword_id, keyword in enumerate(self.keywords):
+            state = 0
+            for char in keyword:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    outputs.append(set())
+                state = next_state
+            outputs[state].add(keyword_id)
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            outputs[state] |= outputs[fail[state]]
+            for char, next_state in goto[state].items():
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                if state:
+                    fail[next_state] = goto[fallback].get(char, 0)
+                queue.append(next_state)
+        self._goto = goto
+        self._fail = fail
+        self._outputs = [frozenset(output) for output in outputs]
+
+    def find(self, text: str) -> set[str]:
+        goto = self._goto
+        fail = self._fail
+        outputs = self._outputs
+        found: set[int] = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if outputs[state]:
+                found |= outputs[state]
+        return {self.keywords[keyword_id] for keyword_id in found}
+
+
+@dataclass(frozen=True)
+class TermPairRule:
+    preferred: str
+    variant: str
+    severity: str = "medium"
+
+    @property
+    def keywords(self) -> tuple[str, ...]:
+        return (self.preferred, self.variant)
+
+
+@dataclass(frozen=True)
+class PolarityPairRule:
+    subject: str
+    positive: tuple[str, ...]
+    negative: tuple[str, ...]
+    detail: str
+    severity: str = "high"
+
+    @property
+    def keywords(self) -> tuple[str, ...]:
+        return (self.subject, *self.positive, *self.negative)
+
+
+@dataclass(frozen=True)
+class FigureCaptionRule:
+    subject: str
+    positive: tuple[str, ...]
+    negative: tuple[str, ...]
+    detail: str
+    figure_marker: str = "figure"
+    caption_marker: str = "caption"
+    severity: str = "high"
+
+    @property
+    def keywords(self) -> tuple[str, ...]:
+        return (self.figure_marker, self.caption_marker, self.subject, *self.positive, *self.negative)
+
+
+Rule = Union[TermPairRule, PolarityPairRule, FigureCaptionRule]
+
+DEFAULT_RULES: tuple[Rule, ...] = (
+    TermPairRule(preferred="threshold voltage window", variant="switching threshold bandwidth"),
+    PolarityPairRule(
+        subject="robust",
+        positive=("improve", "higher robustness"),
+        negative=("reduce", "lower robustness"),
+        detail="One sentence claims robustness improves while another says it decreases.",
+    ),
+    FigureCaptionRule(
+        subject="robust",
+        positive=("improve",),
+        negative=("reduce",),
+        detail="Main text and figure caption describe opposite robustness trends.",
+    ),
+)
+
+
+@dataclass(frozen=True)
+class RuleHit:
+    id_prefix: str
+    issue_type: str
+    severity: str
+    sentence_index: int
+    title: str
+    detail: str
+
+
+class KeywordIndex:
+    def __init__(self, postings: dict[str, list[int]]) -> None:
+        self.postings = postings
+
+    def first_with(self, all_of: Iterable[str], any_of: Iterable[str] = ()) -> int | None:
+        candidates: set[int] | None = None
+        any_terms = tuple(any_of)
+        if any_terms:
+            candidates = set()
+            for keyword in any_terms:
+                candidates.update(self.postings.get(keyword, ()))
+        for keyword in sorted(all_of, key=lambda item: len(self.postings.get(item, ()))):
+            hits = self.postings.get(keyword)
+            if not hits:
+                return None
+            candidates = set(hits) if candidates is None else candidates.intersection(hits)
+            if not candidates:
+                return None
+        return min(candidates) if candidates else None
+
+
+class RuleEngine:
+    def __init__(self, rules: Iterable[Rule]) -> None:
+        self.rules = tuple(rules)
+        self.matcher = KeywordMatcher(
+            keyword.lower() for rule in self.rules for keyword in rule.keywords
+        )
+        digest = hashlib.sha256(repr(self.rules).encode("utf-8"))
+        self.fingerprint = digest.hexdigest()[:12]
+
+    def build_index(self, sentences: Sequence[str]) -> KeywordIndex:
+        postings: dict[str, list[int]] = {}
+        for idx, sentence in enumerate(sentences):
+            for keyword in self.matcher.find(sentence.lower()):
+                postings.setdefault(keyword, []).append(idx)
+        return KeywordIndex(postings)
+
+    def evaluate(self, sentences: Sequence[str], exclude: tuple[type, ...] = ()) -> list[RuleHit]:
+        """Run every rule, except instances of the ``exclude`` rule classes."""
+        index = self.build_index(sentences)
+        hits: list[RuleHit] = []
+        for rule in self.rules:
+            if isinstance(rule, exclude):
+                continue
+            if isinstance(rule, TermPairRule):
+                preferred_idx = index.first_with([rule.preferred.lower()])
+                variant_idx = index.first_with([rule.variant.lower()])
+                if preferred_idx is not None and variant_idx is not None:
+                    hits.append(
+                        RuleHit(
+                            id_prefix="term",
+                            issue_type="term",
+                            severity=rule.severity,
+                            sentence_index=variant_idx,
+                            title="Terminology Drift",
+                            detail=(
+                                f"The concept name changes from '{rule.preferred}' "
+                                f"to '{rule.variant}'."
+                            ),
+                        )
+                    )
+            elif isinstance(rule, PolarityPairRule):
+                subject = [rule.subject.lower()]
+                positive_idx = index.first_with(subject, [item.lower() for item in rule.positive])
+                negative_idx = index.first_with(subject, [item.lower() for item in rule.negative])
+                if (
+                    positive_idx is not None
+                    and negative_idx is not None
+                    and positive_idx != negative_idx
+                ):
+                    hits.append(
+                        RuleHit(
+                            id_prefix="logic",
+                            issue_type="logic",
+                            severity=rule.severity,
+                            sentence_index=negative_idx,
+                            title="Logic Conflict",
+                            detail=rule.detail,
+                        )
+                    )
+            elif isinstance(rule, FigureCaptionRule):
+                subject = rule.subject.lower()
+                claim_idx = index.first_with(
+                    [rule.figure_marker.lower(), subject], [item.lower() for item in rule.positive]
+                )
+                caption_idx = index.first_with(
+                    [rule.caption_marker.lower(), subject], [item.lower() for item in rule.negative]
+                )
+                if claim_idx is not None and caption_idx is not None:
+                    hits.append(
+                        RuleHit(
+                            id_prefix="cite",
+                            issue_type="citation_figure",
+                            severity=rule.severity,
+                            sentence_index=caption_idx,
+                            title="Figure Caption Conflict",
+                            detail=rule.detail,
+                        )
+                    )
+        return hits
+
+
+def load_term_pairs(path: str) -> list[TermPairRule]:
+    """Read ``[{"preferred": ..., "variant": ..., "severity": ...}, ...]`` from JSON."""
+    raw: Any = json.loads(Path(path).read_text(encoding="utf-8"))
+    if not isinstance(raw, list):
+        raise ValueError("Term pair file must contain a JSON list.")
+    rules: list[TermPairRule] = []
+    for item in raw:
+        if not isinstance(item, dict):
+            continue
+        preferred = str(item.get("preferred", "")).strip()
+        variant = str(item.get("variant", "")).strip()
+        severity = str(item.get("severity", "medium")).strip().lower()
+        if not preferred or not variant:
+            continue
+        if severity not in {"low", "medium", "high"}:
+            severity = "medium"
+        rules.append(TermPairRule(preferred=preferred, variant=variant, severity=severity))
+    return rules
+
+
+@lru_cache(maxsize=4)
+def _compile_rule_engine(term_pairs_path: str) -> RuleEngine:
+    rules: list[Rule] = list(DEFAULT_RULES)
+    if term_pairs_path:
+        rules.extend(load_term_pairs(term_pairs_path))
+    return RuleEngine(rules)
+
+
+def default_rule_engine() -> RuleEngine:
+    return _compile_rule_engine(os.getenv("HEURISTIC_TERM_PAIRS_PATH", "").strip())
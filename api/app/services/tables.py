@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+from array import array
+import sys
+from typing import Any, Iterable, Iterator, Sequence
+
+
+SENTENCE_ID_PREFIX = "s-"
+
+
+def sentence_id(index: int) -> str:
+    return f"{SENTENCE_ID_PREFIX}{index + 1}"
+
+
+def sentence_index(value: str) -> int:
+    """Zero-based index of an ``s-<n>`` sentence id, or -1 when it is not one."""
+    digits = value[len(SENTENCE_ID_PREFIX) :] if value.startswith(SENTENCE_ID_PREFIX) else ""
+    if not digits.isdigit() or not digits.isascii() or int(digits) < 1:
+        return -1
+    return int(digits) - 1
+
+
+class _Codes:
+    """Small interning table: each distinct string is stored once and referred to by code."""
+
+    __slots__ = ("values", "_codes")
+
+    def __init__(self, values: Iterable[str] = ()) -> None:
+        self.values: list[str] = []
+        self._codes: dict[str, int] = {}
+        for value in values:
+            self.code(value)
+
+    def code(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            value = sys.intern(value)
+            self.values.append(value)
+            self._codes[value] = code
+        return code
+
+
+# Shared by every table so codes stay comparable across documents.
+ISSUE_TYPES = _Codes(("term", "logic", "citation_figure", "numeric"))
+SEVERITIES = _Codes(("low", "medium", "high"))
+
+
+class SentenceTable:
+    """Sentences of one document as columns instead of one dict per sentence.
+
+    Texts share a single string buffer addressed by an offset array; source
+    ``start``/``end`` offsets live in integer arrays and ids are derived from
+    the row number. Rows are materialized as ``{"id", "text", "start", "end"}``
+    dicts only on access, so the table can stand in wherever a list of
+    sentence dicts is read.
+    """
+
+    __slots__ = ("_buffer", "_pending", "_offsets", "starts", "ends")
+
+    def __init__(self) -> None:
+        self._buffer = ""
+        self._pending: list[str] = []
+        self._offsets = array("q", [0])
+        self.starts = array("q")
+        self.ends = array("q")
+
+    def append(self, text: str, start: int, end: int) -> None:
+        self._pending.append(text)
+        self._offsets.append(self._offsets[-1] + len(text))
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def _text_buffer(self) -> str:
+        if self._pending:
+            self._buffer += "".join(self._pending)
+            self._pending.clear()
+        return self._buffer
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def text(self, index: int) -> str:
+        return self._text_buffer()[self._offsets[index] : self._offsets[index + 1]]
+
+    def texts(self) -> list[str]:
+        buffer = self._text_buffer()
+        offsets = self._offsets
+        return [buffer[offsets[index] : offsets[index + 1]] for index in range(len(self))]
+
+    def text_column(self) -> TextColumn:
+        """The texts as a read-only sequence that slices the buffer on access."""
+        return TextColumn(self)
+
+    def __getitem__(self, index: int) -> dict[str, Any]:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("sentence index out of range")
+        return {
+            "id": sentence_id(index),
+            "text": self.text(index),
+            "start": self.starts[index],
+            "end": self.ends[index],
+        }
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def to_dicts(self) -> list[dict[str, Any]]:
+        return list(self)
+
+
+class TextColumn(Sequence[str]):
+    """Sentence texts of a ``SentenceTable`` without a second copy of the text.
+
+    Stands in for a ``list[str]`` of sentences in the detectors: each text is
+    cut from the shared buffer when read and not kept.
+    """
+
+    __slots__ = ("_table",)
+
+    def __init__(self, table: SentenceTable) -> None:
+        self._table = table
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def __getitem__(self, index: int) -> str:  # type: ignore[override]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("sentence index out of range")
+        return self._table.text(index)
+
+    def __iter__(self) -> Iterator[str]:
+        buffer = self._table._text_buffer()
+        offsets = self._table._offsets
+        for index in range(len(self)):
+            yield buffer[offsets[index] : offsets[index + 1]]
+
+
+class IssueTable:
+    """Issues as parallel columns with interned types and severities.
+
+    ``sentences`` holds zero-based sentence indexes; ``sentence_id`` strings
+    and the six-key issue dicts are only built by ``__getitem__``/``to_dicts``.
+    """
+
+    __slots__ = ("ids", "_types", "_severities", "sentences", "titles", "details")
+
+    def __init__(self) -> None:
+        self.ids: list[str] = []
+        self._types = array("H")
+        self._severities = array("H")
+        self.sentences = array("q")
+        self.titles: list[str] = []
+        self.details: list[str] = []
+
+    def append(
+        self,
+        issue_id: str,
+        issue_type: str,
+        severity: str,
+        sentence: int,
+        title: str,
+        detail: str,
+    ) -> None:
+        self.ids.append(issue_id)
+        self._types.append(ISSUE_TYPES.code(issue_type))
+        self._severities.append(SEVERITIES.code(severity))
+        self.sentences.append(sentence)
+        # Titles come from a handful of rule templates; share one string each.
+        self.titles.append(sys.intern(title))
+        self.details.append(detail)
+
+    def extend(self, other: IssueTable) -> None:
+        self.ids.extend(other.ids)
+        self._types.extend(other._types)
+        self._severities.extend(other._severities)
+        self.sentences.extend(other.sentences)
+        self.titles.extend(other.titles)
+        self.details.extend(other.details)
+
+    def append_dict(self, issue: dict[str, Any]) -> None:
+        """Adds an issue given as a dict; its ``sentence_id`` must be ``s-<n>``."""
+        index = sentence_index(str(issue["sentence_id"]))
+        if index < 0:
+            raise ValueError(f"Not a sentence id: {issue['sentence_id']!r}")
+        self.append(
+            issue["id"], issue["type"], issue["severity"], index, issue["title"], issue["detail"]
+        )
+
+    @classmethod
+    def from_dicts(cls, issues: Iterable[dict[str, Any]]) -> IssueTable:
+        table = cls()
+        for issue in issues:
+            table.append_dict(issue)
+        return table
+
+    def keys(self) -> Iterator[tuple[str, int]]:
+        """``(type, sentence index)`` per row: what ``merge_issues`` deduplicates on."""
+        types = ISSUE_TYPES.values
+        for code, sentence in zip(self._types, self.sentences):
+            yield types[code], sentence
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index: int) -> dict[str, str]:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("issue index out of range")
+        return {
+            "id": self.ids[index],
+            "type": ISSUE_TYPES.values[self._types[index]],
+            "severity": SEVERITIES.values[self._severities[index]],
+            "sentence_id": sentence_id(self.sentences[index]),
+            "title": self.titles[index],
+            "detail": self.details[index],
+        }
+
+    def __iter__(self) -> Iterator[dict[str, str]]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def to_dicts(self) -> list[dict[str, str]]:
+        return list(self)
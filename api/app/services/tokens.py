@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from functools import lru_cache
+import os
+import re
+from typing import Callable
+
+
+TokenCounter = Callable[[str], int]
+
+# Han, kana, Hangul and full-width forms. GLM-family tokenizers spend roughly one
+# token per character on these scripts, while Latin text averages about four
+# characters per token; a single chars/4 rule undercounts Chinese by ~4x.
+CJK_RE = re.compile(
+    "[\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]"
+)
+LATIN_CHARS_PER_TOKEN = 4
+CJK_TOKENS_PER_CHAR = 1
+
+DEFAULT_CONTEXT_TOKENS = 32_000
+DEFAULT_RESPONSE_TOKENS = 4_000
+# Longest prefix wins, so "glm-4.6v" resolves before "glm-4.6".
+MODEL_CONTEXT_TOKENS = {
+    "glm-4.6v": 64_000,
+    "glm-4.6": 128_000,
+    "glm-4.5v": 64_000,
+    "glm-4.5": 128_000,
+    "glm-4-long": 1_000_000,
+    "glm-4-flash": 128_000,
+    "glm-4-plus": 128_000,
+    "glm-4": 128_000,
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Fast per-script estimate; never below one token for non-empty budgets."""
+    cjk = len(CJK_RE.findall(text))
+    other = len(text) - cjk
+    return max(1, cjk * CJK_TOKENS_PER_CHAR + (other + LATIN_CHARS_PER_TOKEN - 1) // LATIN_CHARS_PER_TOKEN)
+
+
+def _tiktoken_counter(encoding: str) -> TokenCounter:
+    import tiktoken
+
+    encoder = tiktoken.get_encoding(encoding or "cl100k_base")
+    return lambda text: len(encoder.encode(text, disallowed_special=()))
+
+
+def _hf_tokenizer_counter(path: str) -> TokenCounter:
+    from tokenizers import Tokenizer
+
+    tokenizer = Tokenizer.from_file(path)
+    return lambda text: len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+TOKENIZER_FACTORIES: dict[str, Callable[[str], TokenCounter]] = {
+    "estimate": lambda _arg: estimate_tokens,
+    "tiktoken": _tiktoken_counter,
+    "hf": _hf_tokenizer_counter,
+}
+
+
+def register_tokenizer(name: str, factory: Callable[[str], TokenCounter]) -> None:
+    """Make ``GLM_TOKENIZER=name[:arg]`` resolve to ``factory(arg)``."""
+    TOKENIZER_FACTORIES[name] = factory
+    _resolve_token_counter.cache_clear()
+
+
+@lru_cache(maxsize=8)
+def _resolve_token_counter(spec: str) -> TokenCounter:
+    name, _, arg = spec.partition(":")
+    factory = TOKENIZER_FACTORIES.get(name.strip().lower())
+    if factory is None:
+        return estimate_tokens
+    try:
+        return factory(arg.strip())
+    except (ImportError, OSError, ValueError, KeyError):
+        # An exact tokenizer is an optional dependency; the estimate keeps
+        # packing working when it is missing or its vocabulary cannot load.
+        return estimate_tokens
+
+
+def get_token_counter(spec: str | None = None) -> TokenCounter:
+    """Resolve ``spec`` (default: ``GLM_TOKENIZER``) such as ``tiktoken:cl100k_base``."""
+    if spec is None:
+        spec = os.getenv("GLM_TOKENIZER", "")
+    return _resolve_token_counter(spec.strip() or "estimate")
+
+
+def model_context_tokens(model: str) -> int:
+    raw = os.getenv("GLM_CONTEXT_TOKENS", "").strip()
+    if raw.isdigit() and int(raw) > 0:
+        return int(raw)
+    name = model.strip().lower()
+    matches = [prefix for prefix in MODEL_CONTEXT_TOKENS if name.startswith(prefix)]
+    if not matches:
+        return DEFAULT_CONTEXT_TOKENS
+    return MODEL_CONTEXT_TOKENS[max(matches, key=len)]
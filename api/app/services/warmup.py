@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import asyncio
+import inspect
+import time
+from typing import Any, Awaitable, Callable, Sequence
+
+
+WARMUP_MODES = {"background", "blocking", "off"}
+DEFAULT_WARMUP_MODE = "background"
+
+WarmupStep = tuple[str, Callable[[], Any | Awaitable[Any]]]
+
+
+class Warmup:
+    """Per-worker startup work and the readiness state derived from it.
+
+    Steps run in order; synchronous ones go to a thread so a background
+    warmup never blocks requests on the event loop. A failing step is recorded
+    in ``errors`` and does not stop the others: a missing optional dependency
+    should not keep the worker out of rotation.
+    """
+
+    def __init__(self) -> None:
+        self.status = "pending"
+        self.timings_ms: dict[str, float] = {}
+        self.errors: dict[str, str] = {}
+        self.seconds = 0.0
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status in {"done", "skipped"}
+
+    async def run(self, steps: Sequence[WarmupStep]) -> None:
+        self.status = "running"
+        started = time.perf_counter()
+        for name, step in steps:
+            step_started = time.perf_counter()
+            try:
+                if inspect.iscoroutinefunction(step):
+                    await step()
+                else:
+                    await asyncio.to_thread(step)
+            except Exception as exc:
+                self.errors[name] = (str(exc).strip() or type(exc).__name__)[:200]
+            self.timings_ms[name] = round((time.perf_counter() - step_started) * 1000, 3)
+        self.seconds = round(time.perf_counter() - started, 3)
+        self.status = "done"
+
+    def start(self, steps: Sequence[WarmupStep]) -> asyncio.Task[None]:
+        self._task = asyncio.create_task(self.run(steps))
+        return self._task
+
+    def skip(self) -> None:
+        self.status = "skipped"
+
+    async def stop(self) -> None:
+        """Waits for a background warmup; its threads cannot be cancelled, so
+        letting it finish keeps steps from racing resource shutdown."""
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "status": self.status,
+            "ready": self.ready,
+            "seconds": self.seconds,
+            "timings_ms": dict(self.timings_ms),
+            "errors": dict(self.errors),
+        }
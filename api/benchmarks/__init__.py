@@ -0,0 +1 @@
+"""Benchmark harness for the parse -> heuristics -> LLM pipeline."""
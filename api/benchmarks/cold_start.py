@@ -0,0 +1,63 @@
+"""Time one fresh worker from interpreter start to its first ``/api/analyze`` response.
+
+``benchmarks.run --cold-start-runs`` starts this module in a new process per
+run, with ``WARMUP_MODE`` set to the mode under test. It prints one JSON line.
+"""
+
+from __future__ import annotations
+
+import time
+
+STARTED = time.perf_counter()
+
+import argparse  # noqa: E402
+import json  # noqa: E402
+import os  # noqa: E402
+from pathlib import Path  # noqa: E402
+import sys  # noqa: E402
+from typing import Any  # noqa: E402
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+def probe(upload: Path, filename: str) -> dict[str, Any]:
+    data = upload.read_bytes()
+    imported = time.perf_counter()
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    started = time.perf_counter()
+    with TestClient(app) as client:
+        ready = time.perf_counter()
+        answered: list[float] = []
+        # The result cache is off, so the second request shows what the same
+        # analysis costs on a warm worker.
+        for _ in range(2):
+            response = client.post("/api/analyze", files={"file": (filename, data)})
+            response.raise_for_status()
+            answered.append(time.perf_counter())
+        warmup = client.get("/health", params={"ready": "true"}).json().get("warmup", {})
+    return {
+        "warmup_mode": os.getenv("WARMUP_MODE", ""),
+        "import_ms": _ms(started - imported),
+        "startup_ms": _ms(ready - started),
+        "first_request_ms": _ms(answered[0] - ready),
+        "second_request_ms": _ms(answered[1] - answered[0]),
+        "time_to_first_analysis_ms": _ms(answered[0] - STARTED),
+        "warmup_ms": warmup.get("timings_ms", {}),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--upload", required=True, help="File to analyze.")
+    parser.add_argument("--filename", required=True, help="Upload name (picks the parser).")
+    args = parser.parse_args(argv)
+    sys.stdout.write(json.dumps(probe(Path(args.upload), args.filename)) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import asdict, dataclass
+import json
+import random
+import threading
+from typing import Any
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+
+
+@dataclass
+class MockGLMSettings:
+    latency_ms: float = 50.0
+    jitter_ms: float = 0.0
+    # Share of requests that land in a slow tail of slow_latency_ms instead.
+    slow_rate: float = 0.0
+    slow_latency_ms: float = 0.0
+    failure_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    timeout_rate: float = 0.0
+    malformed_rate: float = 0.0
+    timeout_seconds: float = 120.0
+    seed: int = 11
+
+
+@dataclass
+class MockGLMStats:
+    requests: int = 0
+    failures: int = 0
+    rate_limited: int = 0
+    timeouts: int = 0
+    malformed: int = 0
+    sentences: int = 0
+
+    def to_dict(self) -> dict[str, int]:
+        return asdict(self)
+
+
+def _fake_issues(sentences: list[dict[str, Any]]) -> list[dict[str, str]]:
+    issues: list[dict[str, str]] = []
+    for item in sentences:
+        text = str(item.get("text", "")).lower()
+        if "reduce" in text and "robust" in text:
+            issues.append(
+                {
+                    "type": "logic",
+                    "sentence_id": str(item.get("id", "")),
+                    "severity": "high",
+                    "title": "Mock Logic Conflict",
+                    "detail": "Mock reviewer flagged a robustness reversal.",
+                }
+            )
+    return issues
+
+
+def create_mock_glm_app(settings: MockGLMSettings | None = None) -> FastAPI:
+    """OpenAI-compatible ``/chat/completions`` stand-in with injectable faults."""
+    settings = settings or MockGLMSettings()
+    stats = MockGLMStats()
+    rng = random.Random(settings.seed)
+    app = FastAPI(title="Mock GLM")
+    app.state.settings = settings
+    app.state.stats = stats
+
+    @app.post("/{prefix:path}/chat/completions")
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request, prefix: str = "") -> Response:
+        payload = await request.json()
+        stats.requests += 1
+        roll = rng.random()
+        jitter = rng.uniform(0, settings.jitter_ms)
+        slow = rng.random() < settings.slow_rate
+        latency_ms = settings.slow_latency_ms if slow else settings.latency_ms
+        await asyncio.sleep((latency_ms + jitter) / 1000)
+
+        threshold = settings.failure_rate
+        if roll < threshold:
+            stats.failures += 1
+            return PlainTextResponse("mock upstream failure", status_code=500)
+        threshold += settings.rate_limit_rate
+        if roll < threshold:
+            stats.rate_limited += 1
+            return PlainTextResponse("mock rate limit", status_code=429)
+        threshold += settings.timeout_rate
+        if roll < threshold:
+            stats.timeouts += 1
+            await asyncio.sleep(settings.timeout_seconds)
+        threshold += settings.malformed_rate
+        if roll < threshold:
+            stats.malformed += 1
+            return JSONResponse({"choices": [{"message": {"content": "not json"}}]})
+
+        user_message = payload["messages"][-1]["content"]
+        sentences = json.loads(user_message).get("sentences", [])
+        stats.sentences += len(sentences)
+        content = json.dumps({"issues": _fake_issues(sentences)})
+        return JSONResponse({"choices": [{"message": {"content": content}}]})
+
+    return app
+
+
+class MockGLMServer:
+    """Runs the mock app with uvicorn on a background thread for real-socket tests."""
+
+    def __init__(self, settings: MockGLMSettings | None = None, port: int = 0) -> None:
+        import uvicorn
+
+        self.app = create_mock_glm_app(settings)
+        config = uvicorn.Config(self.app, host="127.0.0.1", port=port, log_level="warning")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        sockets = self._server.servers[0].sockets
+        host, port = sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/v4"
+
+    def __enter__(self) -> MockGLMServer:
+        self._thread.start()
+        while not self._server.started:
+            threading.Event().wait(0.01)
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
@@ -0,0 +1,495 @@
+"""Time each pipeline stage on synthetic papers and write the numbers as JSON.
+
+Run from the ``api`` directory::
+
+    python -m benchmarks.run --sizes 1000,10000 --formats txt,zip,docx,pdf
+"""
+
+from __future__ import annotations
+
+import argparse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, replace
+import json
+import os
+from pathlib import Path
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Iterator
+from unittest.mock import patch
+
+import httpx
+
+from benchmarks.mock_glm import MockGLMSettings, create_mock_glm_app
+from benchmarks.synthetic import FORMAT_BUILDERS, synthetic_text, synthetic_upload
+
+
+DEFAULT_SIZES = "1000,10000"
+DEFAULT_FORMATS = "txt,zip"
+DEFAULT_OUTPUT_DIR = Path(__file__).resolve().parent / "results"
+MOCK_GLM_BASE_URL = "http://mock-glm.local/v4"
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def traced_peak_mb(fn: Callable[[], Any]) -> float:
+    """Peak Python heap growth while ``fn`` runs once, in MB.
+
+    ``ru_maxrss`` is a high-water mark for the whole process, so every
+    scenario after the largest one would report its peak. This is per call;
+    it leaves out memory the Python allocator does not see, such as extractor
+    worker processes.
+    """
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    return max(0, peak - baseline) / (1024 * 1024)
+
+
+def summarize(
+    samples: list[float], units: int, unit_name: str, peak_mb: float | None = None
+) -> dict[str, Any]:
+    mean = sum(samples) / len(samples) if samples else 0.0
+    summary = {
+        "runs": len(samples),
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 3),
+        "mean_ms": round(mean * 1000, 3),
+        f"{unit_name}_per_s": round(units / mean, 1) if mean else None,
+    }
+    if peak_mb is not None:
+        summary["peak_traced_mb"] = round(peak_mb, 2)
+    return summary
+
+
+def time_calls(fn: Callable[[], Any], repeat: int) -> tuple[list[float], Any, float]:
+    """Times ``repeat`` calls, then traces one more for its peak memory.
+
+    The traced call is kept out of the samples: tracing slows allocation down.
+    """
+    samples: list[float] = []
+    value: Any = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        value = fn()
+        samples.append(time.perf_counter() - started)
+    return samples, value, traced_peak_mb(fn)
+
+
+def bench_stages(fmt: str, size: int, repeat: int) -> dict[str, Any]:
+    from app.services import jsonio
+    from app.services.analyzer import detect_heuristic_issues, merge_issues, split_sentences
+    from app.services.parser import parse_file_bytes
+
+    filename, data = synthetic_upload(fmt, size)
+    stages: dict[str, Any] = {}
+
+    samples, text, peak = time_calls(lambda: parse_file_bytes(filename, data), repeat)
+    stages["parse_file_bytes"] = summarize(samples, len(data), "bytes", peak)
+
+    samples, sentences, peak = time_calls(lambda: split_sentences(text), repeat)
+    stages["split_sentences"] = summarize(samples, len(sentences), "sentences", peak)
+
+    samples, issues, peak = time_calls(lambda: detect_heuristic_issues(sentences), repeat)
+    stages["detect_heuristic_issues"] = summarize(samples, len(sentences), "sentences", peak)
+
+    glm_like = [
+        {"id": f"g-logic-{idx}", "type": "logic", "sentence_id": f"s-{idx + 1}"}
+        for idx in range(0, len(sentences), 5)
+    ]
+    samples, _, peak = time_calls(lambda: merge_issues(issues, glm_like), repeat)
+    stages["merge_issues"] = summarize(samples, len(glm_like), "issues", peak)
+
+    samples, _, peak = time_calls(lambda: jsonio.dumps_bytes(issues.to_dicts()), repeat)
+    stages["serialize_issues"] = summarize(samples, len(issues), "issues", peak)
+
+    return {
+        "format": fmt,
+        "sentences": len(sentences),
+        "upload_bytes": len(data),
+        "stages": stages,
+    }
+
+
+def _post_repeatedly(
+    client: Any,
+    filename: str,
+    data: bytes,
+    repeat: int,
+    samples: list[float],
+    engines: list[dict[str, Any]],
+) -> None:
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.post(
+            "/api/analyze",
+            files={"file": (filename, data)},
+            data={"base_url": MOCK_GLM_BASE_URL, "model": "mock-glm", "api_key": "bench"},
+        )
+        samples.append(time.perf_counter() - started)
+        response.raise_for_status()
+        engines.append(response.json()["engine"])
+
+
+@contextmanager
+def _client_with_mock_glm(mock_app: Any) -> Iterator[Any]:
+    """A TestClient of the API whose GLM pool talks to ``mock_app`` in-process."""
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from app.services.glm_client import GLMConnectionPool
+
+    # Disable result/memo caches so every run pays for parsing and GLM review.
+    cache_env = {
+        "RESULT_CACHE_MAX_BYTES": "0",
+        "REVIEW_MEMO_MAX_BYTES": "0",
+        "RESULT_CACHE_PATH": "",
+    }
+    with patch.dict(os.environ, cache_env), TestClient(app) as client:
+        real_pool = app.state.glm_pool
+        app.state.glm_pool = GLMConnectionPool(transport=httpx.ASGITransport(app=mock_app))
+        try:
+            yield client
+        finally:
+            client.portal.call(app.state.glm_pool.aclose)
+            app.state.glm_pool = real_pool
+
+
+def bench_endpoint(
+    fmt: str, size: int, repeat: int, mock_settings: MockGLMSettings
+) -> dict[str, Any]:
+    filename, data = synthetic_upload(fmt, size)
+    mock_app = create_mock_glm_app(mock_settings)
+    samples: list[float] = []
+    engines: list[dict[str, Any]] = []
+    with _client_with_mock_glm(mock_app) as client:
+        _post_repeatedly(client, filename, data, repeat, samples, engines)
+        # One more request, untimed, for the peak memory of a single analysis.
+        peak = traced_peak_mb(
+            lambda: _post_repeatedly(client, filename, data, 1, [], [])
+        )
+
+    last_engine = engines[-1] if engines else {}
+    return {
+        "format": fmt,
+        "sentences": size,
+        "upload_bytes": len(data),
+        "endpoint": summarize(samples, 1, "requests", peak),
+        "glm_windows": last_engine.get("glm_windows"),
+        "glm_failed_windows": [engine.get("glm_failed_windows") for engine in engines],
+        "mock_glm": mock_app.state.stats.to_dict(),
+    }
+
+
+def bench_batch(documents: int, size: int, mock_settings: MockGLMSettings) -> dict[str, Any]:
+    """Documents per minute: one /api/analyze call per document vs one batch call."""
+    uploads = [
+        (f"submission-{idx + 1}.txt", synthetic_text(size, seed=idx + 1).encode("utf-8"))
+        for idx in range(documents)
+    ]
+    form = {"base_url": MOCK_GLM_BASE_URL, "model": "mock-glm", "api_key": "bench"}
+    report: dict[str, Any] = {"documents": documents, "sentences_per_document": size}
+
+    single_app = create_mock_glm_app(mock_settings)
+    with _client_with_mock_glm(single_app) as client:
+        started = time.perf_counter()
+        for filename, data in uploads:
+            client.post("/api/analyze", files={"file": (filename, data)}, data=form).raise_for_status()
+        elapsed = time.perf_counter() - started
+    report["single"] = {
+        "seconds": round(elapsed, 4),
+        "documents_per_minute": round(documents * 60 / elapsed, 2),
+        "glm_requests": single_app.state.stats.to_dict()["requests"],
+    }
+
+    batch_app = create_mock_glm_app(mock_settings)
+    with _client_with_mock_glm(batch_app) as client:
+        started = time.perf_counter()
+        response = client.post(
+            "/api/analyze/batch",
+            files=[("files", (filename, data)) for filename, data in uploads],
+            data=form,
+        )
+        elapsed = time.perf_counter() - started
+        response.raise_for_status()
+    report["batch"] = {
+        "seconds": round(elapsed, 4),
+        "documents_per_minute": round(documents * 60 / elapsed, 2),
+        "glm_requests": batch_app.state.stats.to_dict()["requests"],
+        "failed": response.json()["summary"]["failed"],
+    }
+    report["speedup"] = round(report["single"]["seconds"] / max(elapsed, 1e-9), 2)
+    return report
+
+
+class _HostTransport(httpx.AsyncBaseTransport):
+    """Sends each request to the mock app registered for its host."""
+
+    def __init__(self, apps: dict[str, Any]) -> None:
+        self.transports = {host: httpx.ASGITransport(app=app) for host, app in apps.items()}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self.transports[request.url.host].handle_async_request(request)
+
+
+def bench_hedging(requests: int, mock_settings: MockGLMSettings) -> dict[str, Any]:
+    """p50/p99 review latency on two slow-tailed mock endpoints, without and with hedging."""
+    import asyncio
+
+    from app.services.glm_client import GLMConnectionPool
+    from app.services.router import ModelRouter, Route
+
+    sentences = [{"id": "s-1", "text": "Higher temperature reduces robustness."}]
+
+    async def run(hedge_max_ratio: float) -> dict[str, Any]:
+        secondary = replace(mock_settings, seed=mock_settings.seed + 1)
+        apps = {
+            "primary.mock": create_mock_glm_app(mock_settings),
+            "secondary.mock": create_mock_glm_app(secondary),
+        }
+        pool = GLMConnectionPool(transport=_HostTransport(apps))
+        router = ModelRouter(
+            [Route("http://secondary.mock/v4", "mock-glm")], hedge_max_ratio=hedge_max_ratio
+        )
+        samples: list[float] = []
+        try:
+            for _ in range(requests):
+                client = router.client(
+                    api_key="bench",
+                    base_url="http://primary.mock/v4",
+                    model="mock-glm",
+                    timeout=60,
+                    pool=pool,
+                )
+                started = time.perf_counter()
+                await client.review(sentences)
+                samples.append(time.perf_counter() - started)
+        finally:
+            await pool.aclose()
+        upstream = sum(app.state.stats.requests for app in apps.values())
+        return {
+            "latency": summarize(samples, 1, "requests"),
+            "upstream_requests": upstream,
+            "hedges": router.hedges,
+        }
+
+    return {"requests": requests, "single": asyncio.run(run(0.0)), "hedged": asyncio.run(run(0.2))}
+
+
+def bench_overload(
+    requests: int, concurrency: int, size: int, max_wait_seconds: int
+) -> dict[str, Any]:
+    """Latency of admitted /api/analyze calls under a burst, without and with admission limits."""
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    filename, data = synthetic_upload("txt", size)
+    base_env = {
+        "RESULT_CACHE_MAX_BYTES": "0",
+        "RESULT_CACHE_PATH": "",
+        "GLM_API_KEY": "",
+        "WARMUP_MODE": "off",
+        "ADMISSION_MAX_WAIT_SECONDS": str(max_wait_seconds),
+    }
+
+    def run(env: dict[str, str]) -> dict[str, Any]:
+        with patch.dict(os.environ, {**base_env, **env}), TestClient(app) as client:
+
+            def post(_index: int) -> tuple[int, float]:
+                started = time.perf_counter()
+                response = client.post("/api/analyze", files={"file": (filename, data)})
+                return response.status_code, time.perf_counter() - started
+
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                results = list(pool.map(post, range(requests)))
+        admitted = [seconds for status, seconds in results if status == 200]
+        return {
+            "statuses": dict(Counter(str(status) for status, _seconds in results)),
+            "admitted": summarize(admitted, 1, "requests"),
+        }
+
+    # Every request admitted at once: the CPU is shared by all of them.
+    unbounded = {"PARSE_MAX_CONCURRENCY": str(requests), "PARSE_QUEUE_SIZE": str(requests)}
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "sentences": size,
+        "unbounded": run(unbounded),
+        "admission": run({}),
+    }
+
+
+def bench_cold_start(fmt: str, size: int, runs: int, modes: list[str]) -> dict[str, Any]:
+    """Time-to-first-analysis of fresh worker processes for each ``WARMUP_MODE``."""
+    filename, data = synthetic_upload(fmt, size)
+    api_dir = Path(__file__).resolve().parents[1]
+    results: dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        upload = Path(tmp) / filename
+        upload.write_bytes(data)
+        for mode in modes:
+            probes: list[dict[str, Any]] = []
+            process_ms: list[float] = []
+            env = dict(
+                os.environ,
+                WARMUP_MODE=mode,
+                GLM_API_KEY="",
+                RESULT_CACHE_MAX_BYTES="0",
+                RESULT_CACHE_PATH="",
+            )
+            for _ in range(runs):
+                started = time.perf_counter()
+                completed = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.cold_start", "--upload", str(upload),
+                     "--filename", filename],
+                    cwd=api_dir, env=env, capture_output=True, text=True, check=True,
+                )
+                process_ms.append((time.perf_counter() - started) * 1000)
+                probes.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+            fields = [key for key, value in probes[0].items() if isinstance(value, float)]
+            results[mode] = {
+                f"p50_{key}": round(percentile([probe[key] for probe in probes], 0.5), 3)
+                for key in fields
+            }
+            results[mode]["p50_process_ms"] = round(percentile(process_ms, 0.5), 3)
+            results[mode]["warmup_ms"] = probes[-1]["warmup_ms"]
+    return {"format": fmt, "sentences": size, "runs": runs, "modes": results}
+
+
+def _csv(value: str) -> list[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Sentence counts, comma separated.")
+    parser.add_argument("--formats", default=DEFAULT_FORMATS, help="txt,zip,docx,pdf")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per stage.")
+    parser.add_argument("--endpoint-repeat", type=int, default=3, help="Runs of /api/analyze.")
+    parser.add_argument("--skip-endpoint", action="store_true")
+    parser.add_argument(
+        "--batch-docs", type=int, default=0, help="Also compare /api/analyze/batch on N documents."
+    )
+    parser.add_argument("--batch-doc-sentences", type=int, default=60)
+    parser.add_argument("--glm-latency-ms", type=float, default=50.0)
+    parser.add_argument("--glm-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--glm-slow-rate", type=float, default=0.0)
+    parser.add_argument("--glm-slow-latency-ms", type=float, default=0.0)
+    parser.add_argument(
+        "--hedge-requests", type=int, default=0, help="Also compare hedged GLM routing on N calls."
+    )
+    parser.add_argument(
+        "--cold-start-runs", type=int, default=0, help="Also time N fresh worker processes."
+    )
+    parser.add_argument("--cold-start-format", default="docx", help="Upload format for cold starts.")
+    parser.add_argument("--cold-start-sentences", type=int, default=200)
+    parser.add_argument("--cold-start-modes", default="off,blocking", help="WARMUP_MODE values.")
+    parser.add_argument(
+        "--overload-requests", type=int, default=0, help="Also send N concurrent uploads."
+    )
+    parser.add_argument("--overload-concurrency", type=int, default=16)
+    parser.add_argument("--overload-sentences", type=int, default=2000)
+    parser.add_argument("--overload-max-wait", type=int, default=1, help="Admission wait (s).")
+    parser.add_argument("--glm-failure-rate", type=float, default=0.0)
+    parser.add_argument("--glm-rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--glm-timeout-rate", type=float, default=0.0)
+    parser.add_argument("--glm-malformed-rate", type=float, default=0.0)
+    parser.add_argument("--output", default="", help="JSON file to write.")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> dict[str, Any]:
+    args = build_parser().parse_args(argv)
+    formats = _csv(args.formats)
+    unknown = [fmt for fmt in formats if fmt not in FORMAT_BUILDERS]
+    if unknown:
+        raise SystemExit(f"Unknown formats: {', '.join(unknown)}")
+    mock_settings = MockGLMSettings(
+        latency_ms=args.glm_latency_ms,
+        jitter_ms=args.glm_jitter_ms,
+        slow_rate=args.glm_slow_rate,
+        slow_latency_ms=args.glm_slow_latency_ms,
+        failure_rate=args.glm_failure_rate,
+        rate_limit_rate=args.glm_rate_limit_rate,
+        timeout_rate=args.glm_timeout_rate,
+        malformed_rate=args.glm_malformed_rate,
+        timeout_seconds=float(os.getenv("GLM_TIMEOUT_SECONDS", "60")) + 1,
+    )
+
+    report: dict[str, Any] = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": args.repeat,
+            "mock_glm": asdict(mock_settings),
+        },
+        "stages": [],
+        "endpoint": [],
+        "batch": None,
+        "hedging": None,
+        "cold_start": None,
+        "overload": None,
+    }
+    for size in (int(item) for item in _csv(args.sizes)):
+        for fmt in formats:
+            report["stages"].append(bench_stages(fmt, size, args.repeat))
+            if not args.skip_endpoint:
+                report["endpoint"].append(
+                    bench_endpoint(fmt, size, args.endpoint_repeat, mock_settings)
+                )
+    if args.batch_docs > 0:
+        report["batch"] = bench_batch(args.batch_docs, args.batch_doc_sentences, mock_settings)
+    if args.hedge_requests > 0:
+        report["hedging"] = bench_hedging(args.hedge_requests, mock_settings)
+    if args.overload_requests > 0:
+        report["overload"] = bench_overload(
+            args.overload_requests,
+            args.overload_concurrency,
+            args.overload_sentences,
+            args.overload_max_wait,
+        )
+    if args.cold_start_runs > 0:
+        report["cold_start"] = bench_cold_start(
+            args.cold_start_format,
+            args.cold_start_sentences,
+            args.cold_start_runs,
+            _csv(args.cold_start_modes),
+        )
+
+    output = Path(args.output) if args.output else (
+        DEFAULT_OUTPUT_DIR / f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Wrote {output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import io
+import random
+import zipfile
+
+
+SUBJECTS = [
+    "the threshold voltage window",
+    "the switching threshold bandwidth",
+    "device robustness",
+    "the read margin",
+    "retention time",
+    "the proposed model",
+    "sample size",
+    "classification accuracy",
+]
+CLAIMS = [
+    "improves robustness under thermal stress",
+    "reduces robustness at high temperature",
+    "remains stable across all measured cycles",
+    "is reported in Figure {fig} with a caption that mentions reduced robustness",
+    "reaches {value}% on the held-out set",
+    "grows with the number of programming pulses",
+]
+
+
+def synthetic_sentences(count: int, seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    sentences: list[str] = []
+    for idx in range(count):
+        subject = rng.choice(SUBJECTS)
+        claim = rng.choice(CLAIMS).format(fig=rng.randint(1, 12), value=rng.randint(80, 99))
+        sentences.append(f"In section {idx // 40 + 1}, {subject} {claim}.")
+    return sentences
+
+
+def synthetic_text(count: int, seed: int = 7) -> str:
+    sentences = synthetic_sentences(count, seed)
+    paragraphs = [" ".join(sentences[idx : idx + 8]) for idx in range(0, len(sentences), 8)]
+    return "\n\n".join(paragraphs)
+
+
+def _build_zip(text: str) -> bytes:
+    buffer = io.BytesIO()
+    paragraphs = text.split("\n\n")
+    per_file = max(1, len(paragraphs) // 8)
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for part, start in enumerate(range(0, len(paragraphs), per_file)):
+            body = "\n\n".join(paragraphs[start : start + per_file])
+            archive.writestr(f"paper/sections/part{part:03d}.tex", body)
+        archive.writestr("paper/figures/plot.png", b"\x89PNG\r\n\x1a\n" + bytes(256))
+    return buffer.getvalue()
+
+
+def _build_docx(text: str) -> bytes:
+    from docx import Document  # type: ignore
+
+    document = Document()
+    for paragraph in text.split("\n\n"):
+        document.add_paragraph(paragraph)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _build_pdf(text: str, lines_per_page: int = 40) -> bytes:
+    lines = [line for paragraph in text.split("\n\n") for line in paragraph.split(". ") if line]
+    pages = [lines[idx : idx + lines_per_page] for idx in range(0, len(lines), lines_per_page)]
+    objects: list[bytes] = [b"<< /Type /Catalog /Pages 2 0 R >>", b"", b""]
+    objects[2] = b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+    kids: list[str] = []
+    for page_lines in pages:
+        operations = ["BT /F1 9 Tf 11 TL 36 760 Td"]
+        operations.extend(f"({_pdf_escape(line)}.) '" for line in page_lines)
+        operations.append("ET")
+        stream = "\n".join(operations).encode("latin1", "replace")
+        page_id = len(objects) + 1
+        kids.append(f"{page_id} 0 R")
+        objects.append(
+            (
+                "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>"
+            ).encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+
+    output = io.BytesIO()
+    output.write(b"%PDF-1.4\n")
+    offsets: list[int] = []
+    for idx, body in enumerate(objects, start=1):
+        offsets.append(output.tell())
+        output.write(b"%d 0 obj\n%s\nendobj\n" % (idx, body))
+    xref = output.tell()
+    output.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        output.write(b"%010d 00000 n \n" % offset)
+    output.write(b"trailer\n<< /Size %d /Root 1 0 R >>\n" % (len(objects) + 1))
+    output.write(b"startxref\n%d\n%%%%EOF" % xref)
+    return output.getvalue()
+
+
+FORMAT_BUILDERS = {
+    "txt": lambda text: text.encode("utf-8"),
+    "zip": _build_zip,
+    "docx": _build_docx,
+    "pdf": _build_pdf,
+}
+
+
+def synthetic_upload(fmt: str, sentence_count: int, seed: int = 7) -> tuple[str, bytes]:
+    if fmt not in FORMAT_BUILDERS:
+        raise ValueError(f"Unknown benchmark format: {fmt}")
+    return f"synthetic.{fmt}", FORMAT_BUILDERS[fmt](synthetic_text(sentence_count, seed))
@@ -0,0 +1,150 @@
+import asyncio
+import os
+import pathlib
+import sys
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from starlette.responses import PlainTextResponse
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from app.main import app
+from app.services.admission import (
+    AdmissionPool,
+    AdmissionRejected,
+    RateLimiter,
+    RateLimitMiddleware,
+    api_key_client,
+    client_address,
+)
+
+TEXT = "Higher temperature improves robustness. Higher temperature reduces robustness."
+
+
+def _upload(client: TestClient, **data: str):
+    return client.post(
+        "/api/analyze", files={"file": ("paper.txt", TEXT.encode("utf-8"))}, data=data
+    )
+
+
+class AdmissionPoolTests(unittest.TestCase):
+    def test_waiters_get_slots_in_order_and_full_queue_is_shed(self) -> None:
+        async def run() -> tuple[list[str], AdmissionRejected]:
+            pool = AdmissionPool("parse", limit=1, queue_size=1)
+            order: list[str] = []
+            gate = asyncio.Event()
+
+            async def hold(name: str) -> None:
+                async with pool.slot(max_wait=5):
+                    order.append(name)
+                    await gate.wait()
+
+            first = asyncio.create_task(hold("first"))
+            await asyncio.sleep(0)
+            second = asyncio.create_task(hold("second"))
+            await asyncio.sleep(0)
+            with self.assertRaises(AdmissionRejected) as rejected:
+                async with pool.slot(max_wait=5):
+                    pass
+            gate.set()
+            await asyncio.gather(first, second)
+            self.assertEqual((pool.active, pool.waiting), (0, 0))
+            return order, rejected.exception
+
+        order, rejected = asyncio.run(run())
+        self.assertEqual(order, ["first", "second"])
+        self.assertEqual((rejected.pool, rejected.retry_after), ("parse", 1))
+
+    def test_expected_wait_past_the_deadline_is_shed_without_waiting(self) -> None:
+        async def run() -> None:
+            pool = AdmissionPool("llm", limit=1, queue_size=10)
+            pool.service_seconds = 3.0
+            async with pool.slot():
+                with self.assertRaises(AdmissionRejected) as rejected:
+                    async with pool.slot(max_wait=1):
+                        pass
+                self.assertEqual(rejected.exception.retry_after, 3)
+                # Without a deadline the caller just waits, and times out only when asked to.
+                with self.assertRaises(asyncio.TimeoutError):
+                    await asyncio.wait_for(pool.slot().__aenter__(), 0.01)
+            self.assertEqual((pool.active, pool.waiting), (0, 0))
+
+        asyncio.run(run())
+
+
+class RateLimiterTests(unittest.TestCase):
+    def test_token_bucket_refills_per_client(self) -> None:
+        now = [0.0]
+        limiter = RateLimiter(rate_per_minute=30, burst=2, clock=lambda: now[0])
+
+        self.assertEqual([limiter.acquire("ip:a") for _ in range(2)], [0.0, 0.0])
+        self.assertAlmostEqual(limiter.acquire("ip:a"), 2.0)
+        self.assertEqual(limiter.acquire("ip:b"), 0.0)
+        now[0] = 2.0
+        self.assertEqual(limiter.acquire("ip:a"), 0.0)
+        self.assertFalse(RateLimiter(rate_per_minute=0))
+        self.assertNotIn("secret", api_key_client("secret"))
+
+
+    def test_spoofed_forwarded_hops_do_not_change_the_client_key(self) -> None:
+        def scope(forwarded: str) -> dict:
+            return {
+                "client": ("10.0.0.2", 1234),
+                "headers": [(b"x-forwarded-for", forwarded.encode("latin-1"))],
+            }
+
+        self.assertEqual(client_address(scope("1.2.3.4, 203.0.113.7"), 1), "203.0.113.7")
+        self.assertEqual(client_address(scope("203.0.113.7, 10.0.0.9"), 2), "203.0.113.7")
+        self.assertEqual(client_address(scope("203.0.113.7"), 2), "203.0.113.7")
+        self.assertEqual(client_address(scope("1.2.3.4, 203.0.113.7"), 0), "10.0.0.2")
+
+        limiter = RateLimiter(rate_per_minute=60, burst=1)
+        limited = RateLimitMiddleware(
+            PlainTextResponse("ok"),
+            limiter_for=lambda _scope: limiter,
+            paths=("/api/analyze",),
+            trusted_proxies=1,
+        )
+        client = TestClient(limited)
+        statuses = [
+            client.post(
+                "/api/analyze", headers={"X-Forwarded-For": f"198.51.100.{idx}, 203.0.113.7"}
+            ).status_code
+            for idx in range(3)
+        ]
+        self.assertEqual(statuses, [200, 429, 429])
+
+
+class AdmissionApiTests(unittest.TestCase):
+    def test_ip_and_api_key_limits_answer_429_with_retry_after(self) -> None:
+        env = {"RATE_LIMIT_PER_MINUTE": "60", "RATE_LIMIT_BURST": "1"}
+        with patch.dict(os.environ, env), TestClient(app) as client:
+            self.assertEqual(_upload(client).status_code, 200)
+            limited = _upload(client)
+            self.assertEqual(limited.status_code, 429)
+            self.assertEqual(limited.headers["Retry-After"], "1")
+            self.assertEqual(client.get("/health").status_code, 200)
+
+            # A fresh IP budget, but the caller's key has already used its token.
+            app.state.rate_limiter._buckets.clear()
+            app.state.rate_limiter.acquire(api_key_client("user-key"))
+            keyed = _upload(client, api_key="user-key", base_url="http://127.0.0.1:9/v4")
+            self.assertEqual(keyed.status_code, 429)
+
+    def test_busy_parse_pool_sheds_with_503(self) -> None:
+        with TestClient(app) as client:
+            pool = app.state.parse_admission
+            pool.queue_size = 0
+            pool.active = pool.limit
+            try:
+                busy = _upload(client)
+            finally:
+                pool.active = 0
+            self.assertEqual(busy.status_code, 503)
+            self.assertEqual(busy.headers["Retry-After"], "1")
+            self.assertEqual(_upload(client).status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
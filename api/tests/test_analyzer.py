@@ -3,7 +3,12 @@ import pathlib
 import sys
 
 sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
-from app.services.analyzer import analyze_text
+from app.services.analyzer import (
+    SENTENCE_MAX_CHARS,
+    analyze_text,
+    iter_sentences,
+    split_sentences,
+)
 
 
 class AnalyzerTests(unittest.TestCase):
@@ -24,6 +29,34 @@ class AnalyzerTests(unittest.TestCase):
         self.assertIn("citation_figure", issue_types)
         self.assertGreaterEqual(len(result["sentences"]), 5)
 
+    def test_streamed_sentences_match_split_and_carry_source_offsets(self) -> None:
+        text = (
+            "  First claim holds.\n\nSecond   claim\tspans lines!  Third? "
+            "阈值电压窗口。 Fourth ends here.   Tail without stop"
+        )
+        chunks = [text[idx : idx + 7] for idx in range(0, len(text), 7)]
+
+        records = list(iter_sentences(chunks))
+
+        self.assertEqual([record.text for record in records], split_sentences(text))
+        self.assertEqual(records[1].text, "Second claim spans lines!")
+        for record in records:
+            source = text[record.start : record.end]
+            self.assertEqual(" ".join(source.split()), record.text)
+
+        result = analyze_text(iter(chunks))
+        self.assertEqual(result["sentences"][2], {"id": "s-3", "text": "Third?", "start": 51, "end": 57})
+
+    def test_text_without_boundaries_is_split_at_whitespace_past_the_cap(self) -> None:
+        text = "word " * 10_000 + "End."
+        chunks = [text[idx : idx + 4096] for idx in range(0, len(text), 4096)]
+
+        records = list(iter_sentences(chunks))
+
+        self.assertGreater(len(records), 1)
+        self.assertTrue(all(len(record.text) <= SENTENCE_MAX_CHARS for record in records))
+        self.assertEqual(" ".join(record.text for record in records), " ".join(text.split()))
+
 
 if __name__ == "__main__":
     unittest.main()
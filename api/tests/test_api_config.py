@@ -1,12 +1,17 @@
+import io
+import json
 import pathlib
 import sys
 import unittest
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
+import zipfile
 
 from fastapi.testclient import TestClient
 
 sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
 from app.main import app
+from app.services.admission import api_key_client
+from app.services.parser import SpooledUpload
 
 
 class ApiConfigTests(unittest.TestCase):
@@ -18,7 +23,7 @@ class ApiConfigTests(unittest.TestCase):
         self.assertIn("论文一致性检测 API", response.text)
         self.assertIn("打开 API 文档", response.text)
 
-    @patch("app.main.GLMClient.review", return_value=[])
+    @patch("app.main.AsyncGLMClient.review", new_callable=AsyncMock, return_value=[])
     def test_request_api_key_can_enable_glm(self, _mock_review) -> None:
         client = TestClient(app)
         text = "This is a simple sentence."
@@ -37,6 +42,233 @@ class ApiConfigTests(unittest.TestCase):
         body = response.json()
         self.assertTrue(body["engine"]["glm_enabled"])
         self.assertTrue(body["engine"]["glm_attempted"])
+        # Breakers are kept per API key, without storing the key itself.
+        breakers = [key for key in app.state.glm_breakers._breakers if "glm-4.5-flash" in key]
+        self.assertEqual(len(breakers), 1)
+        self.assertTrue(breakers[0].endswith(api_key_client("test-key-from-ui")))
+
+    @patch("app.main.AsyncGLMClient.review", new_callable=AsyncMock)
+    def test_identical_reupload_is_served_from_cache(self, mock_review) -> None:
+        mock_review.return_value = [{"type": "logic", "sentence_id": "s-1", "title": "Cached"}]
+        client = TestClient(app)
+        request = {
+            "files": {"file": ("cached.txt", "A cached sentence.".encode("utf-8"), "text/plain")},
+            "data": {"model": "glm-cache-test", "api_key": "test-key"},
+        }
+
+        first = client.post("/api/analyze", **request).json()
+        second = client.post("/api/analyze", **request).json()
+
+        self.assertEqual(first["engine"]["cache"], "miss")
+        self.assertEqual(second["engine"]["cache"], "hit")
+        self.assertEqual(first["issues"], second["issues"])
+        self.assertEqual(mock_review.await_count, 1)
+
+    @patch("app.main.AsyncGLMClient.review", new_callable=AsyncMock)
+    def test_stream_emits_heuristics_before_glm_and_engine_last(self, mock_review) -> None:
+        mock_review.return_value = [{"type": "term", "sentence_id": "s-2", "title": "Streamed"}]
+        client = TestClient(app)
+        text = (
+            "We name this metric threshold voltage window. "
+            "Later it is switching threshold bandwidth."
+        )
+
+        response = client.post(
+            "/api/analyze/stream",
+            files={"file": ("stream.txt", text.encode("utf-8"), "text/plain")},
+            data={"model": "glm-stream-test", "api_key": "test-key"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("text/event-stream", response.headers.get("content-type", ""))
+        events = []
+        for block in response.text.strip().split("\n\n"):
+            name, data = block.split("\n", 1)
+            events.append((name.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+
+        self.assertEqual([name for name, _ in events], ["sentences", "issues", "glm_issues", "engine"])
+        self.assertEqual(len(events[0][1]["sentences"]), 2)
+        self.assertEqual(events[1][1]["issues"][0]["id"], "h-term-1")
+        # The GLM issue duplicates the heuristic one, so the window adds nothing new.
+        self.assertEqual(events[2][1]["issues"], [])
+        self.assertTrue(events[3][1]["engine"]["glm_used"])
+
+    @patch("app.main.AsyncGLMClient.review", new_callable=AsyncMock, return_value=[])
+    def test_response_reports_stage_timings_and_metrics_are_exported(self, _mock_review) -> None:
+        client = TestClient(app)
+        response = client.post(
+            "/api/analyze",
+            files={"file": ("timed.txt", "A timed sentence. Another one.".encode("utf-8"), "text/plain")},
+            data={"model": "glm-timing-test", "api_key": "test-key"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        timings = response.json()["engine"]["timings_ms"]
+        for stage in ("upload", "parse", "split", "heuristics", "llm_request", "llm_parse", "total"):
+            self.assertGreaterEqual(timings[stage], 0)
+        self.assertGreaterEqual(timings["total"], timings["parse"] + timings["heuristics"])
+
+        metrics = client.get("/metrics")
+        self.assertEqual(metrics.status_code, 200)
+        self.assertIn("text/plain", metrics.headers.get("content-type", ""))
+        self.assertIn('pcp_stage_duration_seconds_count{stage="parse"}', metrics.text)
+        self.assertIn('pcp_result_cache_total{result="miss"}', metrics.text)
+        self.assertIn("pcp_bytes_ingested_total ", metrics.text)
+
+    @patch("app.main.AsyncGLMClient.review", new_callable=AsyncMock)
+    def test_batch_shares_glm_requests_and_reports_each_document(self, mock_review) -> None:
+        mock_review.side_effect = lambda sentences: [
+            {"type": "logic", "sentence_id": item["id"], "title": "Batch"} for item in sentences
+        ]
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as bundle:
+            bundle.writestr("alice/report.txt", "Alice measured the batch gain. It was stable.")
+            bundle.writestr("bob/report.md", "Bob measured the batch loss.")
+            bundle.writestr("bob/refs.bib", "@article{x}")
+        client = TestClient(app)
+
+        response = client.post(
+            "/api/analyze/batch",
+            files=[
+                ("files", ("solo.txt", "Solo batch submission sentence.".encode("utf-8"), "text/plain")),
+                ("files", ("class.zip", archive.getvalue(), "application/zip")),
+                ("files", ("empty.txt", b"", "text/plain")),
+            ],
+            data={"model": "glm-batch-test", "api_key": "test-key"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        names = [entry["filename"] for entry in body["documents"]]
+        self.assertEqual(
+            names, ["solo.txt", "class.zip/alice/report.txt", "class.zip/bob/report.md", "empty.txt"]
+        )
+        self.assertEqual(body["documents"][3]["status"], "error")
+        self.assertEqual(body["summary"]["succeeded"], 3)
+        # Three small documents fit one shared request.
+        self.assertEqual(mock_review.await_count, 1)
+        self.assertEqual(body["summary"]["glm_requests"], 1)
+        alice = body["documents"][1]["result"]
+        self.assertEqual(len(alice["sentences"]), 2)
+        self.assertEqual(
+            sorted(issue["sentence_id"] for issue in alice["issues"] if issue["id"].startswith("g-")),
+            ["s-1", "s-2"],
+        )
+        self.assertEqual(alice["engine"]["glm_shared_windows"], 1)
+
+    @patch("app.main.AsyncGLMClient.review", autospec=True)
+    def test_pairs_mode_sends_only_candidate_pairs(self, mock_review) -> None:
+        prompts: list[str] = []
+
+        async def review(client, sentences):
+            prompts.append(client.prompt)
+            return [{"type": "logic", "sentence_id": sentences[-1]["id"], "title": "Pair"}]
+
+        mock_review.side_effect = review
+        text = (
+            "The proposed annealing step increases the leakage current of the device. "
+            "Thermal noise dominates below ten kelvin in the amplifier chain. "
+            "The proposed annealing step reduces the leakage current of the device."
+        )
+        client = TestClient(app)
+
+        response = client.post(
+            "/api/analyze",
+            files={"file": ("pairs.txt", text.encode("utf-8"), "text/plain")},
+            data={"model": "glm-pairs-test", "api_key": "test-key", "review_mode": "pairs"},
+        )
+
+        engine = response.json()["engine"]
+        self.assertEqual(engine["glm_review_mode"], "pairs")
+        self.assertEqual(engine["glm_candidate_pairs"], 1)
+        self.assertEqual(engine["glm_input_sentences"], 2)
+        sent = mock_review.await_args.args[1]
+        self.assertEqual([item["id"] for item in sent], ["s-1", "s-3"])
+        self.assertEqual({item["pair"] for item in sent}, {"p-1"})
+        self.assertIn("pairs", prompts[0])
+
+    def test_oversized_batch_releases_every_spooled_part(self) -> None:
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as bundle:
+            for name in ("a.txt", "b.txt", "c.txt"):
+                bundle.writestr(name, f"Submission {name} text.")
+        client = TestClient(app)
+
+        with patch.dict("os.environ", {"BATCH_MAX_DOCUMENTS": "2"}), patch.object(
+            SpooledUpload, "close", autospec=True
+        ) as close:
+            response = client.post(
+                "/api/analyze/batch",
+                files=[
+                    ("files", ("solo.txt", b"Solo text.", "text/plain")),
+                    ("files", ("class.zip", archive.getvalue(), "application/zip")),
+                ],
+            )
+
+        self.assertEqual(response.status_code, 413)
+        # The solo file, the archive itself and its three spooled members.
+        self.assertEqual(len({id(call.args[0]) for call in close.call_args_list}), 5)
+
+    def test_multipart_upload_is_hashed_in_place_not_copied(self) -> None:
+        client = TestClient(app)
+        text = "Higher temperature improves robustness. " * 40_000
+        with patch("app.main.spool_upload", side_effect=AssertionError("copied")):
+            response = client.post(
+                "/api/analyze/batch",
+                files=[("files", ("large.txt", text.encode("utf-8"), "text/plain"))],
+                data={"output": "ndjson"},
+            )
+
+        self.assertEqual(response.status_code, 200)
+        # The part rolled over to disk and is read after the form is closed.
+        lines = [json.loads(line) for line in response.text.strip().split("\n")]
+        self.assertEqual(lines[-1]["summary"]["failed"], 0)
+
+    def test_batch_can_stream_ndjson(self) -> None:
+        client = TestClient(app)
+        response = client.post(
+            "/api/analyze/batch",
+            files=[
+                ("files", ("one.txt", "First streamed batch text.".encode("utf-8"), "text/plain")),
+                ("files", ("two.txt", "Second streamed batch text.".encode("utf-8"), "text/plain")),
+            ],
+            data={"output": "ndjson", "api_key": ""},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("application/x-ndjson", response.headers.get("content-type", ""))
+        lines = [json.loads(line) for line in response.text.strip().split("\n")]
+        self.assertEqual(sorted(line["index"] for line in lines[:-1]), [0, 1])
+        self.assertEqual(lines[-1]["summary"]["documents"], 2)
+
+    def test_corpus_documents_feed_terminology_checks(self) -> None:
+        client = TestClient(app)
+        for doc_id in ("api-thesis-1", "api-thesis-2"):
+            response = client.post(
+                "/api/corpus/documents",
+                files={"file": ("t.txt", "The gate leakage current stayed low.".encode("utf-8"))},
+                data={"doc_id": doc_id},
+            )
+            self.assertEqual(response.status_code, 201)
+            self.assertGreater(response.json()["terms"], 0)
+
+        upload = {"files": {"file": ("new.txt", "The gate-leakage current rose.".encode("utf-8"))}}
+        issues = client.post("/api/analyze", **upload).json()["issues"]
+        self.assertIn("h-corpus-1", [issue["id"] for issue in issues])
+
+        for doc_id in ("api-thesis-1", "api-thesis-2"):
+            self.assertEqual(client.delete(f"/api/corpus/documents/{doc_id}").status_code, 200)
+        self.assertEqual(client.delete("/api/corpus/documents/api-thesis-1").status_code, 404)
+        issues = client.post("/api/analyze", **upload).json()["issues"]
+        self.assertNotIn("h-corpus-1", [issue["id"] for issue in issues])
+
+    def test_stream_rejects_empty_upload_before_streaming(self) -> None:
+        client = TestClient(app)
+        response = client.post(
+            "/api/analyze/stream",
+            files={"file": ("empty.txt", b"", "text/plain")},
+        )
+        self.assertEqual(response.status_code, 400)
 
     def test_health_allows_null_origin_for_file_preview(self) -> None:
         client = TestClient(app)
@@ -0,0 +1,50 @@
+import json
+import pathlib
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from benchmarks.run import main, percentile, traced_peak_mb
+
+
+class BenchmarkHarnessTests(unittest.TestCase):
+    def test_percentile_interpolates(self) -> None:
+        self.assertEqual(percentile([1.0, 2.0, 3.0, 4.0], 0.5), 2.5)
+        self.assertEqual(percentile([5.0], 0.99), 5.0)
+
+    def test_traced_peak_is_per_call(self) -> None:
+        self.assertGreater(traced_peak_mb(lambda: bytearray(8 * 1024 * 1024)), 7.5)
+        self.assertLess(traced_peak_mb(lambda: bytearray(1024)), 1.0)
+
+    def test_small_run_writes_json_and_exercises_glm_retries(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            output = pathlib.Path(tmp) / "bench.json"
+            main(
+                [
+                    "--sizes", "120",
+                    "--formats", "txt,zip",
+                    "--repeat", "2",
+                    "--endpoint-repeat", "1",
+                    "--glm-latency-ms", "1",
+                    "--glm-failure-rate", "0.5",
+                    "--output", str(output),
+                ]
+            )
+            report = json.loads(output.read_text(encoding="utf-8"))
+
+        self.assertEqual([item["format"] for item in report["stages"]], ["txt", "zip"])
+        self.assertIn("p99_ms", report["stages"][0]["stages"]["split_sentences"])
+        # Peaks are per scenario, not the process high-water mark of the largest one.
+        zip_stages = report["stages"][1]["stages"]
+        self.assertGreater(
+            zip_stages["parse_file_bytes"]["peak_traced_mb"],
+            zip_stages["merge_issues"]["peak_traced_mb"],
+        )
+        endpoint = report["endpoint"][0]
+        self.assertGreater(endpoint["mock_glm"]["failures"], 0)
+        self.assertGreater(endpoint["mock_glm"]["requests"], endpoint["glm_windows"])
+
+
+if __name__ == "__main__":
+    unittest.main()
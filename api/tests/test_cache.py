@@ -0,0 +1,62 @@
+import asyncio
+import pathlib
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from app.services.cache import TieredCache, content_hash
+
+
+class TieredCacheTests(unittest.TestCase):
+    def test_memory_tier_evicts_least_recently_used_within_byte_budget(self) -> None:
+        cache = TieredCache("test", max_bytes=70)
+        cache.set("a", {"text": "x" * 20})
+        cache.set("b", {"text": "y" * 20})
+        self.assertIsNotNone(cache.get("a"))
+        cache.set("c", {"text": "z" * 20})
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), {"text": "x" * 20})
+        self.assertLessEqual(cache.size_bytes, 70)
+
+    def test_sqlite_tier_survives_restart(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(pathlib.Path(tmp) / "cache.sqlite3")
+            first = TieredCache("test", sqlite_path=path)
+            first.set("key", {"issues": [1, 2]})
+            first.close()
+
+            second = TieredCache("test", sqlite_path=path)
+            self.assertEqual(second.get("key"), {"issues": [1, 2]})
+            self.assertIsNone(TieredCache("other", sqlite_path=path).get("key"))
+            second.close()
+
+    def test_sqlite_tier_evicts_oldest_rows_and_expired_ones(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(pathlib.Path(tmp) / "cache.sqlite3")
+            cache = TieredCache("test", max_bytes=0, sqlite_path=path, disk_max_bytes=70)
+            for key in "abc":
+                cache.set(key, {"text": key * 20})
+            self.assertLessEqual(cache.disk_size_bytes, 70)
+            self.assertIsNone(cache.get("a"))
+            self.assertEqual(asyncio.run(cache.aget("c")), {"text": "c" * 20})
+            cache.close()
+
+            with patch("app.services.cache.time.time", return_value=time.time() + 3600):
+                expired = TieredCache("test", sqlite_path=path, ttl_seconds=60)
+                self.assertIsNone(expired.get("c"))
+                self.assertEqual(expired.disk_size_bytes, 0)
+                expired.close()
+
+    def test_content_hash_depends_on_settings(self) -> None:
+        self.assertNotEqual(
+            content_hash(b"paper", {"model": "a"}),
+            content_hash(b"paper", {"model": "b"}),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import pathlib
+import sys
+import unittest
+import zipfile
+from io import BytesIO
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from app.services.charset import StreamDecoder, looks_binary, sniff_encoding
+from app.services.parser import iter_zip_texts
+
+
+def _decode_in_chunks(data: bytes, size: int) -> tuple[str, str]:
+    decoder = StreamDecoder(data[:size])
+    parts = [decoder.decode(data[idx : idx + size]) for idx in range(0, len(data), size)]
+    parts.append(decoder.decode(b"", final=True))
+    return "".join(parts), decoder.encoding
+
+
+class CharsetTests(unittest.TestCase):
+    def test_boms_and_bomless_utf16_are_sniffed_not_treated_as_binary(self) -> None:
+        text = "Threshold voltage window."
+        self.assertEqual(sniff_encoding(text.encode("utf-8-sig")), "utf-8-sig")
+        self.assertEqual(sniff_encoding(text.encode("utf-32")), "utf-32")
+        self.assertEqual(sniff_encoding(text.encode("utf-16-le")), "utf-16-le")
+        self.assertEqual(sniff_encoding(text.encode("utf-16-be")), "utf-16-be")
+        self.assertIsNone(sniff_encoding(text.encode("utf-8")))
+        self.assertFalse(looks_binary(text.encode("utf-16")))
+
+        self.assertTrue(looks_binary(b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR"))
+        self.assertTrue(looks_binary(bytes(range(1, 9)) * 10))
+        self.assertFalse(looks_binary("阈值电压窗口。\r\n\tTabbed.".encode("gb18030")))
+
+    def test_codec_is_chosen_while_decoding_across_chunk_boundaries(self) -> None:
+        utf8 = ("Window 阈值电压窗口 defined. " * 50).encode("utf-8")
+        self.assertEqual(_decode_in_chunks(utf8, 7), (utf8.decode("utf-8"), "utf-8"))
+
+        # ASCII head, GB18030 tail: the switch happens after the first chunks.
+        gbk = ("Plain ASCII head. " * 20 + "阈值电压窗口的定义。" * 20).encode("gb18030")
+        self.assertEqual(_decode_in_chunks(gbk, 64), (gbk.decode("gb18030"), "gb18030"))
+
+        # Invalid bytes after real UTF-8 text are replaced, not re-read as another codec.
+        broken = "阈值 window".encode("utf-8") + b" \xff tail"
+        self.assertEqual(_decode_in_chunks(broken, 4)[0], "阈值 window � tail")
+        self.assertEqual(_decode_in_chunks(b"caf\xe9 \x81", 3), ("café \x81", "latin1"))
+
+    def test_zip_reads_utf16_members(self) -> None:
+        buffer = BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            archive.writestr("a.txt", "First section text.".encode("utf-16"))
+            archive.writestr("b.txt", "Second section text.".encode("utf-16-le"))
+
+        text = "".join(iter_zip_texts(BytesIO(buffer.getvalue())))
+
+        self.assertEqual(text, "First section text.\n\nSecond section text.")
+
+
+if __name__ == "__main__":
+    unittest.main()
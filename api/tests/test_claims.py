@@ -0,0 +1,92 @@
+import pathlib
+import sys
+import unittest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from app.services.analyzer import analyze_text, detect_numeric_issues
+from app.services.claims import extract_claims, find_conflicts, index_claims
+
+
+class ClaimExtractionTests(unittest.TestCase):
+    def test_subject_value_unit_tuples(self) -> None:
+        claims = list(
+            extract_claims(
+                "Our model reaches an accuracy of 92.3% and the threshold voltage is about 0.45 V."
+            )
+        )
+        self.assertEqual(
+            [(claim.subject, claim.value, claim.unit) for claim in claims],
+            [("accuracy", 92.3, "%"), ("threshold voltage", 0.45, "V")],
+        )
+        value_first = list(extract_claims("This yields 92.3% accuracy and a 12 dB gain."))
+        self.assertEqual(
+            [(claim.subject, claim.value, claim.unit) for claim in value_first],
+            [("accuracy", 92.3, "%"), ("gain", 12.0, "dB")],
+        )
+
+    def test_sample_sizes_share_one_subject(self) -> None:
+        subjects = {
+            (claim.subject, claim.value)
+            for sentence in ("We recruited 1,024 healthy participants.", "Overall, n = 118 did.")
+            for claim in extract_claims(sentence)
+        }
+        self.assertEqual(subjects, {("sample size", 1024.0), ("sample size", 118.0)})
+
+    def test_subject_stops_at_a_qualifying_preposition(self) -> None:
+        claims = [
+            claim
+            for sentence in (
+                "The learning rate of the proposed model was 0.01.",
+                "The batch size of the proposed model was 128.",
+            )
+            for claim in extract_claims(sentence)
+        ]
+        self.assertEqual(
+            [claim.subject for claim in claims],
+            ["learning rate of proposed model", "batch size of proposed model"],
+        )
+
+    def test_labels_and_p_values_are_not_claims(self) -> None:
+        self.assertEqual(list(extract_claims("The p-value was 0.03 and Figure 3 is 2 columns wide.")), [])
+
+
+class NumericConflictTests(unittest.TestCase):
+    def test_restated_value_is_flagged_on_the_later_sentence(self) -> None:
+        sentences = [
+            "Our model reaches an accuracy of 92.3% on the benchmark.",
+            "We recruited 120 participants.",
+            "The final accuracy was 91.8%.",
+            "Overall, n = 118 completed the study.",
+            "As noted, the accuracy is 92.3% again.",
+        ]
+        issues = detect_numeric_issues(sentences)
+        self.assertEqual([issue["sentence_id"] for issue in issues], ["s-3", "s-4"])
+        self.assertEqual(issues[0]["type"], "numeric")
+        self.assertEqual(issues[0]["detail"], "'accuracy' is 91.8% here but 92.3% in s-1.")
+        analyzed = analyze_text(" ".join(sentences))["issues"]
+        self.assertIn("h-numeric-1", [issue["id"] for issue in analyzed])
+
+    def test_unitless_claims_need_the_same_written_subject(self) -> None:
+        sentences = [
+            "The learning rates were 0.01.",
+            "The learning rate was 0.001.",
+            "The learning rate was 0.005.",
+        ]
+        conflicts = find_conflicts(index_claims(sentences))
+        self.assertEqual([(first.value, later.value) for first, later in conflicts], [(0.001, 0.005)])
+
+    def test_numeric_conflict_is_reported_once(self) -> None:
+        text = (
+            "The proposed model reaches an accuracy of 92.3% on the benchmark dataset. "
+            "The proposed model reaches an accuracy of 91.8% on the benchmark dataset."
+        )
+        issues = analyze_text(text)["issues"]
+        self.assertEqual([issue["id"] for issue in issues], ["h-numeric-1"])
+
+    def test_quantities_measured_under_many_conditions_are_not_conflicts(self) -> None:
+        sentences = [f"At load {idx}, the efficiency was {80 + idx}%." for idx in range(5)]
+        self.assertEqual(find_conflicts(index_claims(sentences)), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import pathlib
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from app.services.analyzer import analyze_text, detect_corpus_issues
+from app.services.corpus import TermIndex, extract_terms
+
+
+CORPUS = {
+    "thesis-a": ["The threshold voltage window shrinks at low temperature."],
+    "thesis-b": ["We widen the threshold voltage window with a second gate."],
+    "paper-c": ["A stable threshold voltage window needs a clean dataset."],
+}
+
+
+def _index(path: str | None = None) -> TermIndex:
+    index = TermIndex(path)
+    for doc_id, sentences in CORPUS.items():
+        index.add_document(doc_id, sentences)
+    return index
+
+
+class TermExtractionTests(unittest.TestCase):
+    def test_hyphenation_and_spacing_share_a_canonical_key(self) -> None:
+        spaced = {term.canonical: term.surface for term in extract_terms("The data sets differ.")}
+        closed = {term.canonical: term.surface for term in extract_terms("The datasets differ.")}
+        self.assertEqual(spaced["dataset"], "data set")
+        self.assertEqual(closed["dataset"], "dataset")
+        hyphen = {term.surface for term in extract_terms("Threshold-voltage windows were wide.")}
+        self.assertIn("threshold-voltage window", hyphen)
+
+
+class TermIndexTests(unittest.TestCase):
+    def test_postings_counts_and_removal(self) -> None:
+        index = _index()
+        self.assertEqual(len(index), 3)
+        self.assertEqual(
+            index.surface_counts(["thresholdvoltagewindow"]),
+            {"thresholdvoltagewindow": {"threshold voltage window": 3}},
+        )
+        self.assertEqual(index.postings("threshold voltage window")[0], ("paper-c", 0))
+
+        version = index.version
+        self.assertTrue(index.remove_document("paper-c"))
+        self.assertFalse(index.remove_document("paper-c"))
+        self.assertGreater(index.version, version)
+        self.assertEqual(index.surface_counts(["dataset"]), {})
+        self.assertEqual(
+            index.surface_counts(["thresholdvoltagewindow"])["thresholdvoltagewindow"],
+            {"threshold voltage window": 2},
+        )
+
+    def test_readding_a_document_replaces_its_postings(self) -> None:
+        index = _index()
+        index.add_document("thesis-a", ["Nothing about gates here."])
+        counts = index.surface_counts(["thresholdvoltagewindow"])["thresholdvoltagewindow"]
+        self.assertEqual(counts, {"threshold voltage window": 2})
+
+    def test_index_persists_in_sqlite(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(pathlib.Path(tmp) / "corpus.sqlite3")
+            _index(path).close()
+            reopened = TermIndex(path)
+            self.assertEqual(reopened.stats()["documents"], 3)
+            self.assertEqual(reopened.version, 3)
+            reopened.close()
+
+    def test_version_is_readable_while_a_document_is_being_indexed(self) -> None:
+        index = _index()
+        version = index.version
+        with index._lock:
+            self.assertEqual(index.version, version)
+        index.add_document("paper-d", ["The threshold voltage window shrank."])
+        self.assertEqual(index.version, version + 1)
+
+
+class CorpusIssueTests(unittest.TestCase):
+    def test_variant_of_corpus_term_is_flagged_once_per_sentence(self) -> None:
+        sentences = [
+            "Our threshold-voltage window is wider.",
+            "The threshold voltage window was measured twice.",
+        ]
+        issues = detect_corpus_issues(sentences, _index())
+
+        self.assertEqual(len(issues), 1)
+        self.assertEqual(issues[0]["id"], "h-corpus-1")
+        self.assertEqual(issues[0]["sentence_id"], "s-1")
+        self.assertIn("'threshold-voltage window'", issues[0]["detail"])
+        self.assertIn("3 indexed documents", issues[0]["detail"])
+
+    def test_analyze_text_adds_corpus_issues_only_with_documents(self) -> None:
+        text = "The threshold-voltage window is wider."
+        self.assertEqual(analyze_text(text, corpus=TermIndex())["issues"], [])
+        issues = analyze_text(text, corpus=_index())["issues"]
+        self.assertEqual([issue["id"] for issue in issues], ["h-corpus-1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
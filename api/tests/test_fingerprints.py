@@ -0,0 +1,95 @@
+import json
+import pathlib
+import random
+import sys
+import unittest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from app.services.analyzer import analyze_text
+from app.services.fingerprints import (
+    find_candidate_pairs,
+    lsh_candidates,
+    minhash_signatures,
+    sentence_features,
+)
+
+
+SENTENCES = [
+    "The proposed annealing step increases the leakage current of the device.",
+    "Thermal noise dominates below ten kelvin in the amplifier chain.",
+    "The proposed annealing step reduces the leakage current of the device.",
+    "Accuracy of the classifier on the validation split reached 91.2% after tuning.",
+    "Accuracy of the classifier on the validation split reached 88.5% after tuning.",
+    "As shown in Fig. 3, the cavity resonance shifts strongly with temperature.",
+    "As shown in Fig. 4, the cavity resonance shifts strongly with temperature.",
+    "退火工艺提高了器件的漏电流。",
+    "退火工艺降低了器件的漏电流。",
+]
+
+
+class SentenceFeatureTests(unittest.TestCase):
+    def test_trend_words_and_negation_set_polarity_not_tokens(self) -> None:
+        up = sentence_features("The annealing step increases leakage current.")
+        down = sentence_features("The annealing step does not increase leakage current.")
+        self.assertEqual((up.polarity, down.polarity), (1, -1))
+        self.assertEqual(up.tokens, down.tokens)
+        self.assertEqual(sentence_features("退火工艺降低了漏电流。").polarity, -1)
+
+    def test_figure_and_citation_numbers_are_not_values(self) -> None:
+        features = sentence_features("Table 2 and [4, 5] report a gain of 3.5 dB over 12 runs.")
+        self.assertEqual(features.numbers, frozenset({"3.5", "12"}))
+
+
+class CandidatePairTests(unittest.TestCase):
+    def test_finds_polarity_numeric_and_duplicate_pairs(self) -> None:
+        found = {(pair.first, pair.second): pair.kind for pair in find_candidate_pairs(SENTENCES)}
+        self.assertEqual(
+            found,
+            {(0, 2): "polarity", (3, 4): "numeric", (5, 6): "duplicate", (7, 8): "polarity"},
+        )
+
+    def test_identical_signatures_share_buckets_but_crowded_buckets_are_skipped(self) -> None:
+        tokens = frozenset({"cavity", "resonance", "temperature"})
+        signatures = minhash_signatures([tokens] * 3)
+        self.assertEqual(lsh_candidates(signatures), {(0, 1), (0, 2), (1, 2)})
+        self.assertEqual(lsh_candidates(signatures, max_bucket_size=2), set())
+
+    def test_large_documents_stay_sub_quadratic(self) -> None:
+        rng = random.Random(7)
+        words = [f"term{index}" for index in range(3000)]
+        sentences = [" ".join(rng.choices(words, k=15)) + "." for _ in range(5000)]
+        sentences.append(sentences[10].replace(".", " improves."))
+        sentences.append(sentences[10].replace(".", " degrades."))
+        pairs = find_candidate_pairs(sentences)
+        self.assertIn((5000, 5001), {(pair.first, pair.second) for pair in pairs})
+        self.assertTrue(all(pair.similarity >= 0.5 for pair in pairs))
+
+    def test_analyze_text_reports_pairs_on_the_later_sentence(self) -> None:
+        result = analyze_text(" ".join(SENTENCES[:3]))
+        pair_issues = [issue for issue in result["issues"] if issue["id"].startswith("h-pair-")]
+        self.assertEqual(len(pair_issues), 1)
+        self.assertEqual(pair_issues[0]["sentence_id"], "s-3")
+        self.assertIn("s-1", pair_issues[0]["detail"])
+        self.assertEqual(
+            result["candidate_pairs"],
+            [{"first": "s-1", "second": "s-3", "kind": "polarity", "similarity": 1.0}],
+        )
+        json.dumps(result)
+
+    def test_statements_about_different_settings_are_not_reported(self) -> None:
+        text = (
+            "We train the ResNet model for 100 epochs on CIFAR with a cosine schedule. "
+            "We train the ResNet model for 90 epochs on ImageNet with a cosine schedule. "
+            "Weight decay improves the accuracy of the ResNet model on CIFAR with a cosine schedule. "
+            "Weight decay reduces the accuracy of the ResNet model on ImageNet with a cosine schedule."
+        )
+        result = analyze_text(text)
+        self.assertEqual(result["issues"], [])
+        # Still candidates for the GLM pairs review, which can read the context.
+        kinds = {(pair["first"], pair["second"]): pair["kind"] for pair in result["candidate_pairs"]}
+        self.assertEqual(kinds[("s-1", "s-2")], "numeric")
+        self.assertEqual(kinds[("s-3", "s-4")], "polarity")
+
+
+if __name__ == "__main__":
+    unittest.main()
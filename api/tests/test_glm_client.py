@@ -0,0 +1,72 @@
+import asyncio
+import json
+import pathlib
+import sys
+import unittest
+
+import httpx
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from app.services.glm_client import AsyncGLMClient, GLMConnectionPool
+
+
+def _completion(issues: list[dict]) -> dict:
+    return {"choices": [{"message": {"content": json.dumps({"issues": issues})}}]}
+
+
+class AsyncGLMClientTests(unittest.TestCase):
+    def test_review_parses_issues_through_pool(self) -> None:
+        seen: list[str] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append(str(request.url))
+            return httpx.Response(200, json=_completion([{"type": "logic", "sentence_id": "s-2"}]))
+
+        async def run() -> list[dict]:
+            pool = GLMConnectionPool(transport=httpx.MockTransport(handler))
+            client = AsyncGLMClient("key", "https://glm.test/v4/", "glm-test", pool=pool)
+            try:
+                return await client.review([{"id": "s-1", "text": "A."}])
+            finally:
+                await pool.aclose()
+
+        issues = asyncio.run(run())
+        self.assertEqual(issues, [{"type": "logic", "sentence_id": "s-2"}])
+        self.assertEqual(seen, ["https://glm.test/v4/chat/completions"])
+
+    def test_http_error_sets_last_error(self) -> None:
+        async def run() -> AsyncGLMClient:
+            pool = GLMConnectionPool(
+                transport=httpx.MockTransport(lambda _req: httpx.Response(429, text="slow down"))
+            )
+            client = AsyncGLMClient("key", "https://glm.test", "glm-test", pool=pool)
+            self.assertEqual(await client.review([{"id": "s-1", "text": "A."}]), [])
+            await pool.aclose()
+            return client
+
+        client = asyncio.run(run())
+        self.assertEqual(client.last_error, "GLM HTTP 429: slow down")
+
+    def test_pool_caps_in_flight_requests(self) -> None:
+        peak = 0
+
+        async def run() -> None:
+            nonlocal peak
+            class Transport(httpx.AsyncBaseTransport):
+                async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+                    nonlocal peak
+                    peak = max(peak, pool.in_flight)
+                    await asyncio.sleep(0.01)
+                    return httpx.Response(200, json=_completion([]))
+
+            pool = GLMConnectionPool(max_in_flight=2, transport=Transport())
+            client = AsyncGLMClient("key", "https://glm.test", "glm-test", pool=pool)
+            await asyncio.gather(*(client.review([{"id": "s-1", "text": "A."}]) for _ in range(6)))
+            await pool.aclose()
+
+        asyncio.run(run())
+        self.assertEqual(peak, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import asyncio
+import pathlib
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from app.main import app
+from app.services.jobs import Job, JobManager, JobStore, QueueFullError
+from app.services.parser import SpooledUpload
+
+
+class JobManagerTests(unittest.TestCase):
+    def test_bounded_queue_rejects_and_cancel_skips_queued_job(self) -> None:
+        async def run() -> tuple[list[str], Job, Job]:
+            manager = JobManager(JobStore(), workers=1, queue_size=1)
+            gate = asyncio.Event()
+            ran: list[str] = []
+
+            async def blocking(job: Job) -> None:
+                ran.append(job.id)
+                await gate.wait()
+
+            first = manager.submit(blocking)
+            await asyncio.sleep(0)
+            second = manager.submit(blocking)
+            with self.assertRaises(QueueFullError):
+                manager.submit(blocking)
+
+            manager.cancel(second.id)
+            gate.set()
+            await asyncio.sleep(0.01)
+            await manager.stop()
+            return ran, first, second
+
+        ran, first, second = asyncio.run(run())
+        self.assertEqual(ran, [first.id])
+        self.assertEqual(first.status, "done")
+        self.assertEqual(second.status, "cancelled")
+
+    def test_cancelled_and_dropped_jobs_release_their_resources(self) -> None:
+        async def run() -> tuple[list[str], Job, Job]:
+            manager = JobManager(JobStore(), workers=1, queue_size=4)
+            gate = asyncio.Event()
+            released: list[str] = []
+
+            async def blocking(_job: Job) -> None:
+                await gate.wait()
+
+            async def never_runs(_job: Job) -> None:
+                raise AssertionError("a cancelled job must not run")
+
+            manager.submit(blocking, cleanup=lambda: released.append("first"))
+            await asyncio.sleep(0)
+            second = manager.submit(never_runs, cleanup=lambda: released.append("second"))
+            manager.cancel(second.id)
+            gate.set()
+            while manager.queued:
+                await asyncio.sleep(0.001)
+
+            gate.clear()
+            manager.submit(blocking, cleanup=lambda: released.append("running"))
+            await asyncio.sleep(0)
+            dropped = manager.submit(never_runs, cleanup=lambda: released.append("dropped"))
+            await manager.stop()
+            return released, second, dropped
+
+        released, second, dropped = asyncio.run(run())
+        self.assertEqual(released, ["first", "second", "running", "dropped"])
+        self.assertEqual((second.status, dropped.status), ("cancelled", "cancelled"))
+
+    def test_finished_jobs_survive_store_restart(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(pathlib.Path(tmp) / "jobs.sqlite3")
+
+            async def run() -> str:
+                manager = JobManager(JobStore(sqlite_path=path))
+
+                async def work(job: Job) -> None:
+                    job.result = {"issues": [{"id": "h-term-1"}]}
+
+                job = manager.submit(work)
+                while manager.get(job.id).status != "done":
+                    await asyncio.sleep(0.001)
+                await manager.stop()
+                manager.store.close()
+                return job.id
+
+            job_id = asyncio.run(run())
+            restored = JobStore(sqlite_path=path).get(job_id)
+
+        self.assertIsNotNone(restored)
+        self.assertEqual(restored.status, "done")
+        self.assertEqual(restored.result, {"issues": [{"id": "h-term-1"}]})
+
+
+class JobApiTests(unittest.TestCase):
+    def test_job_lifecycle_over_http(self) -> None:
+        text = "Section 2 says heat improves robustness. Section 3 says heat reduces robustness."
+        with TestClient(app) as client:
+            created = client.post(
+                "/api/jobs", files={"file": ("job.txt", text.encode("utf-8"), "text/plain")}
+            )
+            self.assertEqual(created.status_code, 202)
+            job_id = created.json()["id"]
+
+            deadline = time.monotonic() + 5
+            body = client.get(f"/api/jobs/{job_id}").json()
+            while body["status"] in {"queued", "running"} and time.monotonic() < deadline:
+                time.sleep(0.01)
+                body = client.get(f"/api/jobs/{job_id}").json()
+
+            self.assertEqual(body["status"], "done")
+            self.assertEqual(body["result"]["issues"][0]["type"], "logic")
+            self.assertEqual(client.delete(f"/api/jobs/{job_id}").status_code, 200)
+            self.assertEqual(client.get(f"/api/jobs/{job_id}").status_code, 404)
+
+    def test_full_queue_answers_429_and_releases_the_upload(self) -> None:
+        with TestClient(app) as client:
+            with patch.object(JobManager, "submit", side_effect=QueueFullError()), patch.object(
+                SpooledUpload, "close", autospec=True
+            ) as close:
+                rejected = client.post("/api/jobs", files={"file": ("job.txt", b"Queued text.")})
+            self.assertEqual(rejected.status_code, 429)
+            self.assertEqual(rejected.headers["Retry-After"], "5")
+            close.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
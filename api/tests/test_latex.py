@@ -0,0 +1,98 @@
+from io import BytesIO
+import pathlib
+import sys
+import unittest
+import zipfile
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from app.services.analyzer import analyze_text
+from app.services.latex import LatexIndex, LatexReader, find_main_file
+from app.services.parser import iter_upload_text
+
+
+PROJECT = {
+    "paper/main.tex": r"""\documentclass{article}
+\usepackage{graphicx}
+\newcommand{\noise}{Preamble text that is not prose.}
+\begin{document}
+\section{Introduction}
+We study device robustness~\cite{smith2020, lee2021}. % reviewer note
+As shown in Figure~\ref{fig:robust}, device robustness improves with annealing.
+\input{sections/results}
+\begin{equation}
+  E = mc^2 \label{eq:energy}
+\end{equation}
+Eq.~\eqref{eq:energy} holds for $n = 120$ samples and Table~\ref{tab:missing} follows.
+\end{document}
+Text after the document end.""",
+    "paper/sections/results.tex": r"""\begin{figure}[t]
+\centering
+\includegraphics[width=0.5\linewidth]{robust.png}
+\caption{Device robustness decreases after annealing.}
+\label{fig:robust}
+\end{figure}
+\begin{figure}\caption{Unused plot}\label{fig:unused}\end{figure}
+""",
+    "paper/sections/unused.tex": "Never included.",
+    "paper/refs.bib": "@article{smith2020, title={Noise}}",
+}
+
+
+class LatexReaderTests(unittest.TestCase):
+    def test_reads_prose_in_input_order_and_indexes_targets(self) -> None:
+        reads: list[str] = []
+
+        def read(name: str) -> str | None:
+            reads.append(name)
+            return PROJECT.get(name)
+
+        main = find_main_file(PROJECT, read)
+        index = LatexIndex()
+        text = "".join(LatexReader(read, index).iter_text(main))
+
+        self.assertEqual(main, "paper/main.tex")
+        self.assertNotIn("paper/sections/unused.tex", reads)
+        self.assertEqual(index.files, ["paper/main.tex", "paper/sections/results.tex"])
+        for noise in ("Preamble", "includegraphics", "mc^2", "reviewer note", "after the document"):
+            self.assertNotIn(noise, text)
+        self.assertIn("We study device robustness.", text)
+        self.assertLess(text.index("improves with annealing"), text.index("decreases after"))
+        self.assertIn("n = 120 samples", text)
+
+        self.assertEqual(index.labels["fig:robust"].kind, "figure")
+        self.assertEqual(index.labels["eq:energy"].kind, "equation")
+        caption = index.labels["fig:robust"].caption_offset
+        self.assertTrue(text[caption:].startswith("Device robustness decreases"))
+        self.assertEqual([key for key, _ in index.cites], ["smith2020", "lee2021"])
+        self.assertEqual(
+            [key for key, _ in index.refs], ["fig:robust", "eq:energy", "tab:missing"]
+        )
+
+
+class LatexAnalysisTests(unittest.TestCase):
+    def test_project_zip_checks_captions_against_referencing_sentences(self) -> None:
+        buffer = BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            for name, content in PROJECT.items():
+                archive.writestr(name, content)
+        structure = LatexIndex()
+
+        result = analyze_text(
+            iter_upload_text("paper.zip", BytesIO(buffer.getvalue()), structure),
+            structure=structure,
+        )
+
+        by_text = {sentence["text"]: sentence["id"] for sentence in result["sentences"]}
+        issues = {issue["title"]: issue for issue in result["issues"]}
+        conflict = issues["Figure Caption Conflict"]
+        self.assertEqual(conflict["sentence_id"], by_text["Device robustness decreases after annealing."])
+        self.assertIn(
+            by_text["As shown in Figure fig:robust, device robustness improves with annealing."],
+            conflict["detail"],
+        )
+        self.assertEqual(issues["Unreferenced figure"]["sentence_id"], by_text["Unused plot."])
+        self.assertIn("tab:missing", issues["Undefined reference"]["detail"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import pathlib
+import sys
+import unittest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from app.services.metrics import MetricsRegistry, record_stage, timed_iter
+
+
+class MetricsTests(unittest.TestCase):
+    def test_counter_renders_labelled_series(self) -> None:
+        registry = MetricsRegistry()
+        counter = registry.counter("demo_total", "Demo counter.", ("result",))
+        counter.inc(result="hit")
+        counter.inc(2, result="hit")
+        counter.inc(result='mi"ss')
+
+        text = registry.render()
+        self.assertIn("# TYPE demo_total counter", text)
+        self.assertIn('demo_total{result="hit"} 3', text)
+        self.assertIn('demo_total{result="mi\\"ss"} 1', text)
+        self.assertEqual(counter.value(result="hit"), 3)
+
+    def test_histogram_buckets_are_cumulative(self) -> None:
+        registry = MetricsRegistry()
+        histogram = registry.histogram("demo_seconds", "Demo histogram.", ("stage",))
+        for value in (0.004, 0.2, 7.0):
+            histogram.observe(value, stage="parse")
+
+        text = registry.render()
+        self.assertIn('demo_seconds_bucket{stage="parse",le="0.005"} 1', text)
+        self.assertIn('demo_seconds_bucket{stage="parse",le="0.25"} 2', text)
+        self.assertIn('demo_seconds_bucket{stage="parse",le="+Inf"} 3', text)
+        self.assertIn('demo_seconds_count{stage="parse"} 3', text)
+        self.assertEqual(histogram.count(stage="parse"), 3)
+
+    def test_timed_iter_charges_only_producer_time(self) -> None:
+        timings: dict[str, float] = {}
+        record_stage(timings, "parse", 0.002)
+        self.assertEqual(list(timed_iter(iter(["a", "b"]), timings, "parse")), ["a", "b"])
+        self.assertGreaterEqual(timings["parse"], 2.0)
+        self.assertLess(timings["parse"], 1000.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,13 +1,84 @@
+import multiprocessing
+import os
 import pathlib
+import signal
 import sys
+import time
 import types
 import unittest
 import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from io import BytesIO
 from unittest.mock import patch
 
 sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
-from app.services.parser import parse_file_bytes
+from app.services import parser
+from app.services.parser import (
+    ZipLimits,
+    iter_zip_texts,
+    parse_file_bytes,
+    shutdown_extraction_pool,
+)
+
+
+def _build_text_pdf(page_texts: list[str]) -> bytes:
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", b""]
+    kids: list[str] = []
+    for text in page_texts:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode("latin1")
+        page_id = len(objects) + 1
+        kids.append(f"{page_id} 0 R")
+        objects.append(
+            (
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                f"/Resources << /Font << /F1 {page_id + 1} 0 R >> >> "
+                f"/Contents {page_id + 2} 0 R >>"
+            ).encode()
+        )
+        objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+
+    output = BytesIO()
+    output.write(b"%PDF-1.4\n")
+    offsets = []
+    for idx, body in enumerate(objects, start=1):
+        offsets.append(output.tell())
+        output.write(b"%d 0 obj\n%s\nendobj\n" % (idx, body))
+    xref = output.tell()
+    output.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        output.write(b"%010d 00000 n \n" % offset)
+    output.write(b"trailer\n<< /Size %d /Root 1 0 R >>\n" % (len(objects) + 1))
+    output.write(b"startxref\n%d\n%%%%EOF" % xref)
+    return output.getvalue()
+
+
+
+def _extract_range_hanging_on_page_one(
+    source: str, start: int, end: int, page_timeout: float
+) -> list[str]:
+    # Runs in an extraction worker, standing in for a pathological page.
+    class Page:
+        def __init__(self, index: int) -> None:
+            self.index = index
+
+        def extract_text(self) -> str:
+            if self.index == 1:
+                time.sleep(3600)
+            return f"Page {self.index} is fine."
+
+    return parser._extract_pdf_pages([Page(index) for index in range(start, end)], page_timeout)
+
+
+def _extract_range_ignoring_alarms(
+    source: str, start: int, end: int, page_timeout: float
+) -> list[str]:
+    # Like a page stuck in C code, which never returns to the alarm handler.
+    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGALRM})
+    time.sleep(3600)
+    return []
 
 
 class ParserTests(unittest.TestCase):
@@ -25,7 +96,9 @@ class ParserTests(unittest.TestCase):
                 self.pages = [BrokenPage(), GoodPage()]
 
         fake_module = types.SimpleNamespace(PdfReader=FakePdfReader)
-        with patch.dict(sys.modules, {"pypdf": fake_module}):
+        # Without a page timeout the fake reader's pages are read in this process.
+        env = {"PDF_PAGE_TIMEOUT_SECONDS": "0"}
+        with patch.dict(sys.modules, {"pypdf": fake_module}), patch.dict("os.environ", env):
             text = parse_file_bytes("sample.pdf", b"%PDF-1.7")
 
         self.assertIn("Useful content.", text)
@@ -40,6 +113,80 @@ class ParserTests(unittest.TestCase):
             with self.assertRaisesRegex(ValueError, "Failed to read PDF"):
                 parse_file_bytes("broken.pdf", b"%PDF-1.7")
 
+    def test_pdf_pages_extracted_in_parallel_keep_page_order(self) -> None:
+        page_texts = [f"Page {idx} reports result {idx}." for idx in range(12)]
+        env = {"PDF_PARALLEL_MIN_PAGES": "2", "PARSER_PROCESSES": "3"}
+        try:
+            with patch.dict("os.environ", env):
+                text = parse_file_bytes("long.pdf", _build_text_pdf(page_texts))
+        finally:
+            shutdown_extraction_pool()
+
+        self.assertEqual(text.split("\n"), page_texts)
+
+    def test_broken_extraction_pool_is_replaced_and_pages_retried(self) -> None:
+        broken = ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn"))
+        with self.assertRaises(BrokenProcessPool):
+            broken.submit(os._exit, 1).result()
+        page_texts = [f"Page {idx} survives." for idx in range(4)]
+        env = {"PDF_PARALLEL_MIN_PAGES": "2", "PARSER_PROCESSES": "2"}
+        shutdown_extraction_pool()
+        try:
+            with patch.dict("os.environ", env), patch.object(parser, "_extraction_pool", broken):
+                text = parse_file_bytes("long.pdf", _build_text_pdf(page_texts))
+                self.assertIsNot(parser._extraction_pool, broken)
+                shutdown_extraction_pool()
+        finally:
+            shutdown_extraction_pool()
+
+        self.assertEqual(text.split("\n"), page_texts)
+
+    def test_hanging_page_is_skipped_on_every_extraction_path(self) -> None:
+        page_texts = [f"Page {idx} is fine." for idx in range(3)]
+        # One worker and fewer pages than PDF_PARALLEL_MIN_PAGES: the small-PDF path.
+        env = {"PARSER_PROCESSES": "1", "PDF_PAGE_TIMEOUT_SECONDS": "0.5"}
+        shutdown_extraction_pool()
+        try:
+            with patch.dict("os.environ", env), patch.object(
+                parser, "_extract_pdf_range", _extract_range_hanging_on_page_one
+            ):
+                started = time.monotonic()
+                text = parse_file_bytes("small.pdf", _build_text_pdf(page_texts))
+                self.assertLess(time.monotonic() - started, 10)
+        finally:
+            shutdown_extraction_pool()
+
+        self.assertEqual(text.split("\n"), ["Page 0 is fine.", "Page 2 is fine."])
+
+    def test_worker_stuck_past_the_page_alarm_is_terminated(self) -> None:
+        page_texts = [f"Page {idx} is fine." for idx in range(2)]
+        env = {"PARSER_PROCESSES": "1", "PDF_PAGE_TIMEOUT_SECONDS": "0.2"}
+        shutdown_extraction_pool()
+        try:
+            with patch.dict("os.environ", env), patch.object(
+                parser, "_extract_pdf_range", _extract_range_ignoring_alarms
+            ), patch.object(parser, "EXTRACTION_GRACE_SECONDS", 0.5):
+                parser.warm_extraction_pool()
+                stuck = parser._extraction_pool
+                text = parse_file_bytes("stuck.pdf", _build_text_pdf(page_texts))
+                self.assertIsNot(parser._extraction_pool, stuck)
+                self.assertEqual(text, "")
+                processes = list(stuck._processes.values()) if stuck._processes else []
+                self.assertFalse(any(process.is_alive() for process in processes))
+        finally:
+            shutdown_extraction_pool()
+
+    def test_warmup_starts_one_extraction_worker_by_default(self) -> None:
+        shutdown_extraction_pool()
+        try:
+            with patch.dict("os.environ", {"PARSER_PROCESSES": "4"}):
+                self.assertEqual(parser.warm_extraction_pool(0), 0)
+                self.assertIsNone(parser._extraction_pool)
+                self.assertEqual(parser.warm_extraction_pool(), 1)
+                self.assertEqual(len(parser._extraction_pool._processes), 1)
+        finally:
+            shutdown_extraction_pool()
+
     def test_zip_latex_extracts_text_content(self) -> None:
         buffer = BytesIO()
         with zipfile.ZipFile(buffer, "w") as archive:
@@ -60,6 +207,46 @@ class ParserTests(unittest.TestCase):
         with self.assertRaisesRegex(ValueError, "No readable text found in uploaded ZIP"):
             parse_file_bytes("figures.zip", buffer.getvalue())
 
+    def test_zip_members_are_streamed_with_their_own_encoding(self) -> None:
+        buffer = BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            archive.writestr("a.tex", "阈值电压窗口的定义。".encode("gb18030"))
+            archive.writestr("b.tex", ("Long body sentence. " * 10000).encode("utf-8"))
+
+        chunks = list(iter_zip_texts(BytesIO(buffer.getvalue())))
+
+        self.assertGreater(len(chunks), 3)
+        self.assertTrue("".join(chunks).startswith("阈值电压窗口的定义。\n\nLong body sentence."))
+
+    def test_zip_limits_reject_bombs_and_oversized_archives(self) -> None:
+        buffer = BytesIO()
+        with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("bomb.txt", b"0" * 2_000_000)
+        with self.assertRaisesRegex(ValueError, "compression ratio"):
+            list(iter_zip_texts(BytesIO(buffer.getvalue()), ZipLimits(max_ratio=100)))
+
+        buffer = BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            for idx in range(5):
+                archive.writestr(f"part{idx}.tex", f"Part {idx} text.")
+        data = buffer.getvalue()
+        with self.assertRaisesRegex(ValueError, "more than 3 entries"):
+            list(iter_zip_texts(BytesIO(data), ZipLimits(max_members=3)))
+        with self.assertRaisesRegex(ValueError, "allowed text size"):
+            list(iter_zip_texts(BytesIO(data), ZipLimits(max_total_bytes=40)))
+
+    def test_zip_members_read_twice_count_once_toward_the_total(self) -> None:
+        buffer = BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            # No main file: both members are sniffed, then read for their text.
+            archive.writestr("a.tex", ("First part sentence. " * 5000).encode("utf-8"))
+            archive.writestr("b.tex", ("Second part sentence. " * 5000).encode("utf-8"))
+        limits = ZipLimits(max_total_bytes=300_000)
+
+        text = "".join(iter_zip_texts(BytesIO(buffer.getvalue()), limits))
+
+        self.assertEqual(len(text), 105_000 + len("\n\n") + 110_000)
+
 
 if __name__ == "__main__":
     unittest.main()
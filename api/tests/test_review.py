@@ -0,0 +1,282 @@
+import asyncio
+import pathlib
+import sys
+import unittest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from app.services.cache import TieredCache
+from app.services.resilience import CIRCUIT_OPEN_ERROR, CircuitBreaker, RetryPolicy
+from app.services.fingerprints import CandidatePair
+from app.services.review import (
+    ReviewWindow,
+    build_pair_windows,
+    build_review_windows,
+    pack_documents,
+    pair_review_sentences,
+    review_windows,
+    split_document_outcome,
+)
+
+NO_DELAY = RetryPolicy(retries=1, base_delay=0.0, max_delay=0.0)
+
+
+def _sentences(count: int) -> list[dict[str, str]]:
+    return [{"id": f"s-{idx + 1}", "text": f"Sentence number {idx + 1} is here."} for idx in range(count)]
+
+
+class FakeClient:
+    def __init__(
+        self, calls: list[list[str]], fail_once: set[str], error_kind: str = "network"
+    ) -> None:
+        self.calls = calls
+        self.fail_once = fail_once
+        self.error_kind = error_kind
+        self.last_error = ""
+        self.last_error_kind = ""
+
+    async def review(self, sentences: list[dict[str, str]]) -> list[dict]:
+        ids = [item["id"] for item in sentences]
+        self.calls.append(ids)
+        if ids[0] in self.fail_once:
+            self.fail_once.discard(ids[0])
+            self.last_error = f"GLM failure ({self.error_kind})"
+            self.last_error_kind = self.error_kind
+            return []
+        return [
+            {"type": "logic", "sentence_id": ids[-1]},
+            {"type": "logic", "sentence_id": "s-9999"},
+        ]
+
+
+class ReviewWindowTests(unittest.TestCase):
+    def test_windows_cover_every_sentence_with_overlap(self) -> None:
+        windows = build_review_windows(_sentences(400), max_tokens=200, overlap=2)
+
+        covered = {sid for window in windows for sid in window.sentence_ids}
+        self.assertEqual(len(covered), 400)
+        self.assertGreater(len(windows), 1)
+        for previous, current in zip(windows, windows[1:]):
+            shared = previous.sentence_ids & current.sentence_ids
+            self.assertEqual(len(shared), 2)
+
+    def test_only_failed_windows_are_retried(self) -> None:
+        windows = build_review_windows(_sentences(40), max_tokens=50, overlap=0)
+        calls: list[list[str]] = []
+        fail_once = {windows[1].sentences[0]["id"]}
+
+        outcomes = asyncio.run(
+            review_windows(
+                lambda: FakeClient(calls, fail_once), windows, concurrency=3, policy=NO_DELAY
+            )
+        )
+
+        self.assertEqual(len(calls), len(windows) + 1)
+        self.assertEqual([outcome.attempts for outcome in outcomes][:3], [1, 2, 1])
+        self.assertFalse(any(outcome.failed for outcome in outcomes))
+        for outcome in outcomes:
+            self.assertEqual([item["sentence_id"] for item in outcome.issues], [outcome.window.sentences[-1]["id"]])
+
+    def test_memo_only_resends_windows_whose_text_changed(self) -> None:
+        memo = TieredCache("review-test")
+        original = _sentences(300)
+        calls: list[list[str]] = []
+
+        def run(sentences: list[dict[str, str]]) -> list:
+            windows = build_review_windows(sentences, max_tokens=120, overlap=1)
+            return asyncio.run(
+                review_windows(
+                    lambda: FakeClient(calls, set()), windows, memo=memo, memo_scope="glm-test"
+                )
+            )
+
+        first = run(original)
+        first_calls = len(calls)
+        self.assertEqual(first_calls, len(first))
+
+        revised_texts = [item["text"] for item in original]
+        revised_texts.insert(100, "A freshly inserted claim about the method.")
+        revised = [{"id": f"s-{idx + 1}", "text": text} for idx, text in enumerate(revised_texts)]
+        second = run(revised)
+
+        resent = len(calls) - first_calls
+        self.assertLessEqual(resent, 2)
+        self.assertGreater(sum(1 for outcome in second if outcome.cached), len(second) - 3)
+        for outcome in second:
+            self.assertEqual(
+                [item["sentence_id"] for item in outcome.issues],
+                [outcome.window.sentences[-1]["id"]],
+            )
+
+
+class DocumentPackingTests(unittest.TestCase):
+    def test_small_documents_share_windows_and_split_back(self) -> None:
+        small = [_sentences(3) for _ in range(4)]
+        large = _sentences(120)
+        windows = pack_documents(small + [large], max_tokens=120, overlap=0)
+
+        first_docs = {item["id"].split(":")[0] for item in windows[0].sentences}
+        self.assertGreater(len(first_docs), 1)
+        covered = {item["id"] for window in windows for item in window.sentences}
+        self.assertEqual(len(covered), 4 * 3 + 120)
+        for window in windows:
+            owners = {item["id"].split(":")[0] for item in window.sentences}
+            self.assertTrue(owners <= {"d0", "d1", "d2", "d3"} or owners == {"d4"})
+
+        outcome = asyncio.run(
+            review_windows(lambda: FakeClient([], set()), windows[:1], policy=NO_DELAY)
+        )[0]
+        parts = split_document_outcome(outcome)
+        self.assertEqual(set(parts), {int(doc[1:]) for doc in first_docs})
+        last_doc = max(parts)
+        self.assertEqual([issue["sentence_id"] for issue in parts[last_doc].issues], ["s-3"])
+        self.assertEqual([item["id"] for item in parts[last_doc].window.sentences], ["s-1", "s-2", "s-3"])
+
+    def test_pair_windows_never_split_a_pair(self) -> None:
+        sentences = _sentences(40)
+        pairs = [CandidatePair(idx, idx + 20, "polarity", 0.8) for idx in range(20)]
+        entries = pair_review_sentences(sentences, pairs)
+        self.assertEqual(
+            entries[:2],
+            [
+                {"id": "s-1", "text": sentences[0]["text"], "pair": "p-1"},
+                {"id": "s-21", "text": sentences[20]["text"], "pair": "p-1"},
+            ],
+        )
+
+        windows = build_pair_windows(entries, max_tokens=100)
+        self.assertGreater(len(windows), 1)
+        for window in windows:
+            tags = [item["pair"] for item in window.sentences]
+            self.assertTrue(all(tags.count(tag) == 2 for tag in tags))
+        self.assertEqual(sum(len(window.sentences) for window in windows), 40)
+
+        packed = pack_documents([entries], max_tokens=100)
+        self.assertEqual(packed[0].sentences[0]["pair"], "d0:p-1")
+        self.assertEqual(len(packed), len(windows))
+
+
+class OversizedClient:
+    """Times out on any request carrying more than ``limit`` sentences."""
+
+    def __init__(self, calls: list[int], limit: int) -> None:
+        self.calls = calls
+        self.limit = limit
+        self.last_error = ""
+        self.last_error_kind = ""
+
+    async def review(self, sentences: list[dict[str, str]]) -> list[dict]:
+        self.calls.append(len(sentences))
+        if len(sentences) > self.limit:
+            self.last_error = "The read operation timed out"
+            self.last_error_kind = "timeout"
+            return []
+        return [{"type": "logic", "sentence_id": item["id"]} for item in sentences]
+
+
+class DownClient:
+    def __init__(self, calls: list[int], kind: str = "server") -> None:
+        self.calls = calls
+        self.last_error = "GLM HTTP 503: unavailable"
+        self.last_error_kind = kind
+
+    async def review(self, sentences: list[dict[str, str]]) -> list[dict]:
+        self.calls.append(len(sentences))
+        return []
+
+
+class ResilienceTests(unittest.TestCase):
+    def test_timed_out_window_is_bisected_instead_of_truncated(self) -> None:
+        window = ReviewWindow(index=0, start=0, sentences=_sentences(8))
+        calls: list[int] = []
+
+        outcomes = asyncio.run(
+            review_windows(lambda: OversizedClient(calls, limit=2), [window], policy=NO_DELAY)
+        )
+
+        self.assertEqual(calls[:3], [8, 4, 4])
+        self.assertTrue(outcomes[0].bisected)
+        self.assertEqual(outcomes[0].error, "")
+        self.assertEqual(
+            sorted(issue["sentence_id"] for issue in outcomes[0].issues),
+            sorted(f"s-{idx}" for idx in range(1, 9)),
+        )
+
+    def test_client_errors_are_not_retried(self) -> None:
+        calls: list[int] = []
+        outcomes = asyncio.run(
+            review_windows(
+                lambda: DownClient(calls, kind="client"),
+                [ReviewWindow(index=0, start=0, sentences=_sentences(3))],
+                policy=RetryPolicy(retries=3, base_delay=0.0),
+            )
+        )
+        self.assertEqual(calls, [3])
+        self.assertTrue(outcomes[0].failed)
+
+    def test_open_circuit_skips_the_provider(self) -> None:
+        clock = [0.0]
+        breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30, clock=lambda: clock[0])
+        windows = [ReviewWindow(index=idx, start=idx, sentences=_sentences(1)) for idx in range(5)]
+        calls: list[int] = []
+
+        outcomes = asyncio.run(
+            review_windows(
+                lambda: DownClient(calls),
+                windows,
+                concurrency=1,
+                policy=RetryPolicy(retries=0),
+                breaker=breaker,
+            )
+        )
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(breaker.state, "open")
+        self.assertEqual([outcome.error for outcome in outcomes][2:], [CIRCUIT_OPEN_ERROR] * 3)
+
+        clock[0] = 31.0
+        self.assertEqual(breaker.state, "half_open")
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+
+    def test_cancelled_half_open_probe_is_released(self) -> None:
+        clock = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30, clock=lambda: clock[0])
+        breaker.record_failure()
+        clock[0] = 31.0
+
+        class HangingClient:
+            last_error = ""
+            last_error_kind = ""
+
+            async def review(self, sentences: list[dict[str, str]]) -> list[dict]:
+                await asyncio.Event().wait()
+                return []
+
+        async def run() -> None:
+            window = ReviewWindow(index=0, start=0, sentences=_sentences(1))
+            probe = asyncio.create_task(
+                review_windows(lambda: HangingClient(), [window], breaker=breaker)
+            )
+            await asyncio.sleep(0.01)
+            self.assertFalse(breaker.allow())
+            probe.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await probe
+
+        asyncio.run(run())
+        self.assertEqual(breaker.state, "half_open")
+        self.assertTrue(breaker.allow())
+
+    def test_backoff_is_jittered_and_bounded(self) -> None:
+        policy = RetryPolicy(base_delay=1.0, max_delay=4.0)
+        delays = [policy.backoff(attempt) for attempt in range(1, 8) for _ in range(20)]
+        self.assertTrue(all(0 <= delay <= 4.0 for delay in delays))
+        self.assertGreater(len(set(delays)), 1)
+        self.assertEqual(policy.backoff(1, retry_after=3.0), 3.0)
+        self.assertEqual(policy.backoff(1, retry_after=60.0), 4.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import pathlib
+import sys
+import tempfile
+import unittest
+
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from app.main import app
+from app.services.revisions import AnalysisStore, align_sentences, diff_revisions
+
+SENTENCES = [
+    "Section 2 defines the threshold voltage window.",
+    "Higher temperature improves robustness.",
+    "Table 3 lists the devices.",
+    "Higher temperature reduces robustness.",
+]
+
+
+def _issue(number: int, issue_type: str, sentence: int, title: str) -> dict:
+    return {
+        "id": f"h-{issue_type}-{number}",
+        "type": issue_type,
+        "severity": "medium",
+        "sentence_id": f"s-{sentence}",
+        "title": title,
+        "detail": "",
+    }
+
+
+class AnalysisStoreTests(unittest.TestCase):
+    def test_revisions_are_numbered_deduplicated_and_pruned(self) -> None:
+        store = AnalysisStore(max_revisions=2)
+        self.assertEqual(store.save("paper", "aa", SENTENCES, []), 1)
+        self.assertEqual(store.save("paper", "aa", SENTENCES, [_issue(1, "logic", 4, "T")]), 1)
+        self.assertEqual(store.load("paper", 1).issues, [_issue(1, "logic", 4, "T")])
+        self.assertEqual(store.save("paper", "bb", SENTENCES[:2], []), 2)
+        self.assertEqual(store.save("paper", "cc", SENTENCES[:3], []), 3)
+
+        self.assertEqual([row["revision"] for row in store.revisions("paper")], [2, 3])
+        self.assertIsNone(store.load("paper", 1))
+        self.assertEqual(store.find("cc"), [("paper", 3)])
+        self.assertEqual(store.load("paper", 3).sentences, SENTENCES[:3])
+        self.assertTrue(store.remove("paper"))
+        self.assertIsNone(store.latest_revision("paper"))
+
+    def test_store_persists_in_sqlite(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(pathlib.Path(tmp) / "analyses.sqlite3")
+            store = AnalysisStore(path)
+            store.save("paper", "aa", SENTENCES, [_issue(1, "term", 1, "Variant")])
+            store.close()
+            reopened = AnalysisStore(path)
+            self.assertEqual(reopened.load("paper", 1).issues[0]["title"], "Variant")
+            reopened.close()
+
+    def test_alignment_matches_shifted_and_whitespace_edited_sentences(self) -> None:
+        store = AnalysisStore()
+        store.save("paper", "aa", SENTENCES, [])
+        edited = ["New opening sentence."] + SENTENCES[:2] + ["Table  3 lists\nthe devices."]
+        store.save("paper", "bb", edited, [])
+        old, new = store.load("paper", 1), store.load("paper", 2)
+
+        self.assertEqual(align_sentences(old.hashes, new.hashes), {0: 1, 1: 2, 2: 3})
+        self.assertEqual(align_sentences([1, 2, 3], [1, 2, 3]), {0: 0, 1: 1, 2: 2})
+
+    def test_diff_reports_only_changed_issues(self) -> None:
+        store = AnalysisStore()
+        store.save(
+            "paper",
+            "aa",
+            SENTENCES,
+            [
+                _issue(1, "term", 1, "Variant"),
+                _issue(2, "logic", 2, "Opposite trend"),
+                _issue(3, "logic", 4, "Opposite trend"),
+            ],
+        )
+        # One sentence inserted at the top, the contradiction in s-4 deleted,
+        # the term issue fixed in place and a new issue raised on the new text.
+        edited = ["A new abstract sentence."] + SENTENCES[:3]
+        store.save(
+            "paper",
+            "bb",
+            edited,
+            [_issue(1, "logic", 3, "Opposite trend"), _issue(2, "numeric", 1, "Mismatch")],
+        )
+
+        diff = diff_revisions(store.load("paper", 1), store.load("paper", 2))
+
+        self.assertEqual((diff["from"], diff["to"]), (1, 2))
+        self.assertEqual(diff["sentences"]["unchanged"], 3)
+        self.assertEqual(diff["sentences"]["added"], [{"id": "s-1", "text": edited[0]}])
+        self.assertEqual(diff["sentences"]["removed"], [{"id": "s-4", "text": SENTENCES[3]}])
+        issues = diff["issues"]
+        self.assertEqual(issues["unchanged"], 1)
+        self.assertEqual([issue["id"] for issue in issues["added"]], ["h-numeric-2"])
+        self.assertEqual([issue["id"] for issue in issues["removed"]], ["h-logic-3"])
+        self.assertEqual(
+            [(issue["id"], issue["to_sentence_id"]) for issue in issues["resolved"]],
+            [("h-term-1", "s-2")],
+        )
+
+
+class DocumentApiTests(unittest.TestCase):
+    def test_analyze_with_doc_id_saves_revisions_for_diffing(self) -> None:
+        first = " ".join(SENTENCES)
+        second = "An added opening sentence. " + " ".join(SENTENCES[:3])
+        with TestClient(app) as client:
+            def analyze(text: str) -> dict:
+                return client.post(
+                    "/api/analyze",
+                    files={"file": ("draft.txt", text.encode("utf-8"), "text/plain")},
+                    data={"doc_id": "theses/draft"},
+                ).json()
+
+            self.assertEqual(analyze(first)["document"], {"id": "theses/draft", "revision": 1})
+            result = analyze(second)
+            self.assertEqual(result["document"]["revision"], 2)
+
+            listing = client.get("/api/documents/theses/draft").json()
+            self.assertEqual([row["revision"] for row in listing["revisions"]], [1, 2])
+
+            diff = client.get("/api/documents/theses/draft/diff").json()
+            self.assertEqual((diff["from"], diff["to"]), (1, 2))
+            self.assertEqual(len(diff["sentences"]["added"]), 1)
+            self.assertEqual(len(diff["sentences"]["removed"]), 1)
+            self.assertEqual(
+                client.get("/api/documents/theses/draft/diff?from=2&to=2").json()["issues"]["added"],
+                [],
+            )
+            self.assertEqual(client.get("/api/documents/theses/draft/diff?from=9").status_code, 404)
+            self.assertEqual(client.get("/api/documents/missing/diff").status_code, 404)
+            self.assertEqual(client.delete("/api/documents/theses/draft").status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
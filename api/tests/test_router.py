@@ -0,0 +1,154 @@
+import asyncio
+import json
+import os
+import pathlib
+import random
+import sys
+import unittest
+from unittest.mock import patch
+
+import httpx
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from app.services.glm_client import GLMConnectionPool
+from app.services.router import TIER_CHEAP, ModelRouter, Route, load_routes
+
+SENTENCES = [{"id": "s-1", "text": "Higher temperature reduces robustness."}]
+
+
+class _MockEndpoints(httpx.AsyncBaseTransport):
+    """Answers per host after a configured delay, with a configured issue list or status."""
+
+    def __init__(self, delays: dict[str, float], issues: dict[str, list] | None = None) -> None:
+        self.delays = delays
+        self.issues = issues or {}
+        self.status: dict[str, int] = {}
+        self.calls: list[str] = []
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        self.calls.append(host)
+        await asyncio.sleep(self.delays.get(host, 0.0))
+        if self.status.get(host, 200) != 200:
+            return httpx.Response(self.status[host], text="upstream down")
+        content = json.dumps({"issues": self.issues.get(host, [])})
+        return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+
+
+def _review(router: ModelRouter, transport: _MockEndpoints, base_url: str = "https://slow.test"):
+    async def run():
+        pool = GLMConnectionPool(transport=transport)
+        client = router.client(
+            api_key="key", base_url=base_url, model="big", timeout=5, pool=pool
+        )
+        try:
+            return await client.review(SENTENCES), client
+        finally:
+            await pool.aclose()
+
+    return asyncio.run(run())
+
+
+class RouterTests(unittest.TestCase):
+    def test_slow_primary_is_hedged_to_the_second_route(self) -> None:
+        transport = _MockEndpoints({"slow.test": 1.0, "fast.test": 0.01})
+        router = ModelRouter(
+            [Route("https://fast.test", "big", api_key="k2", weight=0.001)],
+            hedge_max_ratio=1.0,
+            hedge_delay_seconds=0.05,
+            rng=random.Random(0),
+        )
+        # Make the requested endpoint look fast so it is tried first.
+        router.stats(Route("https://slow.test", "big")).record_success(0.001)
+
+        issues, client = _review(router, transport)
+
+        self.assertEqual(issues, [])
+        self.assertTrue(client.hedged)
+        self.assertEqual(client.last_error, "")
+        self.assertLess(client.last_request_seconds, 0.5)
+        self.assertEqual(transport.calls, ["slow.test", "fast.test"])
+
+    def test_hedge_budget_and_fast_answers_send_no_duplicates(self) -> None:
+        transport = _MockEndpoints({"slow.test": 0.15, "fast.test": 0.15})
+        router = ModelRouter(
+            [Route("https://fast.test", "big", api_key="k2")], hedge_max_ratio=0.0, hedge_delay_seconds=0.01
+        )
+        _issues, client = _review(router, transport)
+        self.assertFalse(client.hedged)
+        self.assertEqual(len(transport.calls), 1)
+
+        transport = _MockEndpoints({"slow.test": 0.0, "fast.test": 0.0})
+        router = ModelRouter([Route("https://fast.test", "big", api_key="k2")], hedge_max_ratio=1.0)
+        for _ in range(3):
+            _issues, client = _review(router, transport)
+        self.assertEqual(len(transport.calls), 3)
+        self.assertEqual(router.hedges, 0)
+
+    def test_failing_route_fails_over_and_is_ranked_down(self) -> None:
+        transport = _MockEndpoints({})
+        transport.status["slow.test"] = 503
+        router = ModelRouter(
+            [Route("https://fast.test", "big", api_key="k2", weight=0.001)], rng=random.Random(0)
+        )
+        router.stats(Route("https://slow.test", "big")).record_success(0.001)
+
+        _issues, client = _review(router, transport)
+
+        self.assertEqual(client.last_error, "")
+        self.assertEqual(client.last_model, "big")
+        self.assertEqual(transport.calls, ["slow.test", "fast.test"])
+        slow = router.stats(Route("https://slow.test", "big"))
+        self.assertEqual(slow.failures, 1)
+        self.assertGreater(slow.ewma, router.stats(Route("https://fast.test", "big")).ewma)
+
+    def test_cheap_route_escalates_only_flagged_windows(self) -> None:
+        flagged = [{"type": "logic", "sentence_id": "s-1", "severity": "high"}]
+        transport = _MockEndpoints({}, issues={"cheap.test": [], "slow.test": flagged})
+        router = ModelRouter([Route("https://cheap.test", "small", api_key="k2", tier=TIER_CHEAP)])
+
+        issues, client = _review(router, transport)
+        self.assertEqual((issues, client.escalated, client.last_model), ([], False, "small"))
+        self.assertEqual(transport.calls, ["cheap.test"])
+
+        transport.issues["cheap.test"] = flagged
+        issues, client = _review(router, transport)
+        self.assertEqual((issues, client.escalated, client.last_model), (flagged, True, "big"))
+        self.assertEqual(transport.calls[1:], ["cheap.test", "slow.test"])
+
+    def test_request_key_is_only_sent_to_its_own_host(self) -> None:
+        router = ModelRouter(
+            [
+                Route("https://other.test", "big"),
+                Route("https://slow.test", "small", tier=TIER_CHEAP),
+            ]
+        )
+        client = router.client(
+            api_key="user-key",
+            base_url="https://slow.test/",
+            model="big",
+            timeout=5,
+            pool=GLMConnectionPool(),
+        )
+        self.assertEqual([route.base_url for route in client.primary], ["https://slow.test"])
+        self.assertEqual([route.api_key for route in client.cheap], ["user-key"])
+
+    def test_routes_load_keys_from_named_environment_variables(self) -> None:
+        raw = json.dumps(
+            [
+                {"base_url": "https://a.test/v4/", "model": "m", "api_key_env": "ROUTE_KEY"},
+                {"base_url": "https://b.test", "model": "s", "tier": "cheap", "weight": 2},
+            ]
+        )
+        with patch.dict(os.environ, {"ROUTE_KEY": "secret"}):
+            routes = load_routes(raw)
+        self.assertEqual(routes[0], Route("https://a.test/v4", "m", api_key="secret"))
+        self.assertEqual((routes[1].tier, routes[1].weight, routes[1].api_key), ("cheap", 2.0, ""))
+        with self.assertRaisesRegex(ValueError, "tier"):
+            load_routes('[{"base_url": "https://a.test", "model": "m", "tier": "huge"}]')
+        self.assertEqual(ModelRouter().fingerprint, "")
+        self.assertNotEqual(ModelRouter(routes).fingerprint, "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import json
+import pathlib
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from app.services.rules import (
+    DEFAULT_RULES,
+    KeywordMatcher,
+    RuleEngine,
+    TermPairRule,
+    load_term_pairs,
+)
+
+
+class KeywordMatcherTests(unittest.TestCase):
+    def test_finds_overlapping_and_nested_keywords(self) -> None:
+        matcher = KeywordMatcher(["he", "she", "hers", "his", "robust", "higher robustness"])
+
+        self.assertEqual(matcher.find("ushers"), {"he", "she", "hers"})
+        self.assertEqual(
+            matcher.find("a higher robustness claim"), {"he", "higher robustness", "robust"}
+        )
+        self.assertEqual(matcher.find("nothing here?"), {"he"})
+        self.assertEqual(matcher.find("xyz"), set())
+
+
+class RuleEngineTests(unittest.TestCase):
+    def test_many_term_pairs_share_one_index(self) -> None:
+        pairs = [
+            TermPairRule(preferred=f"alpha-{idx} metric", variant=f"beta-{idx} metric")
+            for idx in range(2000)
+        ]
+        engine = RuleEngine([*DEFAULT_RULES, *pairs])
+        sentences = [
+            "We define the alpha-1500 metric first.",
+            "Unrelated text.",
+            "Later the text says beta-1500 metric instead.",
+        ]
+
+        hits = engine.evaluate(sentences)
+
+        self.assertEqual([(hit.issue_type, hit.sentence_index) for hit in hits], [("term", 2)])
+        self.assertIn("alpha-1500 metric", hits[0].detail)
+
+    def test_load_term_pairs_skips_incomplete_entries(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = pathlib.Path(tmp) / "pairs.json"
+            path.write_text(
+                json.dumps(
+                    [
+                        {"preferred": "read window", "variant": "memory window", "severity": "high"},
+                        {"preferred": "missing variant"},
+                        {"preferred": "a", "variant": "b", "severity": "urgent"},
+                    ]
+                ),
+                encoding="utf-8",
+            )
+            rules = load_term_pairs(str(path))
+
+        self.assertEqual(
+            rules,
+            [
+                TermPairRule("read window", "memory window", "high"),
+                TermPairRule("a", "b", "medium"),
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
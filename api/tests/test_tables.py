@@ -0,0 +1,67 @@
+import json
+import pathlib
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from app.services import jsonio
+from app.services.analyzer import analyze_document, merge_issues
+from app.services.tables import IssueTable, SentenceTable, sentence_index
+
+
+class TableTests(unittest.TestCase):
+    def test_sentence_rows_match_the_response_shape(self) -> None:
+        table = SentenceTable()
+        table.append("First claim.", 2, 14)
+        table.append("阈值电压窗口。", 15, 22)
+
+        self.assertEqual(len(table), 2)
+        self.assertEqual(table.text(1), "阈值电压窗口。")
+        self.assertEqual(table.texts(), ["First claim.", "阈值电压窗口。"])
+        column = table.text_column()
+        self.assertEqual((len(column), column[-1], list(column)), (2, "阈值电压窗口。", table.texts()))
+        self.assertEqual(table[-1], {"id": "s-2", "text": "阈值电压窗口。", "start": 15, "end": 22})
+        table.append("Third.", 23, 29)
+        self.assertEqual([row["id"] for row in table.to_dicts()], ["s-1", "s-2", "s-3"])
+        with self.assertRaises(IndexError):
+            table[3]
+
+    def test_issue_rows_round_trip_and_merge_like_dicts(self) -> None:
+        issue = {
+            "id": "g-logic-1",
+            "type": "logic",
+            "severity": "high",
+            "sentence_id": "s-12",
+            "title": "Contradiction",
+            "detail": "Opposite trend.",
+        }
+        table = IssueTable.from_dicts([issue])
+        self.assertEqual(table.to_dicts(), [issue])
+        self.assertEqual(list(table.keys()), [("logic", 11)])
+        self.assertEqual(merge_issues(table, [dict(issue, id="g-logic-2")]), [issue])
+        with self.assertRaises(ValueError):
+            table.append_dict(dict(issue, sentence_id="s-x"))
+        self.assertEqual([sentence_index(value) for value in ("s-1", "s-0", "s-", "x-3")], [0, -1, -1, -1])
+
+    def test_document_analysis_materializes_the_analyze_text_result(self) -> None:
+        analysis = analyze_document(
+            "Higher temperature improves robustness. Higher temperature reduces robustness."
+        )
+        result = analysis.to_dict()
+
+        self.assertEqual(result["sentences"][1]["id"], "s-2")
+        self.assertEqual(len(result["issues"]), len(analysis.issues))
+        self.assertEqual(result["issues"][0], analysis.issues[0])
+
+    def test_jsonio_matches_the_standard_library(self) -> None:
+        value = {"text": "阈值 \"window\"", "values": [1, 2.5, None, True]}
+        self.assertEqual(json.loads(jsonio.dumps_bytes(value)), value)
+        self.assertEqual(jsonio.loads(jsonio.dumps(value)), value)
+        with patch.object(jsonio, "orjson", None):
+            self.assertEqual(jsonio.loads(jsonio.dumps(value)), value)
+            self.assertEqual(jsonio.dumps({1: "a"}), '{"1":"a"}')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import pathlib
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from app.services.glm_client import PAIR_REVIEW_PROMPT, REVIEW_PROMPT
+from app.services.review import build_review_windows, window_token_budget
+from app.services.tokens import (
+    estimate_tokens,
+    get_token_counter,
+    model_context_tokens,
+    register_tokenizer,
+)
+
+
+class TokenEstimateTests(unittest.TestCase):
+    def test_cjk_text_costs_more_per_character_than_latin(self) -> None:
+        chinese = "本文提出了一种新的阈值电压测量方法。"
+        english = "We propose a new threshold voltage method."
+        self.assertEqual(estimate_tokens(chinese), len(chinese))
+        self.assertEqual(estimate_tokens(english), (len(english) + 3) // 4)
+        self.assertEqual(estimate_tokens("电压 voltage"), 2 + 2)
+
+    def test_registered_tokenizer_is_resolved_and_unknown_falls_back(self) -> None:
+        register_tokenizer("words", lambda _arg: lambda text: len(text.split()))
+        self.assertEqual(get_token_counter("words")("one two three"), 3)
+        self.assertIs(get_token_counter("no-such-tokenizer"), estimate_tokens)
+        with patch.dict("os.environ", {"GLM_TOKENIZER": "words"}):
+            self.assertEqual(get_token_counter()("a b"), 2)
+
+    def test_model_context_prefers_longest_prefix_and_env_override(self) -> None:
+        self.assertEqual(model_context_tokens("glm-4.6v"), 64_000)
+        self.assertEqual(model_context_tokens("GLM-4.6"), 128_000)
+        with patch.dict("os.environ", {"GLM_CONTEXT_TOKENS": "8000"}):
+            self.assertEqual(model_context_tokens("glm-4.6"), 8000)
+            self.assertLess(window_token_budget("glm-4.6", window_tokens=50_000), 8000)
+
+    def test_window_budget_fills_the_context_left_by_the_prompt_sent(self) -> None:
+        full = window_token_budget("glm-4.6", response_tokens=4000)
+        self.assertEqual(full, 128_000 - estimate_tokens(REVIEW_PROMPT) - 4000)
+        self.assertEqual(window_token_budget("glm-4.6", window_tokens=3000), 3000)
+        pairs = window_token_budget("glm-4.6", prompt=PAIR_REVIEW_PROMPT)
+        prompt_growth = estimate_tokens(PAIR_REVIEW_PROMPT) - estimate_tokens(REVIEW_PROMPT)
+        self.assertEqual(full - pairs, prompt_growth)
+        # A window may also be sent to a routed model with a smaller context.
+        self.assertLess(window_token_budget("glm-4.6", route_models=["glm-4.6v"]), 64_000)
+
+
+class TokenPackingTests(unittest.TestCase):
+    def test_long_sentences_are_kept_whole_in_their_own_window(self) -> None:
+        long_text = "长" * 900
+        sentences = [
+            {"id": "s-1", "text": "Short opening claim."},
+            {"id": "s-2", "text": long_text},
+            {"id": "s-3", "text": "Short closing claim."},
+        ]
+
+        windows = build_review_windows(sentences, max_tokens=300, overlap=0, boundary_divisor=0)
+
+        self.assertEqual([window.sentence_ids for window in windows], [{"s-1"}, {"s-2"}, {"s-3"}])
+        self.assertEqual(windows[1].sentences[0]["text"], long_text)
+
+    def test_chinese_windows_hold_fewer_characters_than_english(self) -> None:
+        chinese = [{"id": f"s-{idx}", "text": "阈值电压在实验中保持稳定。" * 4} for idx in range(60)]
+        english = [{"id": f"s-{idx}", "text": "The threshold voltage stayed stable." * 4} for idx in range(60)]
+
+        zh = build_review_windows(chinese, max_tokens=400, overlap=0, boundary_divisor=0)
+        en = build_review_windows(english, max_tokens=400, overlap=0, boundary_divisor=0)
+
+        self.assertGreater(len(zh), len(en))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import asyncio
+import os
+import pathlib
+import sys
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from app.main import app
+from app.services.warmup import Warmup
+from benchmarks.run import bench_cold_start
+
+
+class WarmupTests(unittest.TestCase):
+    def test_steps_run_in_order_and_failures_do_not_block_readiness(self) -> None:
+        ran: list[str] = []
+
+        async def on_loop() -> None:
+            ran.append("async")
+
+        def broken() -> None:
+            raise ImportError("no module named pypdf")
+
+        warmup = Warmup()
+        self.assertFalse(warmup.ready)
+        steps = [("sync", lambda: ran.append("sync")), ("pdf", broken), ("loop", on_loop)]
+        asyncio.run(warmup.run(steps))
+
+        self.assertEqual(ran, ["sync", "async"])
+        state = warmup.to_dict()
+        self.assertTrue(state["ready"])
+        self.assertEqual(list(state["timings_ms"]), ["sync", "pdf", "loop"])
+        self.assertEqual(state["errors"], {"pdf": "no module named pypdf"})
+
+    def test_health_readiness_reports_warmup(self) -> None:
+        with patch.dict(os.environ, {"WARMUP_MODE": "blocking"}):
+            with TestClient(app) as client:
+                self.assertEqual(client.get("/health").json(), {"status": "ok"})
+                ready = client.get("/health", params={"ready": "true"})
+                self.assertEqual(ready.status_code, 200)
+                self.assertEqual(ready.json()["warmup"]["status"], "done")
+                self.assertIn("analyzer", ready.json()["warmup"]["timings_ms"])
+                self.assertIsNotNone(app.state.glm_pool._client)
+
+        # Without lifespan hooks nothing has warmed this worker up.
+        starting = TestClient(app).get("/health", params={"ready": "true"})
+        self.assertEqual(starting.status_code, 503)
+        self.assertEqual(starting.json()["status"], "starting")
+
+    def test_cold_start_benchmark_times_a_fresh_process(self) -> None:
+        report = bench_cold_start("txt", 20, 1, ["off"])
+        result = report["modes"]["off"]
+        self.assertGreater(result["p50_time_to_first_analysis_ms"], result["p50_first_request_ms"])
+        self.assertEqual(result["warmup_ms"], {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -22,7 +22,7 @@ const demoPdfBtn = document.getElementById("demo-pdf-btn");
 const demoWordBtn = document.getElementById("demo-word-btn");
 const demoLatexBtn = document.getElementById("demo-latex-btn");
 const debugLine = document.getElementById("debug-line");
-const APP_BUILD = "2026-02-21.7";
+const APP_BUILD = "2026-10-17.2";
 const BACKEND_API_URL = "https://paper-consistency-platform-api.onrender.com";
 
 let activeIssueId = null;
@@ -138,12 +138,13 @@ function severityLabel(level) {
 function typeLabel(type) {
   if (type === "term") return "Terminology";
   if (type === "logic") return "Logic";
+  if (type === "numeric") return "Numeric";
   return "Citation/Figure";
 }
 
 function normalizeIssues(rawIssues) {
   return (rawIssues || []).map((issue, idx) => {
-    const type = ["term", "logic", "citation_figure"].includes(issue.type) ? issue.type : "logic";
+    const type = ["term", "logic", "numeric", "citation_figure"].includes(issue.type) ? issue.type : "logic";
     const severity = ["low", "medium", "high"].includes(issue.severity) ? issue.severity : "medium";
     return {
       id: issue.id || `issue-${idx + 1}`,
@@ -341,6 +342,92 @@ async function checkBackendHealth(backendUrl) {
   }
 }
 
+function parseSseBlock(block) {
+  let event = "message";
+  const dataLines = [];
+  block.split("\n").forEach((line) => {
+    if (line.startsWith("event:")) {
+      event = line.slice(6).trim();
+    } else if (line.startsWith("data:")) {
+      dataLines.push(line.slice(5).trimStart());
+    }
+  });
+  if (!dataLines.length) return null;
+  return { event, data: JSON.parse(dataLines.join("\n")) };
+}
+
+// Statuses for which /api/analyze may still work: no stream endpoint, or a
+// proxy/server failure. Upload errors, rate limits and 503 "busy" would not.
+const STREAM_FALLBACK_STATUSES = [404, 405, 500, 502, 504];
+
+function fallbackError(error) {
+  const failure = error instanceof Error ? error : new Error(String(error));
+  failure.canFallBack = true;
+  return failure;
+}
+
+async function streamAnalysis(url, formData, onEvent) {
+  let response;
+  try {
+    response = await fetch(url, {
+      method: "POST",
+      body: formData
+    });
+  } catch (error) {
+    throw fallbackError(error);
+  }
+
+  if (!response.ok || !response.body) {
+    const payload = await response.json().catch(() => ({}));
+    const error = new Error(payload.detail || `Request failed with status ${response.status}.`);
+    error.canFallBack = !response.body || STREAM_FALLBACK_STATUSES.includes(response.status);
+    throw error;
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let finished = false;
+  let completed = false;
+  try {
+    while (!finished) {
+      const { value, done } = await reader.read();
+      finished = done;
+      buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+      let boundary = buffer.indexOf("\n\n");
+      while (boundary !== -1) {
+        const parsed = parseSseBlock(buffer.slice(0, boundary));
+        buffer = buffer.slice(boundary + 2);
+        if (parsed) {
+          completed = completed || parsed.event === "engine" || parsed.event === "done";
+          onEvent(parsed.event, parsed.data);
+        }
+        boundary = buffer.indexOf("\n\n");
+      }
+    }
+  } catch (error) {
+    throw fallbackError(error);
+  }
+  if (!completed) {
+    // A dropped connection or a proxy cutting the stream short also ends in EOF.
+    throw fallbackError(new Error("Stream ended before the analysis finished."));
+  }
+}
+
+async function fetchAnalysis(url, formData, onEvent) {
+  const response = await fetch(url, {
+    method: "POST",
+    body: formData
+  });
+  const payload = await response.json().catch(() => ({}));
+  if (!response.ok) {
+    throw new Error(payload.detail || `Request failed with status ${response.status}.`);
+  }
+  onEvent("sentences", { sentences: payload.sentences || [] });
+  onEvent("issues", { issues: payload.issues || [] });
+  onEvent("engine", { source: payload.source, engine: payload.engine || {} });
+}
+
 async function runAnalysis() {
   const file = paperFileInput.files && paperFileInput.files[0];
   if (!file) {
@@ -374,24 +461,38 @@ async function runAnalysis() {
       formData.append("api_key", inlineApiKey);
     }
 
-    const response = await fetch(`${backendUrl}/api/analyze`, {
-      method: "POST",
-      body: formData
-    });
+    currentSentences = [];
+    currentIssues = [];
+    activeIssueId = null;
+    lastEngineSource = "running";
+    lastEngineInfo = {};
+
+    const handleEvent = (event, data) => {
+      if (event === "sentences") {
+        currentSentences = normalizeSentences(data.sentences);
+        renderPaper(currentSentences);
+        setStatus("Text extracted. Running consistency checks...", "Running");
+      } else if (event === "issues" || event === "glm_issues") {
+        currentIssues = currentIssues.concat(normalizeIssues(data.issues));
+        renderIssues();
+        if (event === "glm_issues") {
+          setStatus(`AI review in progress. ${currentIssues.length} issues so far...`, "Running");
+        }
+      } else if (event === "engine") {
+        lastEngineSource = data.source || "heuristic";
+        lastEngineInfo = data.engine || {};
+      }
+    };
 
-    const payload = await response.json().catch(() => ({}));
-    if (!response.ok) {
-      throw new Error(payload.detail || `Request failed with status ${response.status}.`);
+    try {
+      await streamAnalysis(`${backendUrl}/api/analyze/stream`, formData, handleEvent);
+    } catch (error) {
+      if (!error.canFallBack) throw error;
+      setStatus("Live updates unavailable. Retrying without streaming...", "Running");
+      currentIssues = [];
+      await fetchAnalysis(`${backendUrl}/api/analyze`, formData, handleEvent);
     }
 
-    currentSentences = normalizeSentences(payload.sentences);
-    currentIssues = normalizeIssues(payload.issues);
-    lastEngineSource = payload.source || "heuristic";
-    lastEngineInfo = payload.engine || {};
-    activeIssueId = null;
-
-    renderPaper(currentSentences);
-    renderIssues();
     renderEngineDetail(lastEngineInfo, lastEngineSource);
     const glmErrorText =
       lastEngineInfo && lastEngineInfo.glm_error ? ` | GLM error: ${lastEngineInfo.glm_error}` : "";